@@ -2,14 +2,17 @@ from logging.config import dictConfig
 
 from fastapi import FastAPI
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
 
 from backend.auth.api import router as auth_router
 from backend.blog.api import router as blog_router
 from backend.core import settings
 from backend.core.exceptions import BaseAppException
+from backend.core.jobs import job_runner
 from backend.core.logging.config import log_config
-from backend.core.middleware import SessionMiddleware
+from backend.core.metrics import REGISTRY
+from backend.core.middleware import AccessLogMiddleware, MetricsMiddleware, SessionMiddleware
+from backend.core.security import revoked_users
 
 
 dictConfig(log_config)
@@ -19,6 +22,10 @@ async def health_check():
     return JSONResponse({'status': 'ok'})
 
 
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type='text/plain; version=0.0.4')
+
+
 async def base_app_exception_handler(request: Request, exc: BaseAppException):
     return JSONResponse(status_code=exc.status_code, content={'error': exc.message}, headers=exc.headers)
 
@@ -27,11 +34,20 @@ def create_app() -> FastAPI:
     app = FastAPI(debug=settings.DEBUG)
 
     app.add_middleware(SessionMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(AccessLogMiddleware)
 
     app.exception_handler(BaseAppException)(base_app_exception_handler)
 
     app.add_api_route('/ping/', health_check, methods=['GET'], include_in_schema=False)
+    app.add_api_route('/metrics', metrics, methods=['GET'], include_in_schema=False)
     app.include_router(auth_router)
     app.include_router(blog_router)
 
+    app.add_event_handler('startup', revoked_users.start)
+    app.add_event_handler('shutdown', revoked_users.stop)
+    if settings.JOBS.ENABLED:
+        app.add_event_handler('startup', job_runner.start)
+        app.add_event_handler('shutdown', job_runner.stop)
+
     return app
@@ -22,7 +22,7 @@ async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
     user = await auth_service.authenticate(form_data)
-    return {'access_token': create_access_token(username=user.username)}
+    return {'access_token': create_access_token(username=user.username, user_id=user.id)}
 
 
 @router.get('/me/', response_model=User)
@@ -30,3 +30,10 @@ def get_itself(
     current_user: User = Depends(get_current_user),
 ):
     return current_user
+
+
+@router.delete('/me/', status_code=status.HTTP_204_NO_CONTENT)
+async def delete_itself(
+    current_user: User = Depends(get_current_user),
+):
+    await auth_service.deactivate_user(current_user)
@@ -1,4 +1,6 @@
-from sqlalchemy import select
+from datetime import timedelta
+
+from sqlalchemy import func, select, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.engine import CursorResult
 from sqlalchemy.exc import IntegrityError
@@ -36,9 +38,39 @@ class UserRepository(BaseRepository):
         """
         SELECT u.created_at, u.updated_at, u.id, u.username, u.password
         FROM users u
-        WHERE u.username = :username_1
+        WHERE u.username = :username_1 AND u.deleted_at IS NULL
         """
         if user := (await self._db_session.execute(
-            select(User).filter_by(username=username)
+            select(User).filter(User.username == username, User.deleted_at.is_(None))
         )).scalar_one_or_none():
             return UserInDB.from_orm(user)
+
+    async def get_user_by_id(self, user_id: int) -> UserInDB | None:
+        """
+        SELECT u.created_at, u.updated_at, u.id, u.username, u.password
+        FROM users u
+        WHERE u.id = :id_1 AND u.deleted_at IS NULL
+        """
+        if user := (await self._db_session.execute(
+            select(User).filter(User.id == user_id, User.deleted_at.is_(None))
+        )).scalar_one_or_none():
+            return UserInDB.from_orm(user)
+
+    async def deactivate_user(self, user_id: int) -> bool:
+        """
+        UPDATE users u SET deleted_at = now() WHERE u.id = :user_id AND u.deleted_at IS NULL
+        RETURNING u.id
+        """
+        return (await self._db_session.execute(
+            update(User).values(deleted_at=func.now()).filter(
+                User.id == user_id, User.deleted_at.is_(None)
+            ).returning(User.id).execution_options(synchronize_session=False)
+        )).one_or_none() is not None
+
+    async def get_deactivated_user_ids(self, within: timedelta) -> list[int]:
+        """
+        SELECT u.id FROM users u WHERE u.deleted_at > now() - :within
+        """
+        return (await self._db_session.execute(
+            select(User.id).filter(User.deleted_at > func.now() - within)
+        )).scalars().all()
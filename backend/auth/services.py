@@ -2,8 +2,8 @@ from fastapi.security import OAuth2PasswordRequestForm
 
 from backend.auth.exceptions import InvalidCredentials, UserAlreadyExists
 from backend.auth.repositories import UsernameAlreadyExists, UserRepository
-from backend.auth.schemas import UserCreate, UserInDB
-from backend.core.security import get_password_hash, verify_password
+from backend.auth.schemas import User, UserCreate, UserInDB
+from backend.core.security import get_password_hash, invalidate_user, password_hasher, revoke_user, verify_password
 
 
 class AuthService:
@@ -11,18 +11,29 @@ class AuthService:
         self.user_repository = UserRepository()
 
     async def create_user(self, user_in: UserCreate) -> UserInDB:
-        hashed_password: str = get_password_hash(user_in.password)
+        hashed_password: str = await password_hasher.run(get_password_hash, user_in.password)
         try:
-            return await self.user_repository.create_user(
+            user = await self.user_repository.create_user(
                 username=user_in.username,
                 hashed_password=hashed_password
             )
         except UsernameAlreadyExists:
             raise UserAlreadyExists
+        else:
+            await invalidate_user(user.username)
+            return user
+
+    async def deactivate_user(self, user: User) -> None:
+        """
+        Мягкое удаление: посты пользователя остаются, войти и пользоваться выданными токенами он больше не может.
+        """
+        await self.user_repository.deactivate_user(user_id=user.id)
+        await invalidate_user(user.username)
+        revoke_user(user.id)
 
     async def authenticate(self, form_data: OAuth2PasswordRequestForm) -> UserInDB:
         if not (user := await self.user_repository.get_user_by_username(username=form_data.username)):
             raise InvalidCredentials
-        if not verify_password(form_data.password, user.password):
+        if not await password_hasher.run(verify_password, form_data.password, user.password):
             raise InvalidCredentials
         return user
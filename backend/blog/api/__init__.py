@@ -2,8 +2,12 @@ from fastapi import APIRouter
 
 from .comments import router as comments_router
 from .posts import router as posts_router
+from .search import router as search_router
+from .users import router as users_router
 
 
 router = APIRouter(prefix='/blog', tags=['Blog'])
 router.include_router(router=comments_router, prefix='/comments')
 router.include_router(router=posts_router, prefix='/posts')
+router.include_router(router=search_router, prefix='/search')
+router.include_router(router=users_router, prefix='/users')
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends
 from starlette import status
 
 from backend.auth.schemas import User
-from backend.blog.schemas import Comment, CreateComment
+from backend.blog.schemas import BulkCommentResult, BulkCreateComments, Comment, CreateComment
 from backend.core.container import blog_service
 from backend.core.exceptions import BadRequest
 from backend.core.security import get_current_user
@@ -23,3 +23,15 @@ async def create_comment(
     )):
         raise BadRequest('Invalid parentId')
     return comment
+
+
+@router.post('/bulk', response_model=list[BulkCommentResult])
+async def create_comments(
+    data: BulkCreateComments,
+    user: User = Depends(get_current_user),
+):
+    """
+    Пакетное создание комментариев. Комментарии с несуществующим parentId не создаются,
+    для них в ответе на той же позиции возвращается error, остальные создаются.
+    """
+    return await blog_service.create_comments(owner_id=user.id, comments=data.__root__)
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query
 from starlette import status
+from starlette.requests import Request
 
 from backend.auth.schemas import User
-from backend.blog.exceptions import PostNotFound
-from backend.blog.schemas import CreatePost, Post, PostWithComments, PostWithUser, UpdatePost
-from backend.core.container import blog_service, post_repository
-from backend.core.pagination import LimitOffsetPagination, Page
+from backend.blog.schemas import CreatePost, Post, PostComment, PostWithComments, PostWithUser, UpdatePost
+from backend.core.container import blog_service
+from backend.core.http_cache import cache_headers, conditional_response, etag_matches, not_modified
+from backend.core.pagination import CursorPage, CursorPagination, Page, TreePagination, decode_cursor, encode_cursor
 from backend.core.security import get_current_user
+from backend.core.serialization import FastJSONResponse, dumps
 
 
 router = APIRouter()
@@ -20,19 +24,59 @@ async def create_post(
     return await blog_service.create_post(owner_id=user.id, text=data.text)
 
 
-@router.get('/', response_model=Page[PostWithUser])
+@router.get('/', response_model=Page[PostWithUser] | CursorPage[PostWithUser])
 async def get_all_posts(
-    pagination: LimitOffsetPagination = Depends(),
+    request: Request,
+    pagination: CursorPagination = Depends(),
 ):
-    total, items = await blog_service.get_all_posts(pagination.limit, pagination.offset)
-    return pagination.paginate(items, total)
+    # Версии у ленты нет, поэтому ETag считается по телу: 304 экономит только передачу
+    if pagination.by_cursor:
+        items, next_position = await blog_service.get_posts_after(
+            limit=pagination.limit,
+            after=pagination.get_position(tuple[datetime, int]),
+        )
+        return conditional_response(request, dumps(pagination.paginate_by_cursor(items, next_position)))
+
+    total, items = await blog_service.get_all_posts(pagination.limit, pagination.offset, pagination.total_mode)
+    return conditional_response(request, dumps(pagination.paginate(items, total)))
+
 
+@router.get('/{post_id}/', response_model=PostWithComments, response_model_exclude_none=True)
+async def get_single_post(
+    post_id: int,
+    request: Request,
+    pagination: TreePagination = Depends(),
+):
+    # ETag по версии поддерева: на актуальный If-None-Match ответ 304 без чтения дерева
+    version = await blog_service.get_post_version(post_id=post_id)
+    etag = f'"{post_id}.{version}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-@router.get('/{post_id}/', response_model=PostWithComments)
-async def get_single_post(post_id: int):
-    if not (post := await post_repository.get_single_post(post_id=post_id)):
-        raise PostNotFound
-    return post
+    return FastJSONResponse(await blog_service.get_single_post(
+        post_id=post_id,
+        max_depth=pagination.max_depth,
+        limit=pagination.limit,
+        version=version,
+    ), headers=cache_headers(etag))
+
+
+@router.get('/{post_id}/comments/', response_model=CursorPage[PostComment], response_model_exclude_none=True)
+async def get_comments(
+    post_id: int,
+    pagination: TreePagination = Depends(),
+    cursor: str | None = Query(None, description='next_cursor of the comment node or of the previous page'),
+):
+    items, next_position = await blog_service.get_comments(
+        post_id=post_id,
+        limit=pagination.limit,
+        max_depth=pagination.max_depth,
+        after=decode_cursor(cursor, tuple[datetime, int] | None) if cursor else None,
+    )
+    page = {'limit': pagination.limit, 'items': items}
+    if next_position:
+        page['next_cursor'] = encode_cursor(next_position)
+    return FastJSONResponse(page)
 
 
 @router.patch('/{post_id}/', response_model=Post)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Query
+
+from backend.blog.schemas import SearchResult
+from backend.core.container import blog_service
+from backend.core.pagination import CursorPage, decode_cursor, encode_cursor
+from backend.core.serialization import FastJSONResponse
+
+
+router = APIRouter()
+
+
+@router.get('/', response_model=CursorPage[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1, max_length=256, description='Search query, websearch_to_tsquery syntax'),
+    root_id: int | None = Query(None, description='Search only in the thread of this root post'),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description='Opaque next_cursor from the previous page'),
+):
+    """
+    Полнотекстовый поиск по постам и комментариям, по убыванию релевантности.
+    """
+    items, next_position = await blog_service.search(
+        query=q,
+        limit=limit,
+        root_id=root_id,
+        after=decode_cursor(cursor, tuple[float, int]) if cursor else None,
+    )
+    return FastJSONResponse(CursorPage.construct(
+        limit=limit,
+        next_cursor=encode_cursor(next_position) if next_position else None,
+        items=items,
+    ))
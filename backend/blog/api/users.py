@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Query
+
+from backend.blog.schemas import UserPost
+from backend.core.container import blog_service
+from backend.core.pagination import CursorPage, decode_cursor, encode_cursor
+from backend.core.serialization import FastJSONResponse
+
+
+router = APIRouter()
+
+
+@router.get('/{user_id}/posts/', response_model=CursorPage[UserPost])
+async def get_user_posts(
+    user_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(None, description='Opaque next_cursor from the previous page'),
+    include_comments: bool = Query(False, description='Include comments written by the user'),
+    with_counts: bool = Query(False, description='Add comments_count to every item'),
+):
+    """
+    Посты пользователя от новых к старым.
+    """
+    items, next_position = await blog_service.get_user_posts(
+        user_id=user_id,
+        limit=limit,
+        after=decode_cursor(cursor, tuple[datetime, int]) if cursor else None,
+        include_comments=include_comments,
+        with_counts=with_counts,
+    )
+    return FastJSONResponse(CursorPage.construct(
+        limit=limit,
+        next_cursor=encode_cursor(next_position) if next_position else None,
+        items=items,
+    ))
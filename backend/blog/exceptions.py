@@ -6,3 +6,8 @@ from backend.core.exceptions import BaseAppException
 class PostNotFound(BaseAppException):
     message = 'Post not found'
     status_code = status.HTTP_404_NOT_FOUND
+
+
+class UserNotFound(BaseAppException):
+    message = 'User not found'
+    status_code = status.HTTP_404_NOT_FOUND
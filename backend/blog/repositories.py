@@ -1,119 +1,301 @@
-from sqlalchemy import delete, desc, func, literal, select, update
-from sqlalchemy.dialects.postgresql import insert
+from collections import Counter
+from datetime import datetime
+from itertools import chain
+from typing import Mapping, Sequence
+
+from sqlalchemy import BigInteger, Float, and_, any_, case, cast, delete, desc, func, literal, literal_column, null, \
+    or_, select, true, tuple_, update
+from sqlalchemy.dialects.postgresql import array, insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import aliased
-from sqlalchemy.sql import Select
+from sqlalchemy.sql import ColumnElement, Select
 from sqlalchemy.sql.selectable import CTE
 
-from backend.blog.schemas import PostInDB, PostWithComments, PostWithUser
-from backend.core.database import async_engine, async_session
+from backend.blog.schemas import HIGHLIGHT_START, HIGHLIGHT_STOP, PostInDB, comment_tree, feed_item, post_tree, \
+    search_item, user_post_item
+from backend.core.pagination import TotalMode
 from backend.core.repository import BaseRepository
 from backend.models import Post, User
 
 
+# Конфигурация полнотекстового поиска, та же, что в генерируемой колонке Post.search_vector
+SEARCH_CONFIG = literal_column("'russian'::regconfig")
+# Совпадения отмечаются служебными символами, <mark> подставляет search_item после экранирования текста
+HEADLINE_OPTIONS: str = (
+    f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2, MaxWords=30, MinWords=10'
+)
+
+# Колонки для RETURNING в форме PostInDB, без search_vector
+POST_IN_DB_COLUMNS = tuple(getattr(Post, name) for name in PostInDB.__fields__)
+
+# Поддерево до стольких узлов дешевле прочитать целиком одним диапазоном по path, чем обходить рекурсивно
+SUBTREE_RANGE_MAX_NODES: int = 10_000
+
+
 class InvalidPostId(Exception):
     ...
 
 
+def is_live(post) -> ColumnElement:
+    """
+    NOT EXISTS (SELECT 1 FROM posts d WHERE d.id = ANY(p.path) AND d.deleted_at IS NOT NULL)
+
+    Ни сам узел, ни его предки не удалены мягко. Проверка идет по частичному индексу ix_posts_deleted,
+    в котором только ожидающие очистки узлы.
+    """
+    d = aliased(Post, name='d')
+    return ~select(d.id).filter(d.id == any_(post.path), d.deleted_at.isnot(None)).exists()
+
+
 class PostRepository(BaseRepository):
 
+    async def _shift_descendants_count(self, deltas: Mapping[int, int]) -> None:
+        """
+        UPDATE posts SET descendants_count = descendants_count + CASE posts.id WHEN :id_1 THEN :delta_1 ... END,
+            version = version + 1, updated_at = updated_at
+        WHERE posts.id IN (:ids)
+
+        deltas: {id узла: на сколько изменилось число его потомков}. Предки берутся вызывающим кодом
+        из path, поэтому обновляются только перечисленные узлы, по первичному ключу.
+        Поддерево каждого узла изменилось, поэтому увеличивается и его version (нулевой delta - только version).
+        """
+        await self._db_session.execute(
+            update(Post).values(
+                descendants_count=Post.descendants_count + case(deltas, value=Post.id),
+                version=Post.version + 1,
+                updated_at=Post.updated_at,
+            ).filter(
+                Post.id.in_(deltas)
+            ).execution_options(synchronize_session=False)
+        )
+
     async def create_post(self, owner_id: int, text: str, parent_id: int | None = None) -> PostInDB:
         """
-        INSERT INTO posts p (owner_id, text, parent_id)
-        VALUES (%(owner_id)s, %(text)s, %(parent_id)s)
-        RETURNING p.created_at, p.updated_at, p.id, p.owner_id, p.text, p.parent_id
+        INSERT INTO posts (id, owner_id, text, parent_id, root_id, path)
+        SELECT new.id, :owner_id, :text, :parent_id, coalesce(parent.root_id, parent.id), parent.path || new.id
+        FROM (SELECT nextval(pg_get_serial_sequence('posts', 'id')) id) new
+            JOIN posts parent ON parent.id = :parent_id AND <is_live(parent)>
+        RETURNING created_at, updated_at, id, owner_id, text, parent_id, root_id, descendants_count, path
+
+        Id берется из последовательности заранее, чтобы в той же вставке дописать его в path.
+        Для корня: root_id NULL, path = ARRAY[new.id]. Если родителя нет или он удален, ничего не вставляется.
         """
+        new = select(func.nextval(func.pg_get_serial_sequence('posts', 'id')).label('id')).subquery('new')
+        if parent_id is None:
+            values = select(new.c.id, literal(owner_id), literal(text), null(), null(), array([new.c.id]))
+        else:
+            parent = aliased(Post, name='parent')
+            values = select(
+                new.c.id,
+                literal(owner_id),
+                literal(text),
+                literal(parent_id),
+                func.coalesce(parent.root_id, parent.id),
+                func.array_append(parent.path, new.c.id),
+            ).select_from(new).join(parent, and_(parent.id == parent_id, is_live(parent)))
+
         try:
-            post = PostInDB.parse_obj((await self._db_session.execute(
-                insert(Post).values(owner_id=owner_id, text=text, parent_id=parent_id).returning(Post)
-            )).mappings().one())
+            row = (await self._db_session.execute(
+                insert(Post).from_select(
+                    ['id', 'owner_id', 'text', 'parent_id', 'root_id', 'path'], values
+                ).returning(*POST_IN_DB_COLUMNS)
+            )).mappings().one_or_none()
         except IntegrityError as e:
             await self._db_session.rollback()
             self._logger.info(e)
             raise InvalidPostId
-        else:
-            return post
+        if row is None:
+            raise InvalidPostId
 
-    async def get_all_posts(self, limit: int, offset: int) -> tuple[int, list[PostWithUser]]:
+        post = PostInDB.parse_obj(row)
+        if parent_id is not None:
+            await self._shift_descendants_count(dict.fromkeys(post.path[:-1], 1))
+        return post
+
+    async def create_comments(
+        self, owner_id: int, comments: Sequence[tuple[str, int]]
+    ) -> list[PostInDB | None]:
         """
-        WITH RECURSIVE t AS (
-            SELECT p1.id, p1."text", p1.owner_id, p1.created_at, p1.id AS child_id, 0 cntr
-            FROM posts p1
-            WHERE p1.parent_id IS NULL
-            UNION ALL
-            SELECT t.id, t."text", t.owner_id, t.created_at, p2.id, cntr + 1
-            FROM t JOIN posts p2 ON p2.parent_id = t.child_id
-        )
-        SELECT t.id, t."text", t.created_at, count(*), u.id "user_id", u.username
-        FROM t JOIN users u ON u.id = t.owner_id
-        WHERE cntr != 0
-        GROUP BY t.id, t."text", t.created_at, u.id, u.username
-        """
-        p1 = aliased(Post, name='p1')
-        t_cte: CTE = select(
-            p1.id,
-            p1.text,
-            p1.owner_id,
-            p1.created_at,
-            p1.id.label('child_id'),
-            literal(0).label('cntr')
-        ).filter(p1.parent_id.is_(None)).cte('t', recursive=True)
-
-        p2 = aliased(Post, name='p2')
-        t_cte = t_cte.union_all(
-            select(
-                t_cte.c.id,
-                t_cte.c.text,
-                t_cte.c.owner_id,
-                t_cte.c.created_at,
-                p2.id,
-                t_cte.c.cntr + 1,
-            ).join(
-                p2, p2.parent_id == t_cte.c.child_id
+        SELECT p.id, p.path FROM posts p WHERE p.id IN (:parent_ids) AND <is_live(p)> FOR KEY SHARE
+
+        SELECT nextval(pg_get_serial_sequence('posts', 'id')) FROM generate_series(1, :count)
+
+        INSERT INTO posts (id, owner_id, text, parent_id, root_id, path)
+        VALUES (:id_1, :owner_id, :text_1, :parent_id_1, :root_id_1, :path_1), ...
+        RETURNING created_at, updated_at, id, owner_id, text, parent_id, root_id, descendants_count, path
+
+        comments: пары (text, parent_id). Родители проверяются одним запросом и блокируются от удаления
+        до конца транзакции, id выделяются одним запросом, комментарии вставляются одним запросом.
+        Возвращает созданные комментарии в порядке comments, None на месте комментария
+        с несуществующим или удаленным родителем.
+        """
+        parent_ids = {parent_id for _, parent_id in comments}
+        paths: dict[int, list[int]] = dict((await self._db_session.execute(
+            select(Post.id, Post.path).filter(
+                Post.id.in_(parent_ids), is_live(Post)
+            ).with_for_update(key_share=True)
+        )).all()) if parent_ids else {}
+
+        valid = [(text, parent_id) for text, parent_id in comments if parent_id in paths]
+        if not valid:
+            return [None] * len(comments)
+
+        ids = (await self._db_session.execute(
+            select(func.nextval(func.pg_get_serial_sequence('posts', 'id'))).select_from(
+                func.generate_series(1, len(valid))
             )
-        )
+        )).scalars().all()
+        values = [
+            {
+                'id': post_id,
+                'owner_id': owner_id,
+                'text': text,
+                'parent_id': parent_id,
+                'root_id': paths[parent_id][0],
+                'path': paths[parent_id] + [post_id],
+            }
+            for post_id, (text, parent_id) in zip(ids, valid)
+        ]
 
-        stmt_1: Select = select(
-            t_cte.c.id,
-            t_cte.c.text,
-            t_cte.c.created_at,
-            (func.count() - 1).label('comments_count'),
+        # Порядок строк RETURNING не гарантирован, поэтому они сопоставляются по заранее выделенным id
+        created = {row['id']: PostInDB.parse_obj(row) for row in (await self._db_session.execute(
+            insert(Post).values(values).returning(*POST_IN_DB_COLUMNS)
+        )).mappings().all()}
+        await self._shift_descendants_count(Counter(chain.from_iterable(paths[row['parent_id']] for row in values)))
+
+        post_ids = iter(ids)
+        return [created[next(post_ids)] if parent_id in paths else None for _, parent_id in comments]
+
+    @staticmethod
+    def _feed_stmt() -> Select:
+        return select(
+            Post.id,
+            Post.text,
+            Post.created_at,
+            Post.descendants_count.label('comments_count'),
             User.id.label('user_id'),
             User.username
         ).join(
-            User, User.id == t_cte.c.owner_id
-        ).group_by(
-            t_cte.c.id, t_cte.c.text, t_cte.c.created_at, User.id, User.username
+            User, User.id == Post.owner_id
+        ).filter(
+            Post.parent_id.is_(None), Post.deleted_at.is_(None)
         ).order_by(
-            desc(t_cte.c.created_at)
-        ).limit(limit).offset(offset)
+            desc(Post.created_at), desc(Post.id)
+        )
+
+    async def get_all_posts(
+        self, limit: int, offset: int, total_mode: TotalMode = TotalMode.EXACT
+    ) -> tuple[int | None, list[dict]]:
+        """
+        SELECT p.id, p."text", p.created_at, p.descendants_count "comments_count", u.id "user_id", u.username
+        FROM posts p JOIN users u ON u.id = p.owner_id
+        WHERE p.parent_id IS NULL AND p.deleted_at IS NULL
+        ORDER BY p.created_at DESC, p.id DESC
+        LIMIT :limit OFFSET :offset
+        """
+        stmt_1: Select = self._feed_stmt().limit(limit).offset(offset)
+
+        if total_mode is TotalMode.EXACT:
+            stmt_2 = select(func.count()).filter(Post.parent_id.is_(None), Post.deleted_at.is_(None))
+            result_1, result_2 = await self._snapshot_read(stmt_1, stmt_2, session=await self._read_session())
+            return result_2.scalar_one(), [feed_item(row) for row in result_1.mappings().all()]
+
+        data = (await (await self._read_session()).execute(stmt_1)).mappings().all()
+
+        total: int | None = None
+        if total_mode is TotalMode.ESTIMATED:
+            total = await self._estimate_rows(
+                select(Post.id).filter(Post.parent_id.is_(None), Post.deleted_at.is_(None))
+            )
+        return total, [feed_item(row) for row in data]
+
+    async def get_posts_after(
+        self, limit: int, after: tuple[datetime, int] | None = None
+    ) -> tuple[list[dict], bool]:
+        """
+        SELECT p.id, p."text", p.created_at, p.descendants_count "comments_count", u.id "user_id", u.username
+        FROM posts p JOIN users u ON u.id = p.owner_id
+        WHERE p.parent_id IS NULL AND p.deleted_at IS NULL AND (p.created_at, p.id) < (:created_at, :id)
+        ORDER BY p.created_at DESC, p.id DESC
+        LIMIT :limit + 1
+        """
+        stmt: Select = self._feed_stmt()
+        if after is not None:
+            stmt = stmt.filter(tuple_(Post.created_at, Post.id) < tuple_(*after))
+
+        data = (await (await self._read_session()).execute(stmt.limit(limit + 1))).mappings().all()
+        return [feed_item(row) for row in data[:limit]], len(data) > limit
 
-        stmt_2 = select(func.count()).filter(Post.parent_id.is_(None))
+    async def get_user_posts(
+        self,
+        user_id: int,
+        limit: int,
+        after: tuple[datetime, int] | None = None,
+        include_comments: bool = False,
+        with_counts: bool = False,
+    ) -> tuple[list[dict], bool]:
+        """
+        SELECT p.id, p.parent_id, p.root_id, p."text", p.created_at, p.descendants_count
+        FROM posts p
+        WHERE p.owner_id = :owner_id AND p.parent_id IS NULL AND p.deleted_at IS NULL
+            AND (p.created_at, p.id) < (:created_at, :id)
+        ORDER BY p.created_at DESC, p.id DESC
+        LIMIT :limit + 1
 
-        async_session.configure(bind=async_engine.execution_options(isolation_level='REPEATABLE READ'))
-        async with async_session() as session:
-            data = (await session.execute(stmt_1)).mappings().all()
-            total = await self._db_session.scalar(stmt_2)
+        Идет по ix_posts_owner_feed (owner_id, created_at DESC, id DESC); удаленные посты и комментарии
+        отсеиваются фильтром по строкам. Количество комментариев берется из денормализованного
+        descendants_count, без обхода дерева. С include_comments вместо parent_id IS NULL
+        проверяется, что не удалены и предки комментария (is_live).
+        """
+        stmt: Select = select(
+            Post.id, Post.parent_id, Post.root_id, Post.text, Post.created_at, Post.descendants_count,
+        ).filter(
+            Post.owner_id == user_id, Post.deleted_at.is_(None)
+        ).order_by(desc(Post.created_at), desc(Post.id))
+        if include_comments:
+            stmt = stmt.filter(is_live(Post))
+        else:
+            stmt = stmt.filter(Post.parent_id.is_(None))
+        if after is not None:
+            stmt = stmt.filter(tuple_(Post.created_at, Post.id) < tuple_(*after))
 
-        async_session.configure(bind=async_engine.execution_options(isolation_level='READ COMMITTED'))
-        return total, [PostWithUser(**row) for row in data]
+        data = (await (await self._read_session()).execute(stmt.limit(limit + 1))).mappings().all()
+        return [user_post_item(row, with_counts) for row in data[:limit]], len(data) > limit
 
     async def update_post(self, post_id: int, **values) -> PostInDB:
         """
-        UPDATE posts p SET updated_at=now(), ...
+        UPDATE posts p SET updated_at=now(), version = version + 1, ...
         WHERE p.id = :id_1
-        RETURNING p.created_at, p.updated_at, p.id, p.owner_id, p.text, p.parent_id
+        RETURNING p.created_at, p.updated_at, p.id, p.owner_id, p.text, p.parent_id, ...
+
+        Вместе с узлом увеличивается version его предков (_shift_descendants_count с нулевым delta).
         """
         cursor = await self._db_session.execute(
-            update(Post).values(**values).filter(Post.id == post_id).returning(Post)
+            update(Post).values(version=Post.version + 1, **values).filter(
+                Post.id == post_id
+            ).returning(*POST_IN_DB_COLUMNS)
         )
-        return PostInDB.parse_obj(cursor.mappings().one())
+        post = PostInDB.parse_obj(cursor.mappings().one())
+        if ancestors := post.path[:-1]:
+            await self._shift_descendants_count(dict.fromkeys(ancestors, 0))
+        return post
+
+    async def get_post_version(self, post_id: int) -> int | None:
+        """
+        SELECT p.version FROM posts p WHERE p.id = :post_id AND p.parent_id IS NULL AND p.deleted_at IS NULL
+
+        Версия дерева поста post_id, None если поста нет или он удален. Для комментария тоже None:
+        get_single_post отдает только посты.
+        """
+        return (await (await self._read_session()).execute(
+            select(Post.version).filter(Post.id == post_id, Post.parent_id.is_(None), Post.deleted_at.is_(None))
+        )).scalar_one_or_none()
 
     async def get_post_or_comment_in_db(self, post_id, for_update: bool = False) -> PostInDB | None:
         """
-        SELECT * FROM posts p WHERE p.id = :id_1 (FOR UPDATE)
+        SELECT * FROM posts p WHERE p.id = :id_1 AND <is_live(p)> (FOR UPDATE)
         """
-        stmt = select(Post).filter(Post.id == post_id)
+        stmt = select(Post).filter(Post.id == post_id, is_live(Post))
         if for_update:
             stmt = stmt.with_for_update()
 
@@ -123,48 +305,330 @@ class PostRepository(BaseRepository):
     async def delete_post(self, post_id: int) -> None:
         """
         DELETE FROM posts p WHERE p.id == :post_id
+        RETURNING p.path, p.descendants_count
         """
-        await self._db_session.execute(delete(Post).filter(Post.id == post_id))
+        deleted = (await self._db_session.execute(
+            delete(Post).filter(Post.id == post_id).returning(Post.path, Post.descendants_count)
+        )).one_or_none()
 
-    async def get_single_post(self, post_id: int) -> PostWithComments | None:
+        if deleted and len(deleted.path) > 1:
+            await self._shift_descendants_count(dict.fromkeys(deleted.path[:-1], -(deleted.descendants_count + 1)))
+
+    async def soft_delete_post(self, post_id: int) -> None:
         """
-        WITH RECURSIVE cte(id, parent_id, "text", owner_id, created_at) AS (
-                SELECT p.id, p.parent_id, p."text", p.owner_id, p.created_at
-                FROM posts p WHERE p.id = :post_id
-            UNION ALL
-                SELECT t.id, t.parent_id, t."text", t.owner_id, t.created_at
-                FROM posts t JOIN cte ON cte.id = t.parent_id
+        UPDATE posts p SET deleted_at = now() WHERE p.id = :post_id AND p.deleted_at IS NULL
+        RETURNING p.path, p.descendants_count
+
+        Узел сразу пропадает из чтений вместе с поддеревом, счетчики предков уменьшаются сразу же.
+        Собственный descendants_count узла остается и показывает, сколько потомков осталось удалить.
+        """
+        deleted = (await self._db_session.execute(
+            update(Post).values(deleted_at=func.now(), updated_at=Post.updated_at).filter(
+                Post.id == post_id, Post.deleted_at.is_(None)
+            ).returning(Post.path, Post.descendants_count).execution_options(synchronize_session=False)
+        )).one_or_none()
+
+        if deleted and len(deleted.path) > 1:
+            await self._shift_descendants_count(dict.fromkeys(deleted.path[:-1], -(deleted.descendants_count + 1)))
+
+    async def has_deleted_posts(self) -> bool:
+        """
+        SELECT EXISTS (SELECT p.id FROM posts p WHERE p.deleted_at IS NOT NULL)
+
+        Есть ли мягко удаленные посты, ожидающие очистки (по почти пустому ix_posts_deleted).
+        """
+        return await self._db_session.scalar(select(select(Post.id).filter(Post.deleted_at.isnot(None)).exists()))
+
+    async def purge_deleted_batch(self, batch_size: int) -> tuple[int, int, int] | None:
+        """
+        SELECT p.id, p.path FROM posts p WHERE p.deleted_at IS NOT NULL
+        ORDER BY p.deleted_at LIMIT 1 FOR UPDATE SKIP LOCKED
+
+        DELETE FROM posts WHERE posts.id IN (
+            SELECT d.id FROM posts d WHERE d.path > :path AND d.path < :next_path
+            ORDER BY d.path DESC LIMIT :batch_size
         )
-        SELECT cte.created_at, cte.id, cte.parent_id, cte."text", u.id "user_id", u.username
-        FROM cte JOIN users u ON u.id = cte.owner_id
-        ORDER_BY cte.created_at DESC
+
+        UPDATE posts p SET descendants_count = descendants_count - :deleted WHERE p.id = :id
+        RETURNING p.descendants_count
+
+        Удаляет не больше batch_size потомков самого раннего мягко удаленного узла. В порядке path DESC
+        потомки узла идут раньше него самого, поэтому каскад по parent_id не выходит за пачку.
+        Когда потомков не осталось, удаляется и сам узел. Параллельные обработчики берут разные узлы
+        (SKIP LOCKED). Возвращает (id узла, удалено строк, осталось потомков) или None, если удалять нечего.
+        """
+        if not (post := (await self._db_session.execute(
+            select(Post.id, Post.path).filter(
+                Post.deleted_at.isnot(None)
+            ).order_by(Post.deleted_at).limit(1).with_for_update(skip_locked=True)
+        )).one_or_none()):
+            return None
+
+        next_path = post.path[:-1] + [post.path[-1] + 1]
+        batch = select(Post.id).filter(
+            Post.path > post.path, Post.path < next_path
+        ).order_by(desc(Post.path)).limit(batch_size)
+        deleted = (await self._db_session.execute(
+            delete(Post).filter(Post.id.in_(batch.scalar_subquery())).execution_options(synchronize_session=False)
+        )).rowcount
+
+        if deleted < batch_size:
+            await self._db_session.execute(delete(Post).filter(Post.id == post.id))
+            return post.id, deleted + 1, 0
+
+        remaining = (await self._db_session.execute(
+            update(Post).values(
+                descendants_count=Post.descendants_count - deleted, updated_at=Post.updated_at
+            ).filter(Post.id == post.id).returning(Post.descendants_count)
+        )).scalar_one()
+        return post.id, deleted, remaining
+
+    @staticmethod
+    def _subtree_stmt(path: list[int], max_depth: int | None, limit: int | None) -> Select:
         """
+        SELECT s.created_at, s.id, s.parent_id, s."text", s.descendants_count, u.id "user_id", u.username
+        FROM (
+            SELECT p.*, row_number() OVER (PARTITION BY p.parent_id ORDER BY p.created_at DESC, p.id DESC) rn
+            FROM posts p
+            WHERE p.path >= :path AND p.path < :next_path AND p.deleted_at IS NULL
+                AND cardinality(p.path) <= :depth + :max_depth
+        ) s JOIN users u ON u.id = s.owner_id
+        WHERE s.rn <= :limit + 1
+        ORDER BY s.created_at DESC, s.id DESC
 
+        Поддерево узла с путем path одним диапазоном по ix_posts_path, next_path - путь следующего
+        соседа узла. Строки под нераскрытыми (rn = limit + 1) и мягко удаленными узлами отбрасывает
+        comment_tree, так как их родителя нет в выборке; результат совпадает с _tree_stmt.
+        """
+        next_path = path[:-1] + [path[-1] + 1]
         p = aliased(Post, name='p')
-        cte: CTE = select(
-            p.id, p.parent_id, p.text, p.owner_id, p.created_at
-        ).filter(p.id == post_id).cte('cte', recursive=True)
+        subtree = select(
+            p.id,
+            p.parent_id,
+            p.text,
+            p.owner_id,
+            p.created_at,
+            p.descendants_count,
+        ).filter(p.path >= path, p.path < next_path, p.deleted_at.is_(None))
+        if max_depth is not None:
+            subtree = subtree.filter(func.cardinality(p.path) <= len(path) + max_depth)
+        if limit is not None:
+            subtree = subtree.add_columns(func.row_number().over(
+                partition_by=p.parent_id, order_by=(desc(p.created_at), desc(p.id))
+            ).label('rn'))
+        subtree = subtree.subquery('s')
 
-        t = aliased(Post, name='t')
-        cte = cte.union_all(
-            select(
-                t.id, t.parent_id, t.text, t.owner_id, t.created_at
-            ).join(cte, cte.c.id == t.parent_id)
+        stmt = select(
+            subtree.c.created_at,
+            subtree.c.id,
+            subtree.c.parent_id,
+            subtree.c.text,
+            subtree.c.descendants_count,
+            User.id.label('user_id'),
+            User.username
+        ).join(
+            User, User.id == subtree.c.owner_id
+        ).order_by(
+            desc(subtree.c.created_at), desc(subtree.c.id)
         )
+        if limit is not None:
+            stmt = stmt.filter(subtree.c.rn <= limit + 1)
+        return stmt
 
-        stmt: Select = select(
+    @staticmethod
+    def _tree_stmt(anchor: Select, max_depth: int | None, limit: int | None) -> Select:
+        """
+        WITH RECURSIVE cte(id, parent_id, "text", owner_id, created_at, descendants_count, rn, depth) AS (
+                <anchor>
+            UNION ALL
+                SELECT c.id, c.parent_id, c."text", c.owner_id, c.created_at, c.descendants_count, c.rn, cte.depth + 1
+                FROM cte CROSS JOIN LATERAL (
+                    SELECT t.*, row_number() OVER (ORDER BY t.created_at DESC, t.id DESC) rn
+                    FROM posts t WHERE t.parent_id = cte.id AND t.deleted_at IS NULL
+                    ORDER BY t.created_at DESC, t.id DESC
+                    LIMIT :limit + 1
+                ) c
+                WHERE cte.rn <= :limit AND cte.depth < :max_depth
+        )
+        SELECT cte.created_at, cte.id, cte.parent_id, cte."text", cte.descendants_count, u.id "user_id", u.username
+        FROM cte JOIN users u ON u.id = cte.owner_id
+        ORDER BY cte.created_at DESC, cte.id DESC
+
+        Каждый узел раскрывается не больше чем на limit детей (+1 строка, чтобы понять, что есть еще),
+        и не глубже max_depth уровней от anchor.
+        """
+        cte: CTE = anchor.cte('cte', recursive=True)
+
+        t = aliased(Post, name='t')
+        order_by = (desc(t.created_at), desc(t.id))
+        children = select(
+            t.id,
+            t.parent_id,
+            t.text,
+            t.owner_id,
+            t.created_at,
+            t.descendants_count,
+            func.row_number().over(order_by=order_by).label('rn'),
+        ).filter(t.parent_id == cte.c.id, t.deleted_at.is_(None)).order_by(*order_by)
+        if limit is not None:
+            children = children.limit(limit + 1)
+        children = children.lateral('c')
+
+        recursive: Select = select(
+            children.c.id,
+            children.c.parent_id,
+            children.c.text,
+            children.c.owner_id,
+            children.c.created_at,
+            children.c.descendants_count,
+            children.c.rn,
+            cte.c.depth + 1,
+        ).select_from(cte).join(children, true())
+        if limit is not None:
+            recursive = recursive.filter(cte.c.rn <= limit)
+        if max_depth is not None:
+            recursive = recursive.filter(cte.c.depth < max_depth)
+
+        cte = cte.union_all(recursive)
+
+        return select(
             cte.c.created_at,
             cte.c.id,
             cte.c.parent_id,
             cte.c.text,
+            cte.c.descendants_count,
             User.id.label('user_id'),
             User.username
         ).join(
             User, User.id == cte.c.owner_id
         ).order_by(
-            desc(cte.c.created_at)
+            desc(cte.c.created_at), desc(cte.c.id)
         )
 
-        return PostWithComments.from_db_list(
-            (await self._db_session.execute(stmt)).mappings().all()
-        )
+    async def get_single_post(
+        self, post_id: int, max_depth: int | None = None, limit: int | None = None
+    ) -> dict | None:
+        """
+        SELECT p.path, p.descendants_count FROM posts p WHERE p.id = :post_id AND <is_live(p)>
+
+        Пост с деревом комментариев. Поддерево до SUBTREE_RANGE_MAX_NODES узлов читается одним диапазоном
+        по path (_subtree_stmt), большее - рекурсивным запросом (_tree_stmt), который читает только
+        попадающие в ответ узлы. Anchor:
+        SELECT p.id, p.parent_id, p."text", p.owner_id, p.created_at, p.descendants_count, 1 rn, 0 depth
+        FROM posts p WHERE p.id = :post_id
+        """
+        session = await self._read_session()
+        if not (post := (await session.execute(
+            select(Post.path, Post.descendants_count).filter(Post.id == post_id, is_live(Post))
+        )).one_or_none()):
+            return None
+
+        if post.descendants_count <= SUBTREE_RANGE_MAX_NODES:
+            rows = (await session.execute(self._subtree_stmt(post.path, max_depth, limit))).mappings().all()
+            return post_tree(rows, limit=limit)
+
+        p = aliased(Post, name='p')
+        anchor: Select = select(
+            p.id,
+            p.parent_id,
+            p.text,
+            p.owner_id,
+            p.created_at,
+            p.descendants_count,
+            literal(1, BigInteger).label('rn'),
+            literal(0).label('depth'),
+        ).filter(p.id == post_id)
+
+        rows = (await session.execute(self._tree_stmt(anchor, max_depth, limit))).mappings().all()
+        return post_tree(rows, limit=limit)
+
+    async def get_comments(
+        self, post_id: int, limit: int, max_depth: int, after: tuple[datetime, int] | None = None
+    ) -> tuple[list[dict], bool]:
+        """
+        Страница прямых потомков узла post_id после позиции after, каждый со своим поддеревом.
+        См. _tree_stmt. Anchor:
+        SELECT c.*, 1 depth FROM (
+            SELECT p.id, p.parent_id, p."text", p.owner_id, p.created_at, p.descendants_count,
+                row_number() OVER (ORDER BY p.created_at DESC, p.id DESC) rn
+            FROM posts p
+            WHERE p.parent_id = :post_id AND <is_live(p)> AND (p.created_at, p.id) < (:created_at, :id)
+            ORDER BY p.created_at DESC, p.id DESC
+            LIMIT :limit + 1
+        ) c
+        """
+        p = aliased(Post, name='p')
+        order_by = (desc(p.created_at), desc(p.id))
+        page = select(
+            p.id,
+            p.parent_id,
+            p.text,
+            p.owner_id,
+            p.created_at,
+            p.descendants_count,
+            func.row_number().over(order_by=order_by).label('rn'),
+        ).filter(p.parent_id == post_id, is_live(p)).order_by(*order_by).limit(limit + 1)
+        if after is not None:
+            page = page.filter(tuple_(p.created_at, p.id) < tuple_(*after))
+        page = page.subquery('c')
+
+        anchor: Select = select(page, literal(1).label('depth'))
+
+        session = await self._read_session()
+        rows = (await session.execute(self._tree_stmt(anchor, max_depth, limit))).mappings().all()
+        comments = comment_tree(rows, parent_id=post_id, limit=limit)
+        return comments[:limit], len(comments) > limit
+
+    async def search(
+        self, query: str, limit: int, root_id: int | None = None, after: tuple[float, int] | None = None
+    ) -> tuple[list[dict], bool]:
+        """
+        SELECT s.id, s.parent_id, s.root_id, s.created_at, s.rank, u.id "user_id", u.username,
+            ts_headline(
+                'russian', translate(s."text", :sentinels, ''), websearch_to_tsquery('russian', :query), :options
+            ) highlight
+        FROM (
+            SELECT p.id, p.parent_id, p.root_id, p."text", p.created_at, p.owner_id,
+                CAST(ts_rank_cd(p.search_vector, websearch_to_tsquery('russian', :query)) AS FLOAT) rank
+            FROM posts p
+            WHERE p.search_vector @@ websearch_to_tsquery('russian', :query) AND <is_live(p)>
+                AND (p.root_id = :root_id OR p.id = :root_id)
+                AND (rank, p.id) < (:rank, :id)
+            ORDER BY rank DESC, p.id DESC
+            LIMIT :limit + 1
+        ) s JOIN users u ON u.id = s.owner_id
+        ORDER BY s.rank DESC, s.id DESC
+
+        Совпадения ищутся по GIN индексу search_vector, ts_headline считается только для строк страницы.
+        Ранг приводится к double precision, чтобы позиция курсора сравнивалась без потери точности.
+        """
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        rank = cast(func.ts_rank_cd(Post.search_vector, tsquery), Float)
+
+        page = select(
+            Post.id, Post.parent_id, Post.root_id, Post.text, Post.created_at, Post.owner_id, rank.label('rank'),
+        ).filter(Post.search_vector.op('@@')(tsquery), is_live(Post))
+        if root_id is not None:
+            page = page.filter(or_(Post.root_id == root_id, Post.id == root_id))
+        if after is not None:
+            page = page.filter(tuple_(rank, Post.id) < tuple_(*after))
+        page = page.order_by(desc(rank), desc(Post.id)).limit(limit + 1).subquery('s')
+
+        stmt = select(
+            page.c.id,
+            page.c.parent_id,
+            page.c.root_id,
+            page.c.created_at,
+            page.c.rank,
+            func.ts_headline(
+                SEARCH_CONFIG,
+                func.translate(page.c.text, HIGHLIGHT_START + HIGHLIGHT_STOP, ''),
+                tsquery,
+                HEADLINE_OPTIONS,
+            ).label('highlight'),
+            User.id.label('user_id'),
+            User.username,
+        ).join(User, User.id == page.c.owner_id).order_by(desc(page.c.rank), desc(page.c.id))
+
+        data = (await (await self._read_session()).execute(stmt)).mappings().all()
+        return [search_item(row) for row in data[:limit]], len(data) > limit
@@ -1,7 +1,17 @@
+from collections import defaultdict
 from datetime import datetime
-from typing import Optional
+from html import escape
+from typing import Mapping, Sequence
 
-from pydantic import BaseModel, root_validator
+from pydantic import BaseModel, Field, conlist
+
+from backend.core.pagination import encode_cursor
+
+
+# Границы совпадений в ts_headline: управляющие символы, которые вырезаются из текста перед ts_headline
+# и после экранирования текста заменяются на <mark></mark>
+HIGHLIGHT_START: str = '\x02'
+HIGHLIGHT_STOP: str = '\x03'
 
 
 class CreatePost(BaseModel):
@@ -13,6 +23,10 @@ class CreateComment(BaseModel):
     parent_id: int
 
 
+class BulkCreateComments(BaseModel):
+    __root__: conlist(CreateComment, min_items=1, max_items=500)
+
+
 class PostInDB(BaseModel):
     id: int
     created_at: datetime
@@ -20,6 +34,9 @@ class PostInDB(BaseModel):
     owner_id: int
     text: str
     parent_id: int | None
+    root_id: int | None
+    descendants_count: int = 0
+    path: list[int] = []
 
     class Config:
         orm_mode = True
@@ -36,6 +53,14 @@ class Comment(Post):
     parent_id: int
 
 
+class BulkCommentResult(BaseModel):
+    """
+    Результат для одного элемента пакета, в порядке запроса: либо comment, либо error.
+    """
+    comment: Comment | None = None
+    error: str | None = None
+
+
 class User(BaseModel):
     id: int
     username: str
@@ -48,12 +73,6 @@ class PostWithUser(BaseModel):
     comments_count: int
     owner: User
 
-    @root_validator(pre=True)
-    def set_owner(cls, values: dict):
-        if 'owner' not in values:
-            values['owner'] = User(id=values['user_id'], username=values['username'])
-        return values
-
 
 class PostComment(BaseModel):
     id: int
@@ -61,34 +80,127 @@ class PostComment(BaseModel):
     owner: User
     text: str
     comments: list['PostComment'] = []
+    # Курсор для GET /blog/posts/{id}/comments/, если не все дочерние комментарии попали в ответ
+    next_cursor: str | None = None
 
-    @root_validator(pre=True)
-    def set_owner(cls, values: dict):
-        if 'owner' not in values:
-            values['owner'] = User(id=values['user_id'], username=values['username'])
-        return values
 
-    @classmethod
-    def get_comments(cls, post_comments: list[dict], parent_id: int | None = None) -> list['PostComment']:
-        results: list['PostComment'] = []
+class PostWithComments(PostWithUser):
+    comments: list[PostComment] = []
+    next_cursor: str | None = None
 
-        for post_comment in post_comments.copy():
-            if post_comment['parent_id'] == parent_id:
-                item = cls.parse_obj(post_comment)
-                item.comments = cls.get_comments(post_comments, item.id)
-                results.append(item)
-                post_comments.remove(post_comment)
-        return results
 
+class UserPost(BaseModel):
+    id: int
+    parent_id: int | None
+    root_id: int | None
+    text: str
+    created_at: datetime
+    comments_count: int | None = None
 
-class PostWithComments(PostWithUser):
-    comments: list[PostComment] = []
 
-    @classmethod
-    def from_db_list(cls, post_comments: list[dict]) -> Optional['PostWithComments']:
-        data_length = len(post_comments)
-        if comments := PostComment.get_comments(post_comments):
-            return cls(**comments[0].dict(), comments_count=data_length - 1)
+class SearchResult(BaseModel):
+    id: int
+    parent_id: int | None
+    root_id: int | None
+    created_at: datetime
+    owner: User
+    rank: float
+    highlight: str = Field(description='HTML-escaped text fragments with matches wrapped in <mark></mark>')
+
+
+# Модели выше описывают ответы в OpenAPI. Сами ответы ленты и дерева собираются функциями ниже
+# сразу из строк БД в dict той же формы и сериализуются без валидации и jsonable_encoder.
+
+def feed_item(row: Mapping) -> dict:
+    """PostWithUser из строки ленты."""
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created_at': row['created_at'],
+        'comments_count': row['comments_count'],
+        'owner': {'id': row['user_id'], 'username': row['username']},
+    }
+
+
+def user_post_item(row: Mapping, with_counts: bool = False) -> dict:
+    """UserPost из строки, comments_count только если запрошен."""
+    item = {
+        'id': row['id'],
+        'parent_id': row['parent_id'],
+        'root_id': row['root_id'],
+        'text': row['text'],
+        'created_at': row['created_at'],
+    }
+    if with_counts:
+        item['comments_count'] = row['descendants_count']
+    return item
+
+
+def search_item(row: Mapping) -> dict:
+    """SearchResult из строки поиска."""
+    return {
+        'id': row['id'],
+        'parent_id': row['parent_id'],
+        'root_id': row['root_id'],
+        'created_at': row['created_at'],
+        'owner': {'id': row['user_id'], 'username': row['username']},
+        'rank': row['rank'],
+        'highlight': escape(row['highlight']).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>'),
+    }
+
+
+def comment_tree(rows: Sequence[Mapping], parent_id: int | None = None, limit: int | None = None) -> list[dict]:
+    """
+    Дети узла parent_id с поддеревьями в форме PostComment (next_cursor только если есть).
+    Строит дерево за один проход: узлы раскладываются по индексу parent_id -> children,
+    порядок детей сохраняется таким же, как в исходной выборке.
+
+    Если у узла больше limit детей, лишние отбрасываются, а next_cursor указывает на продолжение.
+    Если у узла есть потомки, но дети не выбирались (ограничение глубины),
+    next_cursor указывает на первую страницу детей.
+    """
+    children: dict[int | None, list[dict]] = defaultdict(list)
+    nodes: list[tuple[dict, int]] = []
+
+    for row in rows:
+        node = {
+            'id': row['id'],
+            'created_at': row['created_at'],
+            'owner': {'id': row['user_id'], 'username': row['username']},
+            'text': row['text'],
+        }
+        children[row['parent_id']].append(node)
+        nodes.append((node, row.get('descendants_count', 0)))
+
+    for node, descendants_count in nodes:
+        node_children = children.get(node['id'], [])
+        if limit is not None and len(node_children) > limit:
+            node_children = node_children[:limit]
+            node['next_cursor'] = encode_cursor((node_children[-1]['created_at'], node_children[-1]['id']))
+        elif not node_children and descendants_count:
+            node['next_cursor'] = encode_cursor(None)
+        node['comments'] = node_children
+
+    return children.get(parent_id, [])
+
+
+def post_tree(rows: Sequence[Mapping], limit: int | None = None) -> dict | None:
+    """Пост с деревом комментариев в форме PostWithComments, корень - строка без родителя в выборке."""
+    if not (roots := comment_tree(rows, limit=limit)):
+        return None
+    root = roots[0]
+    root_row = next(row for row in rows if row['id'] == root['id'])
+    post = {
+        'id': root['id'],
+        'text': root['text'],
+        'created_at': root['created_at'],
+        'comments_count': root_row.get('descendants_count', len(rows) - 1),
+        'owner': root['owner'],
+        'comments': root['comments'],
+    }
+    if 'next_cursor' in root:
+        post['next_cursor'] = root['next_cursor']
+    return post
 
 
 class UpdatePost(BaseModel):
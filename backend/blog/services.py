@@ -1,7 +1,16 @@
-from backend.blog.exceptions import PostNotFound
+from datetime import datetime
+
+from backend.auth.repositories import UserRepository
+from backend.blog.exceptions import PostNotFound, UserNotFound
 from backend.blog.repositories import InvalidPostId, PostRepository
-from backend.blog.schemas import Comment, Post, PostWithUser, UpdatePost
+from backend.blog.schemas import BulkCommentResult, Comment, CreateComment, Post, PostInDB, UpdatePost
+from backend.blog.tasks import PURGE_DELETED_POSTS
+from backend.core import settings
+from backend.core.cache import CacheBackend, create_cache
 from backend.core.exceptions import Forbidden
+from backend.core.jobs import JobRepository
+from backend.core.pagination import TotalMode
+from backend.core.serialization import dumps
 
 
 class NotOwner(Exception):
@@ -11,6 +20,23 @@ class NotOwner(Exception):
 class BlogService:
     def __init__(self) -> None:
         self.post_repository: PostRepository = PostRepository()
+        self.user_repository: UserRepository = UserRepository()
+        self.job_repository: JobRepository = JobRepository()
+        self.cache: CacheBackend = create_cache()
+
+    @staticmethod
+    def _post_cache_key(post: PostInDB | int) -> str:
+        if isinstance(post, PostInDB):
+            post = post.root_id or post.id
+        return f'post:{post}'
+
+    async def _invalidate_post(self, post: PostInDB) -> None:
+        """
+        Сбрасывает закешированное дерево корневого поста, к которому относится post.
+        Запись может вернуться устаревшей, если параллельное чтение успеет закешировать дерево
+        до коммита, поэтому время жизни записей ограничено CACHE_POST_TTL.
+        """
+        await self.cache.delete(self._post_cache_key(post))
 
     async def create_post(self, owner_id: int, text: str) -> Post:
         return Post.parse_obj(await self.post_repository.create_post(owner_id, text))
@@ -25,15 +51,106 @@ class BlogService:
         except InvalidPostId:
             return None
         else:
+            await self._invalidate_post(new_comment)
             return Comment.parse_obj(new_comment)
 
-    async def get_all_posts(self, limit: int, offset: int) -> tuple[int, list[PostWithUser]]:
+    async def create_comments(self, owner_id: int, comments: list[CreateComment]) -> list[BulkCommentResult]:
+        created = await self.post_repository.create_comments(
+            owner_id=owner_id,
+            comments=[(comment.text, comment.parent_id) for comment in comments],
+        )
+        if names := {self._post_cache_key(comment) for comment in created if comment}:
+            await self.cache.delete(*names)
+        return [
+            BulkCommentResult(comment=Comment.parse_obj(comment))
+            if comment else BulkCommentResult(error='Invalid parentId')
+            for comment in created
+        ]
+
+    async def get_all_posts(
+        self, limit: int, offset: int, total_mode: TotalMode = TotalMode.EXACT
+    ) -> tuple[int | None, list[dict]]:
         total, items = await self.post_repository.get_all_posts(
             limit=limit,
             offset=offset,
+            total_mode=total_mode,
         )
         return total, items
 
+    async def get_posts_after(
+        self, limit: int, after: tuple[datetime, int] | None
+    ) -> tuple[list[dict], tuple[datetime, int] | None]:
+        items, has_next = await self.post_repository.get_posts_after(limit=limit, after=after)
+        next_position = (items[-1]['created_at'], items[-1]['id']) if has_next else None
+        return items, next_position
+
+    async def get_post_version(self, post_id: int) -> int:
+        if (version := await self.post_repository.get_post_version(post_id=post_id)) is None:
+            raise PostNotFound
+        return version
+
+    async def get_single_post(self, post_id: int, max_depth: int, limit: int, version: int) -> bytes:
+        """
+        JSON поста с деревом комментариев. Read-through кеш: все варианты (max_depth, limit)
+        одного поста хранятся в одной записи и сбрасываются вместе при изменении дерева.
+        Варианты хранятся по version (get_post_version), поэтому дерево, закешированное параллельным
+        чтением до коммита записи, не отдается после нее.
+        """
+        key, field = self._post_cache_key(post_id), f'{version}:{max_depth}:{limit}'
+        if (data := await self.cache.hget(key, field)) is not None:
+            return data
+
+        if not (post := await self.post_repository.get_single_post(post_id=post_id, max_depth=max_depth, limit=limit)):
+            raise PostNotFound
+
+        data = dumps(post)
+        await self.cache.hset(key, field, data, ttl=settings.CACHE.POST_TTL)
+        return data
+
+    async def get_comments(
+        self, post_id: int, limit: int, max_depth: int, after: tuple[datetime, int] | None
+    ) -> tuple[list[dict], tuple[datetime, int] | None]:
+        items, has_next = await self.post_repository.get_comments(
+            post_id=post_id,
+            limit=limit,
+            max_depth=max_depth,
+            after=after,
+        )
+        if not items and not await self.post_repository.get_post_or_comment_in_db(post_id=post_id):
+            raise PostNotFound
+
+        next_position = (items[-1]['created_at'], items[-1]['id']) if has_next else None
+        return items, next_position
+
+    async def get_user_posts(
+        self,
+        user_id: int,
+        limit: int,
+        after: tuple[datetime, int] | None,
+        include_comments: bool = False,
+        with_counts: bool = False,
+    ) -> tuple[list[dict], tuple[datetime, int] | None]:
+        items, has_next = await self.post_repository.get_user_posts(
+            user_id=user_id,
+            limit=limit,
+            after=after,
+            include_comments=include_comments,
+            with_counts=with_counts,
+        )
+        # Пользователь проверяется только для пустой страницы, непустая уже доказывает его существование
+        if not items and not await self.user_repository.get_user_by_id(user_id=user_id):
+            raise UserNotFound
+
+        next_position = (items[-1]['created_at'], items[-1]['id']) if has_next else None
+        return items, next_position
+
+    async def search(
+        self, query: str, limit: int, root_id: int | None, after: tuple[float, int] | None
+    ) -> tuple[list[dict], tuple[float, int] | None]:
+        items, has_next = await self.post_repository.search(query=query, limit=limit, root_id=root_id, after=after)
+        next_position = (items[-1]['rank'], items[-1]['id']) if has_next else None
+        return items, next_position
+
     async def update_post(self, post_id: int, user_id: int, data: UpdatePost):
         if not (post := await self.post_repository.get_post_or_comment_in_db(post_id=post_id, for_update=True)):
             raise PostNotFound
@@ -41,7 +158,9 @@ class BlogService:
         if post.owner_id != user_id:
             raise Forbidden('Only owner have to update post')
 
-        return await self.post_repository.update_post(post_id=post_id, **data.dict())
+        updated_post = await self.post_repository.update_post(post_id=post_id, **data.dict())
+        await self._invalidate_post(updated_post)
+        return updated_post
 
     async def delete_post(self, post_id: int, user_id: int):
         if not (post := await self.post_repository.get_post_or_comment_in_db(post_id=post_id)):
@@ -50,4 +169,10 @@ class BlogService:
         if post.owner_id != user_id:
             raise Forbidden('Only owner have to delete post')
 
-        await self.post_repository.delete_post(post_id=post_id)
+        # Большое поддерево удаляется в фоне (purge_deleted_posts), чтобы не держать блокировки строк в запросе
+        if post.descendants_count > settings.POST_PURGE.SYNC_MAX_DESCENDANTS:
+            await self.post_repository.soft_delete_post(post_id=post_id)
+            await self.job_repository.enqueue(PURGE_DELETED_POSTS)
+        else:
+            await self.post_repository.delete_post(post_id=post_id)
+        await self._invalidate_post(post)
@@ -0,0 +1,51 @@
+import logging
+
+from backend.blog.repositories import PostRepository
+from backend.core import settings
+from backend.core.jobs import JobRepository, job_runner
+from backend.core.metrics import REGISTRY, Counter, Gauge
+
+
+logger = logging.getLogger(__name__)
+
+POSTS_PURGED = REGISTRY.register(Counter(
+    'posts_purged_total', 'Rows removed by the background purge of deleted threads',
+))
+POSTS_PURGE_REMAINING = REGISTRY.register(Gauge(
+    'posts_purge_remaining', 'Descendants left to remove in the last purged thread',
+))
+
+PURGE_DELETED_POSTS = 'blog.purge_deleted_posts'
+
+post_repository = PostRepository()
+job_repository = JobRepository()
+
+
+@job_runner.task(PURGE_DELETED_POSTS)
+async def purge_deleted_posts(batch_size: int = settings.POST_PURGE.BATCH_SIZE) -> None:
+    """
+    Фоновая очистка мягко удаленных поддеревьев (PostRepository.soft_delete_post).
+    Задание удаляет одну пачку и, если было что удалять, ставит себя в очередь снова:
+    каждая пачка - отдельная короткая транзакция, и удаление продолжается после перезапуска.
+    Несколько обработчиков не мешают друг другу: каждый берет свой узел через SKIP LOCKED.
+    """
+    if (purged := await post_repository.purge_deleted_batch(batch_size=batch_size)) is None:
+        return
+
+    post_id, deleted, remaining = purged
+    await job_repository.enqueue(PURGE_DELETED_POSTS, {'batch_size': batch_size})
+    POSTS_PURGED.inc(deleted)
+    POSTS_PURGE_REMAINING.set(remaining)
+    logger.info('Purging post %s: %s rows deleted, %s descendants left', post_id, deleted, remaining)
+
+
+@job_runner.periodic(settings.POST_PURGE.SWEEP_INTERVAL)
+async def schedule_purge() -> None:
+    """
+    Ставит очистку, если удаленные посты остались, а задания для них нет: цепочка заданий
+    прерывается, если задание исчерпало попытки или удаленные строки остались от прошлых версий.
+    Несколько процессов могут поставить задание одновременно: лишнее возьмет другой узел или завершится.
+    """
+    if await post_repository.has_deleted_posts() and not await job_repository.has_pending(PURGE_DELETED_POSTS):
+        logger.info('Scheduling purge of deleted posts')
+        await job_repository.enqueue(PURGE_DELETED_POSTS)
@@ -0,0 +1,78 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from backend.core import settings
+from backend.core.config import CacheConfig
+
+
+class CacheBackend(ABC):
+    """
+    Подмножество команд Redis для хешей: запись name хранит несколько вариантов значения (field),
+    а инвалидация удаляет запись целиком.
+    """
+
+    @abstractmethod
+    async def hget(self, name: str, field: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    async def hset(self, name: str, field: str, value: bytes, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *names: str) -> None:
+        ...
+
+
+class LRUCache(CacheBackend):
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._data: OrderedDict[str, tuple[float, dict[str, bytes]]] = OrderedDict()
+
+    async def hget(self, name: str, field: str) -> bytes | None:
+        if not (entry := self._data.get(name)):
+            return None
+        expires_at, values = entry
+        if expires_at <= time.monotonic():
+            del self._data[name]
+            return None
+        self._data.move_to_end(name)
+        return values.get(field)
+
+    async def hset(self, name: str, field: str, value: bytes, ttl: int) -> None:
+        _, values = self._data.pop(name, (None, {}))
+        values[field] = value
+        self._data[name] = (time.monotonic() + ttl, values)
+        while len(self._data) > self._max_size:
+            self._data.popitem(last=False)
+
+    async def delete(self, *names: str) -> None:
+        for name in names:
+            self._data.pop(name, None)
+
+
+class RedisCache(CacheBackend):
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError:  # pragma: no cover
+            raise RuntimeError('Install redis>=4.2 to use CACHE_BACKEND=redis')
+        self._client = aioredis.from_url(url)
+
+    async def hget(self, name: str, field: str) -> bytes | None:
+        return await self._client.hget(name, field)
+
+    async def hset(self, name: str, field: str, value: bytes, ttl: int) -> None:
+        async with self._client.pipeline(transaction=True) as pipe:
+            await pipe.hset(name, field, value).expire(name, ttl).execute()
+
+    async def delete(self, *names: str) -> None:
+        if names:
+            await self._client.delete(*names)
+
+
+def create_cache(config: CacheConfig = settings.CACHE) -> CacheBackend:
+    if config.BACKEND == 'redis':
+        return RedisCache(config.REDIS_URL)
+    return LRUCache(max_size=config.MAX_SIZE)
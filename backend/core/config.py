@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseSettings, PostgresDsn, validator
 
@@ -22,6 +22,23 @@ class DBConfig(AppBaseConfig):
     SQL_ECHO: bool = False
     URI: PostgresDsn | None = None
 
+    POOL_SIZE: int = 5
+    MAX_OVERFLOW: int = 10
+    POOL_TIMEOUT: float = 30
+    POOL_RECYCLE: int = 1800
+    POOL_PRE_PING: bool = True
+    # Размер кеша подготовленных выражений на соединение, 0 - для работы через pgbouncer
+    STATEMENT_CACHE_SIZE: int = 100
+    # statement_timeout на стороне сервера в миллисекундах, 0 - без ограничения
+    STATEMENT_TIMEOUT: int = 0
+
+    # Реплики для чтения, JSON-список DSN: POSTGRES_REPLICA_URIS='["postgresql+asyncpg://..."]'
+    REPLICA_URIS: list[str] = []
+    # Сколько секунд не обращаться к реплике после ошибки подключения
+    REPLICA_RETRY_AFTER: float = 30
+    # Сколько секунд после записи читать с мастера (read-your-writes между запросами)
+    READ_YOUR_WRITES_SECONDS: int = 5
+
     @validator('URI', pre=True)
     def build_pg_dsn(cls, v: str | None, values: dict[str, Any]) -> str:
         if isinstance(v, str):
@@ -49,17 +66,76 @@ class DBConfig(AppBaseConfig):
 class JWTConfig(AppBaseConfig):
     ALGORITHM: str = 'HS256'
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    # Как часто каждый процесс перечитывает из БД деактивированных пользователей, секунды
+    REVOKED_REFRESH_INTERVAL: float = 5
 
     class Config:
         env_prefix = 'JWT_'
 
 
+class PasswordHashConfig(AppBaseConfig):
+    EXECUTOR: Literal['thread', 'process'] = 'thread'
+    WORKERS: int = 2
+    QUEUE_SIZE: int = 64
+
+    class Config:
+        env_prefix = 'PASSWORD_HASH_'
+
+
+class CacheConfig(AppBaseConfig):
+    BACKEND: Literal['memory', 'redis'] = 'memory'
+    REDIS_URL: str = 'redis://127.0.0.1:6379/0'
+    MAX_SIZE: int = 1024
+    POST_TTL: int = 60
+    USER_TTL: int = 300
+    # Cache-Control ответов с ETag. no-cache: клиенты и CDN хранят ответ, но каждый раз
+    # перепроверяют его через If-None-Match и получают 304, если данные не изменились
+    HTTP_CACHE_CONTROL: str = 'no-cache'
+
+    class Config:
+        env_prefix = 'CACHE_'
+
+
+class JobsConfig(AppBaseConfig):
+    ENABLED: bool = True
+    # Сколько заданий выполняется одновременно в одном процессе
+    CONCURRENCY: int = 4
+    # Пауза между опросами, когда заданий нет, секунды
+    POLL_INTERVAL: float = 1
+    # Сколько секунд задание считается взятым: после падения процесса его возьмет другой
+    LOCK_TIMEOUT: int = 300
+    # Сколько секунд может выполняться обработчик. Меньше LOCK_TIMEOUT с запасом на коммит,
+    # иначе задание возьмет другой процесс, пока первый еще работает
+    TIMEOUT: int = 240
+    MAX_ATTEMPTS: int = 5
+    # Задержка перед повтором, удваивается с каждой попыткой, секунды
+    RETRY_DELAY: float = 5
+
+    class Config:
+        env_prefix = 'JOBS_'
+
+
+class PostPurgeConfig(AppBaseConfig):
+    # Поддерево с большим числом потомков удаляется в фоне, меньшее - сразу в запросе
+    SYNC_MAX_DESCENDANTS: int = 1000
+    BATCH_SIZE: int = 1000
+    # Как часто проверять, что для оставшихся удаленных постов есть задание очистки, секунды
+    SWEEP_INTERVAL: float = 60
+
+    class Config:
+        env_prefix = 'POST_PURGE_'
+
+
 class Settings(AppBaseConfig):
     DEBUG: bool = False
     SECRET_KEY: str
 
     DB = DBConfig()
     JWT = JWTConfig()
+    CACHE = CacheConfig()
+    PASSWORD_HASH = PasswordHashConfig()
+    JOBS = JobsConfig()
+    POST_PURGE = PostPurgeConfig()
 
 
 settings = Settings()
@@ -1,6 +1,15 @@
 from contextvars import ContextVar
+from typing import TYPE_CHECKING
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+if TYPE_CHECKING:
+    from backend.core.middleware import SessionScope
+
+
 SESSION: ContextVar[AsyncSession | None] = ContextVar('SESSION', default=None)
+SESSION_SCOPE: ContextVar['SessionScope | None'] = ContextVar('SESSION_SCOPE', default=None)
+# Метка для метрик запросов к БД: метод репозитория, из которого выполняется запрос
+QUERY_LABEL: ContextVar[str] = ContextVar('QUERY_LABEL', default='unknown')
+REQUEST_ID: ContextVar[str | None] = ContextVar('REQUEST_ID', default=None)
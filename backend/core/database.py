@@ -1,14 +1,163 @@
-from sqlalchemy import Column, DateTime, func
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+import itertools
+import logging
+import time
+from typing import Callable, Sequence
+
+from sqlalchemy import Column, DateTime, event, exc, func
+from sqlalchemy.engine import Engine, ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from backend.core import settings
+from backend.core.config import DBConfig
+from backend.core.context_vars import QUERY_LABEL
+from backend.core.metrics import REGISTRY, Counter, Gauge, Histogram
+
+
+logger = logging.getLogger(__name__)
+
+POOL_CHECKOUT_SECONDS = REGISTRY.register(Histogram(
+    'db_pool_checkout_seconds', 'Time spent waiting for a connection from the pool', labels=['engine'],
+))
+POOL_TIMEOUTS = REGISTRY.register(Counter(
+    'db_pool_timeouts_total', 'Connection checkouts failed by pool timeout', labels=['engine'],
+))
+
+
+QUERY_DURATION_SECONDS = REGISTRY.register(Histogram(
+    'db_query_duration_seconds', 'Database query duration by repository method', labels=['method'],
+))
+QUERY_ERRORS = REGISTRY.register(Counter(
+    'db_query_errors_total', 'Failed database queries by repository method', labels=['method'],
+))
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany) -> None:
+    context.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany) -> None:
+    QUERY_DURATION_SECONDS.observe(time.perf_counter() - context.query_started, method=QUERY_LABEL.get())
+
+
+@event.listens_for(Engine, 'handle_error')
+def _query_failed(exception_context: ExceptionContext) -> None:
+    QUERY_ERRORS.inc(method=QUERY_LABEL.get())
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, который замеряет ожидание свободного соединения.
+    Метка engine берется из имени пула (pool_logging_name в create_engine).
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc(engine=self.logging_name)
+            raise
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, engine=self.logging_name)
+
 
+def create_engine(config: DBConfig = settings.DB, uri: str | None = None, name: str = 'primary') -> AsyncEngine:
+    return create_async_engine(
+        uri or config.URI,
+        echo=config.SQL_ECHO,
+        poolclass=InstrumentedPool,
+        pool_logging_name=name,
+        pool_size=config.POOL_SIZE,
+        max_overflow=config.MAX_OVERFLOW,
+        pool_timeout=config.POOL_TIMEOUT,
+        pool_recycle=config.POOL_RECYCLE,
+        pool_pre_ping=config.POOL_PRE_PING,
+        connect_args={
+            'prepared_statement_cache_size': config.STATEMENT_CACHE_SIZE,
+            'statement_cache_size': config.STATEMENT_CACHE_SIZE,
+            'server_settings': {'statement_timeout': str(config.STATEMENT_TIMEOUT)},
+        },
+    )
 
-async_engine = create_async_engine(settings.DB.URI, echo=settings.DB.SQL_ECHO)
+
+async_engine = create_engine()
 async_session = sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
 
 
+class ReplicaSet:
+    """
+    Реплики для чтения. Сессии выдаются по кругу; реплика, к которой не удалось подключиться,
+    пропускается REPLICA_RETRY_AFTER секунд. Транзакция на реплике сразу открывается
+    в REPEATABLE READ: запись туда невозможна, а все чтения запроса видят один снимок.
+    """
+
+    def __init__(self, session_factories: Sequence[sessionmaker], retry_after: float = settings.DB.REPLICA_RETRY_AFTER):
+        self._session_factories = list(session_factories)
+        self._retry_after = retry_after
+        self._down_until: dict[int, float] = {}
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self._session_factories)
+
+    def is_down(self, index: int) -> bool:
+        return self._down_until.get(index, 0) > time.monotonic()
+
+    async def session(self) -> AsyncSession | None:
+        start = next(self._counter)
+        for i in range(len(self._session_factories)):
+            index = (start + i) % len(self._session_factories)
+            if self.is_down(index):
+                continue
+
+            session: AsyncSession = self._session_factories[index]()
+            try:
+                await session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+            except (OSError, asyncio.TimeoutError, exc.DBAPIError) as e:
+                logger.warning('Replica %s is unavailable: %s', index, e)
+                self._down_until[index] = time.monotonic() + self._retry_after
+                await session.close()
+                continue
+
+            session.info['snapshot'] = True
+            return session
+        return None
+
+
+replica_engines = [create_engine(uri=uri, name=f'replica_{i}') for i, uri in enumerate(settings.DB.REPLICA_URIS)]
+replica_set = ReplicaSet([
+    sessionmaker(engine, expire_on_commit=False, class_=AsyncSession) for engine in replica_engines
+])
+
+# Пулы по метке engine: primary и replica_<номер в POSTGRES_REPLICA_URIS>
+POOL_ENGINES: dict[str, AsyncEngine] = {
+    engine.sync_engine.pool.logging_name: engine for engine in (async_engine, *replica_engines)
+}
+
+
+def _pool_stat(stat: Callable[[QueuePool], int]) -> Callable[[], dict[tuple[str, ...], float]]:
+    return lambda: {(name,): stat(engine.sync_engine.pool) for name, engine in POOL_ENGINES.items()}
+
+
+REGISTRY.register(Gauge(
+    'db_pool_size', 'Configured size of the connection pool', labels=['engine'],
+    callback=_pool_stat(lambda pool: pool.size()),
+))
+REGISTRY.register(Gauge(
+    'db_pool_checked_out', 'Connections currently checked out from the pool', labels=['engine'],
+    callback=_pool_stat(lambda pool: pool.checkedout()),
+))
+REGISTRY.register(Gauge(
+    'db_pool_overflow', 'Connections opened over pool size', labels=['engine'],
+    callback=_pool_stat(lambda pool: max(pool.overflow(), 0)),
+))
+
+
 class TimestampMixin:
     created_at = Column(DateTime, server_default=func.statement_timestamp(), nullable=False)
     updated_at = Column(DateTime, server_default=func.statement_timestamp(), onupdate=func.now(), nullable=False)
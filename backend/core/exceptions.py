@@ -19,3 +19,13 @@ class BadRequest(BaseAppException):
 
 class Forbidden(BaseAppException):
     status_code: int = status.HTTP_403_FORBIDDEN
+
+
+class ServiceUnavailable(BaseAppException):
+    message = 'Service is busy, try again later'
+    status_code: int = status.HTTP_503_SERVICE_UNAVAILABLE
+    headers = {'Retry-After': '1'}
+
+
+class InvalidCursor(BadRequest):
+    message = 'Invalid cursor'
@@ -0,0 +1,44 @@
+import hashlib
+
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import Response
+
+from backend.core import settings
+from backend.core.serialization import FastJSONResponse
+
+
+def body_etag(body: bytes) -> str:
+    """Сильный ETag по содержимому ответа."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Совпадает ли etag с одним из значений If-None-Match. Для If-None-Match сравнение слабое (RFC 9110),
+    поэтому префикс W/ не учитывается: прокси, сжимающие ответ, помечают ETag слабым.
+    """
+    if not (header := request.headers.get('if-none-match')):
+        return False
+    candidates = {candidate.strip().removeprefix('W/') for candidate in header.split(',')}
+    return '*' in candidates or etag in candidates
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    return {'ETag': etag, 'Cache-Control': settings.CACHE.HTTP_CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+
+
+def conditional_response(request: Request, body: bytes, etag: str | None = None) -> Response:
+    """
+    JSON body с ETag (по умолчанию - по содержимому) или 304 без тела, если у клиента та же версия.
+    Экономит передачу, но не построение ответа: если версию можно узнать дешевле,
+    чем собрать body, ее нужно проверить через etag_matches до сборки.
+    """
+    etag = etag or body_etag(body)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return FastJSONResponse(body, headers=cache_headers(etag))
@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from pydantic import BaseModel
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend.core import settings
+from backend.core.context_vars import SESSION
+from backend.core.database import async_session
+from backend.core.metrics import REGISTRY, Counter, Histogram
+from backend.core.repository import BaseRepository
+from backend.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+JOBS_PROCESSED = REGISTRY.register(Counter(
+    'jobs_processed_total', 'Background jobs processed by name and outcome', labels=['name', 'status'],
+))
+JOB_DURATION_SECONDS = REGISTRY.register(Histogram(
+    'job_duration_seconds', 'Background job handler duration', labels=['name'],
+))
+
+JobHandler = Callable[..., Awaitable[None]]
+
+
+class JobInDB(BaseModel):
+    id: int
+    name: str
+    payload: dict[str, Any]
+    attempts: int
+    max_attempts: int
+
+    class Config:
+        orm_mode = True
+
+
+class JobRepository(BaseRepository):
+
+    async def enqueue(
+        self,
+        name: str,
+        payload: dict[str, Any] | None = None,
+        run_at: datetime | None = None,
+        max_attempts: int = settings.JOBS.MAX_ATTEMPTS,
+    ) -> int:
+        """
+        INSERT INTO jobs (name, payload, run_at, max_attempts)
+        VALUES (:name, :payload, coalesce(:run_at, now()), :max_attempts) RETURNING jobs.id
+
+        Задание фиксируется вместе с текущей транзакцией: если запрос откатится, задания не будет.
+        """
+        return (await self._db_session.execute(
+            insert(Job).values(
+                name=name, payload=payload or {}, run_at=run_at or func.now(), max_attempts=max_attempts,
+            ).returning(Job.id)
+        )).scalar_one()
+
+    async def claim(self, limit: int, lock_timeout: int) -> list[JobInDB]:
+        """
+        UPDATE jobs SET attempts = attempts + 1, locked_until = now() + :lock_timeout
+        WHERE jobs.id IN (
+            SELECT j.id FROM jobs j
+            WHERE j.status = 'pending' AND j.run_at <= now() AND (j.locked_until IS NULL OR j.locked_until < now())
+            ORDER BY j.run_at LIMIT :limit FOR UPDATE SKIP LOCKED
+        ) RETURNING jobs.id, jobs.name, jobs.payload, jobs.attempts, jobs.max_attempts
+
+        Берет до limit готовых заданий на lock_timeout секунд. Параллельные обработчики
+        получают разные задания (SKIP LOCKED); задание упавшего процесса снова станет доступно
+        после locked_until.
+        """
+        ready = select(Job.id).filter(
+            Job.status == 'pending',
+            Job.run_at <= func.now(),
+            (Job.locked_until.is_(None)) | (Job.locked_until < func.now()),
+        ).order_by(Job.run_at).limit(limit).with_for_update(skip_locked=True)
+
+        rows = (await self._db_session.execute(
+            update(Job).values(
+                attempts=Job.attempts + 1,
+                locked_until=func.now() + timedelta(seconds=lock_timeout),
+            ).filter(Job.id.in_(ready.scalar_subquery())).returning(
+                Job.id, Job.name, Job.payload, Job.attempts, Job.max_attempts
+            ).execution_options(synchronize_session=False)
+        )).all()
+        return [JobInDB.from_orm(row) for row in rows]
+
+    async def has_pending(self, name: str) -> bool:
+        """
+        SELECT EXISTS (SELECT jobs.id FROM jobs WHERE jobs.name = :name AND jobs.status = 'pending')
+        """
+        return await self._db_session.scalar(
+            select(select(Job.id).filter(Job.name == name, Job.status == 'pending').exists())
+        )
+
+    async def complete(self, job_id: int) -> None:
+        """
+        DELETE FROM jobs WHERE jobs.id = :job_id
+        """
+        await self._db_session.execute(delete(Job).filter(Job.id == job_id))
+
+    async def fail(self, job: JobInDB, error: str, retry_in: float | None) -> bool:
+        """
+        UPDATE jobs SET status = :status, run_at = now() + :retry_in, locked_until = NULL, last_error = :error
+        WHERE jobs.id = :job_id
+
+        Возвращает задание в очередь через retry_in секунд. Если попытки исчерпаны или retry_in None,
+        задание помечается failed и остается в таблице для разбора. Возвращает True, если будет повтор.
+        """
+        retry = retry_in is not None and job.attempts < job.max_attempts
+        await self._db_session.execute(
+            update(Job).values(
+                status='pending' if retry else 'failed',
+                run_at=func.now() + timedelta(seconds=retry_in or 0),
+                locked_until=None,
+                last_error=error,
+            ).filter(Job.id == job.id)
+        )
+        return retry
+
+
+class JobRunner:
+    """
+    Обработчик отложенных заданий из таблицы jobs внутри процесса приложения.
+
+    Задания ставятся через JobRepository.enqueue в транзакции запроса, обработчики
+    регистрируются декоратором task. Одновременно выполняется не больше concurrency заданий,
+    каждое в своей транзакции вместе с удалением из очереди и не дольше timeout секунд.
+    При ошибке задание повторяется с экспоненциальной задержкой retry_delay * 2 ** (попытка - 1),
+    пока не исчерпает max_attempts.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = async_session,
+        concurrency: int = settings.JOBS.CONCURRENCY,
+        poll_interval: float = settings.JOBS.POLL_INTERVAL,
+        lock_timeout: int = settings.JOBS.LOCK_TIMEOUT,
+        timeout: float = settings.JOBS.TIMEOUT,
+        retry_delay: float = settings.JOBS.RETRY_DELAY,
+    ):
+        if timeout >= lock_timeout:
+            raise ValueError('Job timeout must be less than lock timeout')
+        self.job_repository: JobRepository = JobRepository()
+        self.handlers: dict[str, JobHandler] = {}
+        self.periodic_tasks: list[tuple[float, Callable[[], Awaitable[None]]]] = []
+        self._session_factory = session_factory
+        self._concurrency = concurrency
+        self._poll_interval = poll_interval
+        self._lock_timeout = lock_timeout
+        self._timeout = timeout
+        self._retry_delay = retry_delay
+        self._slots: asyncio.Semaphore | None = None
+        self._task: asyncio.Task | None = None
+        self._periodic: list[asyncio.Task] = []
+        self._running: set[asyncio.Task] = set()
+
+    def task(self, name: str) -> Callable[[JobHandler], JobHandler]:
+        """Регистрирует обработчик заданий name. Обработчик получает payload именованными аргументами."""
+        def decorator(handler: JobHandler) -> JobHandler:
+            self.handlers[name] = handler
+            return handler
+
+        return decorator
+
+    def periodic(self, interval: float) -> Callable[[JobHandler], JobHandler]:
+        """
+        Регистрирует функцию, которая вызывается при старте и затем раз в interval секунд в своей транзакции.
+        Выполняется в каждом процессе, поэтому должна быть идемпотентной: обычно она только ставит задания.
+        """
+        def decorator(func: JobHandler) -> JobHandler:
+            self.periodic_tasks.append((interval, func))
+            return func
+
+        return decorator
+
+    async def _run_periodic(self, interval: float, func: Callable[[], Awaitable[None]]) -> None:
+        while True:
+            try:
+                async with self._session_factory() as session:
+                    token = SESSION.set(session)
+                    try:
+                        await func()
+                        await session.commit()
+                    finally:
+                        SESSION.reset(token)
+            except Exception as e:
+                logger.exception(e)
+            await asyncio.sleep(interval)
+
+    async def _claim(self) -> JobInDB | None:
+        async with self._session_factory() as session:
+            token = SESSION.set(session)
+            try:
+                jobs = await self.job_repository.claim(limit=1, lock_timeout=self._lock_timeout)
+                await session.commit()
+            finally:
+                SESSION.reset(token)
+        return jobs[0] if jobs else None
+
+    async def _handle(self, job: JobInDB, session: AsyncSession) -> str:
+        if (handler := self.handlers.get(job.name)) is None:
+            logger.error('Job %s has no handler: %s', job.id, job.name)
+            error, retry_in = f'Unknown job {job.name}', None
+        else:
+            try:
+                # Задание взято только на lock_timeout: дольше обработчик работать не должен,
+                # иначе его параллельно выполнит другой процесс
+                await asyncio.wait_for(handler(**job.payload), timeout=self._timeout)
+                await self.job_repository.complete(job.id)
+                await session.commit()
+                return 'done'
+            except Exception as e:
+                logger.exception('Job %s (%s) failed on attempt %s', job.id, job.name, job.attempts)
+                await session.rollback()
+                error, retry_in = repr(e), self._retry_delay * 2 ** (job.attempts - 1)
+
+        retry = await self.job_repository.fail(job, error=error, retry_in=retry_in)
+        await session.commit()
+        return 'retry' if retry else 'failed'
+
+    async def execute(self, job: JobInDB) -> str:
+        """
+        Выполняет задание в одной транзакции с его удалением из очереди.
+        Возвращает итог: done, retry или failed.
+        """
+        started = time.perf_counter()
+        async with self._session_factory() as session:
+            token = SESSION.set(session)
+            try:
+                status = await self._handle(job, session)
+            finally:
+                SESSION.reset(token)
+
+        JOBS_PROCESSED.inc(name=job.name, status=status)
+        JOB_DURATION_SECONDS.observe(time.perf_counter() - started, name=job.name)
+        return status
+
+    async def _execute(self, job: JobInDB) -> None:
+        try:
+            await self.execute(job)
+        except Exception as e:
+            # Задание останется взятым до locked_until и будет выполнено повторно
+            logger.exception(e)
+        finally:
+            self._slots.release()
+
+    async def run(self) -> None:
+        self._slots = asyncio.Semaphore(self._concurrency)
+        while True:
+            await self._slots.acquire()
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.exception(e)
+                job = None
+
+            if job is None:
+                self._slots.release()
+                await asyncio.sleep(self._poll_interval)
+                continue
+
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+        self._periodic = [asyncio.create_task(self._run_periodic(*task)) for task in self.periodic_tasks]
+
+    async def stop(self) -> None:
+        """Останавливает опрос и прерывает выполняемые задания: они повторятся после locked_until."""
+        tasks = [task for task in (self._task, *self._periodic, *self._running) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task, self._periodic = None, []
+
+
+job_runner = JobRunner()
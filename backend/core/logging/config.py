@@ -8,28 +8,36 @@ log_config = {
         'health_check': {
             '()': 'backend.core.logging.filters.HealthCheckFilter'
         },
+        'request_id': {
+            '()': 'backend.core.logging.filters.RequestIdFilter'
+        },
     },
     'formatters': {
-        'default': {
-            'format': '%(asctime)s - %(levelname)s - %(message)s',
-            'datefmt': '%Y-%m-%d %H:%M:%S',
+        'json': {
+            '()': 'backend.core.logging.formatters.JsonFormatter',
         },
     },
     'handlers': {
         'console': {
             'level': 'DEBUG',
-            'formatter': 'default',
+            'formatter': 'json',
             'class': 'logging.StreamHandler',
-            'filters': ['health_check'],
+        },
+        # Фильтры стоят на очереди: отброшенные записи не попадают в очередь,
+        # а request id берется из контекста запроса до передачи в другой поток
+        'queue': {
+            '()': 'backend.core.logging.handlers.QueueListenerHandler',
+            'handlers': ['cfg://handlers.console'],
+            'filters': ['health_check', 'request_id'],
         },
     },
     'loggers': {
         'backend': {
-            'handlers': ['console'],
+            'handlers': ['queue'],
             'level': 'DEBUG' if settings.DEBUG else 'INFO'
         },
         'uvicorn.access': {
-            'handlers': ['console'],
+            'handlers': ['queue'],
             'level': 'INFO'
         }
     },
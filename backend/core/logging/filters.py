@@ -1,7 +1,30 @@
 import logging
 
+from backend.core.context_vars import REQUEST_ID
+
 
 class HealthCheckFilter(logging.Filter):
+    """
+    Отбрасывает строки access-лога health check. Путь берется из аргументов записи
+    (uvicorn.access: client_addr, method, path, http_version, status) или из extra path,
+    без форматирования сообщения.
+    """
+    path: str = '/ping/'
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if (path := getattr(record, 'path', None)) is None:
+            args = record.args
+            path = args[2] if isinstance(args, tuple) and len(args) == 5 else None
+        return path != self.path
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Запоминает request id в записи. Должен стоять на QueueHandler: контекст запроса
+    доступен только в потоке, который пишет в лог, а не в потоке QueueListener.
+    """
 
-    def filter(self, record) -> bool:
-        return record.getMessage().find('/ping/') == -1
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id'):
+            record.request_id = REQUEST_ID.get()
+        return True
@@ -0,0 +1,27 @@
+import json
+import logging
+from datetime import datetime, timezone
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Одна запись - один JSON-объект в строке. Поля запроса (request_id, route, status, duration...)
+    добавляются, если они есть в записи.
+    """
+    extra_fields: tuple[str, ...] = ('request_id', 'method', 'path', 'route', 'status', 'duration')
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in self.extra_fields:
+            if (value := getattr(record, field, None)) is not None:
+                data[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc_info'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
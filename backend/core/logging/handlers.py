@@ -0,0 +1,45 @@
+import copy
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Sequence
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Кладет записи в очередь, а пишет их в handlers отдельный поток QueueListener,
+    так что логирование не блокирует event loop на вводе-выводе.
+
+    handlers - объекты обработчиков, в dictConfig - ссылки cfg://handlers.<name>. dictConfig создает
+    обработчики в алфавитном порядке имен, поэтому целевые обработчики должны называться раньше этого.
+    """
+
+    def __init__(self, handlers: Sequence[logging.Handler], queue_size: int = -1):
+        super().__init__(queue.Queue(queue_size))
+        # Ссылки cfg:// в списке из dictConfig разрешаются при обращении по индексу, а не при итерации
+        targets = [handlers[i] for i in range(len(handlers))]
+        if invalid := [target for target in targets if not isinstance(target, logging.Handler)]:
+            raise ValueError(f'Target handlers are not configured yet: {invalid}')
+        self.listener = QueueListener(self.queue, *targets, respect_handler_level=True)
+        self.listener.start()
+        self._stopped = False
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        В отличие от QueueHandler.prepare не склеивает traceback с сообщением,
+        чтобы JsonFormatter вывел его отдельным полем.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def close(self) -> None:
+        # Вызывается из logging.shutdown при выходе и при повторном dictConfig
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+        super().close()
@@ -0,0 +1,182 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Mapping
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(ABC):
+    """
+    Метрика в формате Prometheus text exposition. Значения хранятся по кортежу значений меток.
+    """
+    type: str = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names: tuple[str, ...] = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        ...
+
+    def render(self) -> str:
+        return '\n'.join([
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+            *self.samples(),
+        ])
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        values = self._values or ({(): 0} if not self.label_names else {})
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+
+
+class Gauge(Metric):
+    """
+    Значение либо выставляется через set/inc, либо вычисляется функцией callback при каждом чтении.
+    У метрики с метками callback возвращает значения по кортежам значений меток.
+    """
+    type = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        callback: Callable[[], float | Mapping[tuple[str, ...], float]] | None = None,
+    ):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def _current(self) -> dict[tuple[str, ...], float]:
+        if self._callback is None:
+            return self._values
+        if self.label_names:
+            return dict(self._callback())
+        return {(): self._callback()}
+
+    def get(self, **labels: str) -> float:
+        return self._current().get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        values = self._current() or ({(): 0} if not self.label_names else {})
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+
+
+class Histogram(Metric):
+    type = 'histogram'
+    DEFAULT_BUCKETS: tuple[float, ...] = (
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+    )
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets: tuple[float, ...] = (*sorted(buckets), math.inf)
+        # По каждому набору меток: счетчики корзин, сумма, количество
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            total[0] += value
+
+    def get_count(self, **labels: str) -> int:
+        if not (entry := self._values.get(self._key(labels))):
+            return 0
+        return sum(entry[0])
+
+    def samples(self) -> Iterable[str]:
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, le=_format_value(bound))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.label_names, key)
+            yield f'{self.name}_sum{labels} {_format_value(total[0])}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = Registry()
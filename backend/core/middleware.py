@@ -1,34 +1,238 @@
 import logging
+import time
+import uuid
 
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, sessionmaker
 from starlette import status
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from backend.core.context_vars import SESSION
-from backend.core.database import async_session
+from backend.core import settings
+from backend.core.context_vars import REQUEST_ID, SESSION_SCOPE
+from backend.core.database import ReplicaSet, async_session, replica_set
+from backend.core.metrics import REGISTRY, Gauge, Histogram
 
 
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('backend.access')
 
+REQUEST_DURATION_SECONDS = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request duration by route template',
+    labels=['method', 'route', 'status'],
+))
+REQUESTS_IN_PROGRESS = REGISTRY.register(Gauge(
+    'http_requests_in_progress', 'HTTP requests currently being processed',
+))
 
-class SessionMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        response = JSONResponse(
+
+class SessionScope:
+    """
+    Сессия БД на время запроса. Создается при первом обращении репозитория,
+    так что запросы, которые не ходят в БД, не занимают соединение из пула.
+
+    Чтения уходят на реплику, пока в запросе не было записи и клиент не записывал
+    недавно (sticky). Если реплик нет или все недоступны, читаем с мастера.
+    """
+
+    def __init__(self, session_factory: sessionmaker, replicas: ReplicaSet | None = None, sticky: bool = False):
+        self._session_factory = session_factory
+        self._session: AsyncSession | None = None
+        self._has_writes: bool = False
+        self._replicas = replicas
+        self._read_session: AsyncSession | None = None
+        self.sticky = sticky
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+            event.listen(self._session.sync_session, 'do_orm_execute', self._track_writes)
+        return self._session
+
+    def _track_writes(self, orm_execute_state: ORMExecuteState) -> None:
+        # Только DML: text() (например EXPLAIN из _estimate_rows) не считается записью
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            self._has_writes = True
+
+    @property
+    def has_writes(self) -> bool:
+        if self._session is None:
+            return False
+        sync_session = self._session.sync_session
+        return self._has_writes or bool(sync_session.new or sync_session.dirty or sync_session.deleted)
+
+    async def get_read_session(self) -> AsyncSession:
+        if self.sticky or self.has_writes or not self._replicas:
+            return self.session
+        if self._read_session is None:
+            self._read_session = await self._replicas.session()
+        return self._read_session or self.session
+
+    async def commit(self) -> None:
+        if self.has_writes:
+            await self._session.commit()
+            self._has_writes = False
+
+    async def rollback(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
+            self._has_writes = False
+
+    async def close(self) -> None:
+        if self._read_session is not None:
+            await self._read_session.close()
+        if self._session is not None:
+            await self._session.close()
+
+
+class SessionMiddleware:
+    """
+    Чистый ASGI middleware: открывает SessionScope на запрос и коммитит изменения
+    перед отправкой заголовков ответа, чтобы клиент не получил 2xx для неудавшегося коммита.
+
+    При наличии реплик после записи выставляет cookie, по которой следующие запросы клиента
+    в течение READ_YOUR_WRITES_SECONDS читают с мастера.
+    """
+    sticky_cookie: str = 'primary_until'
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _is_sticky(self, scope: Scope) -> bool:
+        try:
+            return float(Request(scope).cookies.get(self.sticky_cookie, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _sticky_cookie_header(self) -> tuple[bytes, bytes]:
+        max_age = settings.DB.READ_YOUR_WRITES_SECONDS
+        value = f'{self.sticky_cookie}={time.time() + max_age:.3f}; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax'
+        return b'set-cookie', value.encode('latin-1')
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        session_scope = SessionScope(async_session, replicas=replica_set, sticky=self._is_sticky(scope))
+        token = SESSION_SCOPE.set(session_scope)
+        response_started = False
+        response_replaced = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started, response_replaced
+
+            if response_replaced:
+                return
+            if message['type'] == 'http.response.start':
+                response_started = True
+                try:
+                    has_writes = session_scope.has_writes
+                    await session_scope.commit()
+                    if has_writes and replica_set:
+                        message['headers'] = [*message.get('headers', []), self._sticky_cookie_header()]
+                except Exception as e:
+                    logger.exception(e)
+                    await session_scope.rollback()
+                    response_replaced = True
+                    return await self._error_response(scope, receive, send)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:  # pragma: no cover
+            logger.exception(e)
+            await session_scope.rollback()
+            if not response_started:
+                await self._error_response(scope, receive, send)
+        finally:
+            await session_scope.close()
+            SESSION_SCOPE.reset(token)
+
+    @staticmethod
+    async def _error_response(scope: Scope, receive: Receive, send: Send) -> None:
+        await JSONResponse(
             content={'error': 'Something went wrong'},
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
-
-        async with async_session() as db_session:
-
-            SESSION.set(db_session)
-            try:
-                response = await call_next(request)
-                await db_session.commit()
-            except Exception as e:  # pragma: no cover
-                logger.debug(e)
-                await db_session.rollback()
-            finally:
-                await db_session.close()
-                SESSION.set(None)
-                return response
+        )(scope, receive, send)
+
+
+class MetricsMiddleware:
+    """
+    Латентность запросов по шаблону маршрута (/blog/posts/{post_id}/, а не конкретный путь,
+    чтобы не плодить серии) и количество запросов в обработке.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            REQUEST_DURATION_SECONDS.observe(
+                time.perf_counter() - started, method=scope['method'], route=route, status=status_code,
+            )
+
+
+class AccessLogMiddleware:
+    """
+    Выставляет request id (из заголовка X-Request-ID или новый) в контекст логов и в ответ
+    и пишет строку access-лога с маршрутом, статусом и длительностью запроса.
+    Заменяет access-лог uvicorn (запускать с --no-access-log).
+    """
+    request_id_header: str = 'x-request-id'
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        request_id = Request(scope).headers.get(self.request_id_header, '')[:128] or uuid.uuid4().hex
+        token = REQUEST_ID.set(request_id)
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                message['headers'] = [
+                    *message.get('headers', []), (self.request_id_header.encode(), request_id.encode('latin-1')),
+                ]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            access_logger.info(
+                '%s %s %s', scope['method'], scope['path'], status_code,
+                extra={
+                    'method': scope['method'],
+                    'path': scope['path'],
+                    'route': getattr(scope.get('route'), 'path', None),
+                    'status': status_code,
+                    'duration': round(duration, 6),
+                },
+            )
+            REQUEST_ID.reset(token)
@@ -1,28 +1,136 @@
-from typing import Generic, Sequence, TypeVar
+import base64
+import binascii
+import json
+from enum import Enum, unique
+from typing import Any, Generic, Sequence, TypeVar
 
 from fastapi import Query
+from fastapi.encoders import jsonable_encoder
+from pydantic import Extra, ValidationError, parse_obj_as
 from pydantic.generics import GenericModel
 
+from backend.core.exceptions import InvalidCursor
+
 
 T = TypeVar('T')
 
 
+@unique
+class TotalMode(Enum):
+    EXACT = 'exact'
+    ESTIMATED = 'estimated'
+    NONE = 'none'
+
+
 class Page(GenericModel, Generic[T]):
     limit: int = 10
     offset: int = 0
-    total: int = 0
+    total: int | None = 0
+    exact_total: bool = True
     items: Sequence[T]
 
+    class Config:
+        # Страницы отдаются через Union в response_model, лишние поля не дают спутать их друг с другом
+        extra = Extra.forbid
+
+
+class CursorPage(GenericModel, Generic[T]):
+    limit: int = 10
+    next_cursor: str | None = None
+    items: Sequence[T]
+
+    class Config:
+        extra = Extra.forbid
+
 
 class LimitOffsetPagination:
-    def __init__(self, limit: int = Query(10, ge=1), offset: int = Query(0, ge=0)):
+    def __init__(
+        self,
+        limit: int = Query(10, ge=1),
+        offset: int = Query(0, ge=0),
+        with_total: bool = Query(True, description='Set to false to skip counting total'),
+        estimated_total: bool = Query(False, description='Return planner row estimate instead of exact total'),
+    ):
         self.limit = limit
         self.offset = offset
+        self.with_total = with_total
+        self.estimated_total = estimated_total
+
+    @property
+    def total_mode(self) -> TotalMode:
+        if not self.with_total:
+            return TotalMode.NONE
+        if self.estimated_total:
+            return TotalMode.ESTIMATED
+        return TotalMode.EXACT
 
-    def paginate(self, items: Sequence[T], total: int) -> Page[T]:
-        return Page(
+    def paginate(self, items: Sequence[T], total: int | None) -> Page[T]:
+        # items уже в форме ответа (см. FastJSONResponse), поэтому страница собирается без валидации
+        return Page.construct(
             limit=self.limit,
             offset=self.offset,
             total=total,
+            exact_total=self.total_mode is TotalMode.EXACT,
             items=items
         )
+
+
+def encode_cursor(position: Sequence[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(jsonable_encoder(position)).encode()).decode()
+
+
+def decode_cursor(cursor: str, position_type: Any) -> Any:
+    try:
+        return parse_obj_as(position_type, json.loads(base64.urlsafe_b64decode(cursor.encode())))
+    except (binascii.Error, ValueError, ValidationError):
+        raise InvalidCursor
+
+
+class CursorPagination(LimitOffsetPagination):
+    """
+    Keyset-пагинация поверх LimitOffsetPagination: если передан cursor, offset игнорируется,
+    а следующая страница начинается строго после позиции, зашитой в курсор.
+    Пустой cursor означает первую страницу в режиме курсора.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(10, ge=1),
+        offset: int = Query(0, ge=0),
+        with_total: bool = Query(True, description='Set to false to skip counting total'),
+        estimated_total: bool = Query(False, description='Return planner row estimate instead of exact total'),
+        cursor: str | None = Query(None, description='Opaque next_cursor from the previous page'),
+    ):
+        super().__init__(limit=limit, offset=offset, with_total=with_total, estimated_total=estimated_total)
+        self.cursor = cursor
+
+    @property
+    def by_cursor(self) -> bool:
+        return self.cursor is not None
+
+    def get_position(self, position_type: Any) -> Any | None:
+        if not self.cursor:
+            return None
+        return decode_cursor(self.cursor, position_type)
+
+    def paginate_by_cursor(self, items: Sequence[T], next_position: Sequence[Any] | None) -> CursorPage[T]:
+        return CursorPage.construct(
+            limit=self.limit,
+            next_cursor=encode_cursor(next_position) if next_position else None,
+            items=items,
+        )
+
+
+class TreePagination:
+    """
+    Ограничения на размер дерева комментариев: не больше limit детей у каждого узла
+    и не глубже max_depth уровней.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(50, ge=1, le=500, description='Max comments per node'),
+        max_depth: int = Query(10, ge=1, le=100, description='Max depth of returned tree'),
+    ):
+        self.limit = limit
+        self.max_depth = max_depth
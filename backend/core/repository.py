@@ -1,11 +1,41 @@
+import functools
+import inspect
 import logging
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.sql import Executable, Select
 
-from backend.core.context_vars import SESSION
+from backend.core.context_vars import QUERY_LABEL, SESSION, SESSION_SCOPE
+
+
+def _label_queries(label: str, method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        token = QUERY_LABEL.set(label)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            QUERY_LABEL.reset(token)
+
+    return wrapper
 
 
 class BaseRepository:
+    SNAPSHOT_ISOLATION_LEVEL: str = 'REPEATABLE READ'
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Публичные async методы репозитория помечают свои запросы к БД меткой "<Класс>.<метод>"
+        для метрик db_query_duration_seconds.
+        """
+        super().__init_subclass__(**kwargs)
+        for name, method in list(vars(cls).items()):
+            if not name.startswith('_') and inspect.iscoroutinefunction(method):
+                setattr(cls, name, _label_queries(f'{cls.__name__}.{name}', method))
+
     def __init__(self):
         self._logger = logging.getLogger(__name__)
 
@@ -13,4 +43,45 @@ class BaseRepository:
     def _db_session(self) -> AsyncSession:
         if _session := SESSION.get():
             return _session
+        if session_scope := SESSION_SCOPE.get():
+            return session_scope.session
+        raise RuntimeError  # pragma: no cover
+
+    async def _read_session(self) -> AsyncSession:
+        """
+        Сессия для чтения: реплика, если запрос еще ничего не записал, иначе мастер.
+        Явно выставленная SESSION используется и для чтения, и для записи.
+        """
+        if _session := SESSION.get():
+            return _session
+        if session_scope := SESSION_SCOPE.get():
+            return await session_scope.get_read_session()
         raise RuntimeError  # pragma: no cover
+
+    async def _estimate_rows(self, stmt: Select) -> int:
+        """
+        EXPLAIN (FORMAT JSON) <stmt>
+
+        Оценка количества строк планировщиком по статистике таблицы, без выполнения запроса.
+        """
+        compiled = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True})
+        plan = await (await self._read_session()).scalar(text(f'EXPLAIN (FORMAT JSON) {compiled}'))
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    async def _snapshot_read(self, *statements: Executable, session: AsyncSession | None = None) -> list[Result]:
+        """
+        Выполняет запросы на одном соединении в одной транзакции с уровнем изоляции REPEATABLE READ,
+        так что все они видят один и тот же снимок данных.
+
+        Уровень изоляции задается только для соединения, которое сессия сама берет из пула в начале
+        транзакции, и сбрасывается при возврате соединения в пул. Если транзакция уже начата
+        или сессия привязана к внешнему соединению, запросы выполняются в текущей транзакции
+        (сессии реплик уже открыты в REPEATABLE READ).
+        """
+        session = session or self._db_session
+        if not session.in_transaction() and isinstance(session.bind, AsyncEngine):
+            await session.connection(execution_options={'isolation_level': self.SNAPSHOT_ISOLATION_LEVEL})
+        elif not session.info.get('snapshot'):
+            self._logger.debug('Transaction already started, snapshot read uses its isolation level')
+
+        return [await session.execute(stmt) for stmt in statements]
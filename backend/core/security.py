@@ -1,6 +1,10 @@
+import asyncio
 import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from enum import Enum, unique
+from typing import Callable, TypeVar
 
 import jwt
 from fastapi import Depends
@@ -8,17 +12,26 @@ from fastapi.security import OAuth2PasswordBearer
 from jwt import PyJWTError
 from passlib.context import CryptContext
 from passlib.exc import UnknownHashError
+from sqlalchemy.orm import sessionmaker
 
 from backend.auth.exceptions import InvalidCredentials
 from backend.auth.repositories import UserRepository
 from backend.auth.schemas import User
 from backend.core import settings
+from backend.core.cache import CacheBackend, create_cache
+from backend.core.config import PasswordHashConfig
+from backend.core.context_vars import SESSION
+from backend.core.database import async_session
+from backend.core.exceptions import ServiceUnavailable
 
 
+T = TypeVar('T')
+
 pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/auth/signin/')
 logger = logging.getLogger(__name__)
 user_repository = UserRepository()
+user_cache: CacheBackend = create_cache()
 
 
 @unique
@@ -38,28 +51,155 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def _create_token(token_type: TokenType, lifetime: timedelta, sub: str) -> str:
+class PasswordHasher:
+    """
+    Выполняет bcrypt вне event loop в ограниченном пуле потоков или процессов.
+    Одновременно в работе и в очереди не больше WORKERS + QUEUE_SIZE вызовов,
+    остальные сразу получают 503, чтобы всплеск логинов не копился в памяти.
+    """
+
+    def __init__(self, config: PasswordHashConfig = settings.PASSWORD_HASH):
+        self._config = config
+        self._executor: Executor | None = None
+        self._semaphore = asyncio.Semaphore(config.WORKERS + config.QUEUE_SIZE)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            executor_class = ProcessPoolExecutor if self._config.EXECUTOR == 'process' else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self._config.WORKERS)
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        if self._semaphore.locked():
+            logger.warning('Password hashing queue is full')
+            raise ServiceUnavailable
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+
+password_hasher = PasswordHasher()
+
+
+def _create_token(token_type: TokenType, lifetime: timedelta, sub: str, **claims) -> str:
     now = datetime.now(tz=timezone.utc)
     return jwt.encode(
         payload={
             'type': token_type.value,
             'exp': now + lifetime,
             'iat': now,
-            'sub': sub
+            'sub': sub,
+            **claims,
         },
         key=settings.SECRET_KEY,
         algorithm=settings.JWT.ALGORITHM
     )
 
 
-def create_access_token(*, username: str) -> str:
+def create_access_token(*, username: str, user_id: int | None = None) -> str:
+    claims = {'uid': user_id} if user_id is not None else {}
     return _create_token(
         token_type=TokenType.ACCESS,
         lifetime=timedelta(minutes=settings.JWT.ACCESS_TOKEN_EXPIRE_MINUTES),
         sub=username,
+        **claims,
     )
 
 
+def _user_cache_key(username: str) -> str:
+    return f'user:{username}'
+
+
+async def invalidate_user(username: str) -> None:
+    await user_cache.delete(_user_cache_key(username))
+
+
+class RevokedUsers:
+    """
+    Деактивированные пользователи, чьи токены еще могут быть не просрочены. Токен с uid проверяется
+    без запроса в БД, поэтому отзыв держится в памяти каждого процесса: при старте и затем раз
+    в refresh_interval секунд из БД читаются пользователи, деактивированные за время жизни токена.
+    Записи не вытесняются и удаляются только через window секунд после появления, когда все
+    выданные до деактивации токены уже просрочены. Другие процессы узнают о деактивации
+    не позже чем через refresh_interval, процесс, обработавший ее, - сразу (add).
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = async_session,
+        refresh_interval: float = settings.JWT.REVOKED_REFRESH_INTERVAL,
+        window: timedelta = timedelta(minutes=settings.JWT.ACCESS_TOKEN_EXPIRE_MINUTES),
+    ):
+        self._session_factory = session_factory
+        self._refresh_interval = refresh_interval
+        self._window = window
+        # id пользователя -> time.monotonic(), после которого запись не нужна
+        self._expires_at: dict[int, float] = {}
+        self._task: asyncio.Task | None = None
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._expires_at
+
+    def add(self, user_id: int) -> None:
+        self._expires_at.setdefault(user_id, time.monotonic() + self._window.total_seconds())
+
+    async def refresh(self) -> None:
+        async with self._session_factory() as session:
+            token = SESSION.set(session)
+            try:
+                user_ids = await user_repository.get_deactivated_user_ids(within=self._window)
+            finally:
+                SESSION.reset(token)
+
+        now = time.monotonic()
+        self._expires_at = {user_id: expires_at for user_id, expires_at in self._expires_at.items() if expires_at > now}
+        for user_id in user_ids:
+            self.add(user_id)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.exception(e)
+
+    async def start(self) -> None:
+        # Первая загрузка до приема запросов: иначе после рестарта отозванные токены снова принимались бы
+        await self.refresh()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+revoked_users = RevokedUsers()
+
+
+def revoke_user(user_id: int) -> None:
+    """Выданные пользователю токены перестают приниматься этим процессом сразу, остальными - после refresh."""
+    revoked_users.add(user_id)
+
+
+async def _get_user_by_username(username: str) -> User | None:
+    key = _user_cache_key(username)
+    if (data := await user_cache.hget(key, 'user')) is not None:
+        return User.parse_raw(data)
+
+    if not (user_in_db := await user_repository.get_user_by_username(username=username)):
+        return None
+
+    user = User.parse_obj(user_in_db)
+    await user_cache.hset(key, 'user', user.json().encode(), ttl=settings.CACHE.USER_TTL)
+    return user
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     try:
         payload = jwt.decode(jwt=token, key=settings.SECRET_KEY, algorithms=[settings.JWT.ALGORITHM])
@@ -70,7 +210,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         if not (username := payload.get('sub')):
             logger.warning('Invalid payload: %s', payload)
             raise InvalidCredentials
-        if not (user := await user_repository.get_user_by_username(username=username)):
+        # Токен подписан и содержит id пользователя, запрос в БД не нужен
+        if isinstance(user_id := payload.get('uid'), int):
+            user = User(id=user_id, username=username)
+        elif not (user := await _get_user_by_username(username=username)):
             logger.debug('User %s not found', username)
             raise InvalidCredentials
-        return User.parse_obj(user)
+        if user.id in revoked_users:
+            logger.debug('User %s is deactivated', username)
+            raise InvalidCredentials
+        return user
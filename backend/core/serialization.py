@@ -0,0 +1,45 @@
+import json
+from datetime import date, datetime
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    # orjson в зависимостях проекта; json только на случай сборки без бинарного колеса
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    # Модели, собранные через construct, сериализуются по полям без повторной валидации
+    if isinstance(obj, BaseModel):
+        return dict(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    JSON из dict/list/construct-моделей без jsonable_encoder через orjson (json, если orjson недоступен).
+    Даты в ISO 8601, как у pydantic.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class FastJSONResponse(Response):
+    """
+    Ответ, который FastAPI не пропускает через response_model: данные уже имеют форму ответа.
+    response_model в декораторе остается только для OpenAPI схемы.
+    """
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
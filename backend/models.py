@@ -1,5 +1,7 @@
 import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 
 from backend.core.database import TimestampMixin
 
@@ -9,20 +11,74 @@ Base = declarative_base()
 
 class User(TimestampMixin, Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Недавно деактивированные пользователи для отзыва токенов (backend.core.security.RevokedUsers)
+        sa.Index('ix_users_deleted', 'deleted_at', postgresql_where=sa.text('deleted_at IS NOT NULL')),
+    )
 
     id = sa.Column(sa.Integer, primary_key=True)
     username = sa.Column(sa.String(120), unique=True, index=True, nullable=False)
     password = sa.Column(sa.String(120), nullable=False)
-    # TODO: Добавить поле is_active: bool для удаления
+    # Время удаления (деактивации) пользователя. Строка остается, чтобы не терять его посты,
+    # username не освобождается. Войти и пользоваться выданными токенами он больше не может.
+    deleted_at = sa.Column(sa.DateTime, nullable=True)
 
 
 class Post(TimestampMixin, Base):
     __tablename__ = 'posts'
     __table_args__ = (
         sa.CheckConstraint('id <> parent_id', name='ck_parent_id_does_not_refer_itself'),
+        # Индексы лент только по живым строкам: мягко удаленные посты в них не попадают
+        sa.Index(
+            'ix_posts_feed', 'created_at', 'id', postgresql_where=sa.text('parent_id IS NULL AND deleted_at IS NULL')
+        ),
+        sa.Index('ix_posts_search_vector', 'search_vector', postgresql_using='gin'),
+        # Посты пользователя в порядке ленты, заменяет индекс по одному owner_id. Не частичный:
+        # по нему же проверяется внешний ключ users -> posts, которому нужны и мягко удаленные строки
+        sa.Index('ix_posts_owner_feed', 'owner_id', sa.text('created_at DESC'), sa.text('id DESC')),
+        sa.Index('ix_posts_path', 'path'),
+        # Удаленные посты, ожидающие фоновой очистки поддерева: их единицы, индекс почти пустой
+        sa.Index('ix_posts_deleted', 'id', postgresql_where=sa.text('deleted_at IS NOT NULL')),
     )
 
     id = sa.Column(sa.Integer, primary_key=True)
-    owner_id = sa.Column(sa.Integer, sa.ForeignKey('users.id', ondelete='RESTRICT'), nullable=False, index=True)
+    owner_id = sa.Column(sa.Integer, sa.ForeignKey('users.id', ondelete='RESTRICT'), nullable=False)
     text = sa.Column(sa.Text, nullable=False)
     parent_id = sa.Column(sa.Integer, sa.ForeignKey('posts.id', ondelete='CASCADE'), nullable=True, index=True)
+    # Денормализованные поля дерева: id корневого поста (NULL у самого корня)
+    # и количество всех потомков узла. Поддерживаются в PostRepository.create_post/delete_post.
+    root_id = sa.Column(sa.Integer, sa.ForeignKey('posts.id', ondelete='CASCADE'), nullable=True, index=True)
+    descendants_count = sa.Column(sa.Integer, nullable=False, server_default='0')
+    # Материализованный путь: id от корня до самого узла включительно. Массивы сравниваются поэлементно,
+    # поэтому поддерево узла с путем [1, 5] - это диапазон [1, 5] <= path < [1, 6] по ix_posts_path,
+    # глубина - cardinality(path) - 1, корень - path[1]. Задается при вставке и не меняется.
+    path = sa.Column(ARRAY(sa.Integer), nullable=False)
+    # Время мягкого удаления большого поддерева. Такой узел и все его потомки не видны в чтениях,
+    # а сами строки удаляются в фоне пачками (backend.blog.tasks.purge_deleted_posts).
+    deleted_at = sa.Column(sa.DateTime, nullable=True)
+    # Версия поддерева: увеличивается при каждой записи в сам узел или в любого его потомка
+    # (вместе со счетчиком потомков предков). Из нее строится ETag дерева без его чтения.
+    version = sa.Column(sa.Integer, nullable=False, server_default='0')
+    # Полнотекстовый индекс текста, вычисляется Postgres. Конфигурация russian разбирает
+    # кириллицу русским стеммером, латиницу английским; в запросах нужна та же конфигурация.
+    search_vector = deferred(sa.Column(TSVECTOR, sa.Computed("to_tsvector('russian', text)", persisted=True)))
+
+
+class Job(TimestampMixin, Base):
+    """Отложенное задание для backend.core.jobs.JobRunner. Выполненные задания удаляются."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        sa.Index('ix_jobs_pending', 'run_at', postgresql_where=sa.text("status = 'pending'")),
+    )
+
+    id = sa.Column(sa.BigInteger, primary_key=True)
+    name = sa.Column(sa.String(120), nullable=False)
+    payload = sa.Column(JSONB, nullable=False, server_default='{}')
+    # pending - ждет выполнения или повтора, failed - исчерпаны попытки
+    status = sa.Column(sa.String(16), nullable=False, server_default='pending')
+    attempts = sa.Column(sa.Integer, nullable=False, server_default='0')
+    max_attempts = sa.Column(sa.Integer, nullable=False)
+    run_at = sa.Column(sa.DateTime, nullable=False, server_default=sa.func.now())
+    # До этого времени задание взято обработчиком; если процесс упал, после него задание возьмет другой
+    locked_until = sa.Column(sa.DateTime, nullable=True)
+    last_error = sa.Column(sa.Text, nullable=True)
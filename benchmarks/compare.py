@@ -0,0 +1,41 @@
+"""
+Сравнение двух прогонов benchmarks.suite.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Для каждого сценария выводит p50/p95/p99 и rps обоих прогонов и их отношение (new / old).
+"""
+import argparse
+import json
+from pathlib import Path
+
+
+METRICS: tuple[str, ...] = ('p50_ms', 'p95_ms', 'p99_ms', 'rps')
+
+
+def load(path: Path) -> tuple[str, dict[tuple[str, str], dict]]:
+    run = json.loads(path.read_text())
+    return run['commit'][:10], {
+        (result['scenario'], json.dumps(result['params'], sort_keys=True)): result for result in run['results']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('old', type=Path)
+    parser.add_argument('new', type=Path)
+    args = parser.parse_args()
+
+    old_commit, old = load(args.old)
+    new_commit, new = load(args.new)
+    print(f'{old_commit} -> {new_commit}')
+    for key in [key for key in new if key in old]:
+        row = '  '.join(
+            f'{metric} {before:>9.2f} -> {after:>9.2f} (x{after / before:.2f})'
+            for metric, before, after in ((m, old[key][m], new[key][m]) for m in METRICS) if before
+        )
+        print(f'{key[0]:<15} {key[1]:<32} {row}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Сравнение SessionMiddleware до и после перехода на чистый ASGI.
+
+    python -m benchmarks.middleware
+
+Запросы не ходят в БД: /ping/ и попадание в кеш GET /blog/posts/{id}/.
+Неиспользованная AsyncSession не берет соединение, так что БД для запуска не нужна.
+Старая реализация на BaseHTTPMiddleware воспроизведена здесь только для сравнения.
+"""
+import asyncio
+import logging
+import time
+
+from httpx import AsyncClient
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+from backend.app import create_app
+from backend.core.container import blog_service
+from backend.core.context_vars import SESSION
+from backend.core.database import async_session
+from backend.core.middleware import SessionMiddleware
+
+
+REQUESTS: int = 5_000
+CONCURRENCY: int = 50
+URLS: tuple[str, ...] = ('/ping/', '/blog/posts/1/')
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.getLogger('backend').setLevel(logging.WARNING)
+
+
+class LegacySessionMiddleware(BaseHTTPMiddleware):
+    """SessionMiddleware до перехода на ASGI: сессия открывается на каждый запрос."""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        db_session = async_session()
+        SESSION.set(db_session)
+        try:
+            response = await call_next(request)
+            await db_session.commit()
+        finally:
+            await db_session.close()
+            SESSION.set(None)
+        return response
+
+
+async def measure(app, url: str) -> float:
+    async with AsyncClient(app=app, base_url='http://test') as client:
+        await client.get(url)
+
+        async def worker(count: int):
+            for _ in range(count):
+                await client.get(url)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(REQUESTS // CONCURRENCY) for _ in range(CONCURRENCY)))
+        return REQUESTS / (time.perf_counter() - started)
+
+
+async def main():
+    await blog_service.cache.hset('post:1', '10:50', b'{}', ttl=3600)
+
+    new_app = create_app()
+
+    legacy_app = create_app()
+    legacy_app.user_middleware = [m for m in legacy_app.user_middleware if m.cls is not SessionMiddleware]
+    legacy_app.add_middleware(LegacySessionMiddleware)
+
+    for url in URLS:
+        before = await measure(legacy_app, url)
+        after = await measure(new_app, url)
+        logging.info('%-16s before: %8.1f rps, after: %8.1f rps (x%.2f)', url, before, after, after / before)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,287 @@
+"""
+Нагрузочный бенчмарк горячих путей API на локальном Postgres.
+
+    python -m benchmarks.suite --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Для прогона создается отдельная база <POSTGRES_DB>_bench, данные генерируются load_fixtures
+с фиксированным seed. Запросы идут в приложение в том же процессе через httpx, так что сеть
+не учитывается. Для каждого сценария считаются p50/p95/p99 и пропускная способность.
+
+Сценарии:
+- feed: GET /blog/posts/ на разных offset при разном количестве постов;
+- search: GET /blog/search/ на тех же данных;
+- tree: GET /blog/posts/{id}/ для деревьев от 10 до 100k узлов, без кеша ответа;
+- signin: POST /auth/signin/ (bcrypt в пуле потоков);
+- create_comment: POST /blog/comments/.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import platform
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator
+from unittest.mock import patch
+
+import asyncpg
+from httpx import AsyncClient, Response
+from pydantic import PostgresDsn
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from load_fixtures import BASE_TIME, POST_COLUMNS, FixturesConfig, copy_rows, load_fixtures
+
+from backend.app import create_app
+from backend.core import settings
+from backend.core.cache import LRUCache
+from backend.core.container import blog_service
+from backend.core.database import create_engine
+from backend.core.security import create_access_token
+from backend.models import Base
+
+
+FEED_SIZES: tuple[int, ...] = (1_000, 100_000)
+FEED_OFFSETS: tuple[int, ...] = (0, 100, 1_000, 10_000, 50_000)
+TREE_SIZES: tuple[int, ...] = (10, 100, 1_000, 10_000, 100_000)
+TREE_FAN_OUT: int = 10
+USERS: int = 100
+SEARCH_QUERY: str = 'replica latency'
+SEED: int = 1
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.getLogger('backend').setLevel(logging.WARNING)
+
+
+@dataclass
+class Result:
+    scenario: str
+    params: dict
+    requests: int
+    errors: int
+    concurrency: int
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+@dataclass
+class Run:
+    commit: str
+    started_at: str
+    python: str
+    settings: dict
+    results: list[Result] = field(default_factory=list)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Перцентиль методом nearest-rank по отсортированному списку."""
+    return values[max(math.ceil(q / 100 * len(values)) - 1, 0)]
+
+
+async def measure(
+    scenario: str,
+    params: dict,
+    request: Callable[[int], Awaitable[Response]],
+    args: argparse.Namespace,
+) -> Result:
+    """
+    Выполняет request с args.concurrency воркерами, пока не наберется args.requests запросов
+    или не пройдет args.max_seconds (но не меньше args.min_requests).
+    """
+    for i in range(args.warmup):
+        await request(i)
+
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + args.max_seconds
+    counter = iter(range(args.requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            if len(latencies) >= args.min_requests and time.perf_counter() > deadline:
+                return
+            started = time.perf_counter()
+            response = await request(i)
+            latencies.append(time.perf_counter() - started)
+            errors += response.is_error
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = Result(
+        scenario=scenario,
+        params=params,
+        requests=len(latencies),
+        errors=errors,
+        concurrency=args.concurrency,
+        rps=round(len(latencies) / elapsed, 1),
+        p50_ms=round(percentile(latencies, 50) * 1000, 3),
+        p95_ms=round(percentile(latencies, 95) * 1000, 3),
+        p99_ms=round(percentile(latencies, 99) * 1000, 3),
+        max_ms=round(latencies[-1] * 1000, 3),
+    )
+    logging.info(
+        '%-15s %-32s p50 %9.2f ms  p95 %9.2f ms  p99 %9.2f ms  %8.1f rps  errors %d',
+        scenario, json.dumps(params), result.p50_ms, result.p95_ms, result.p99_ms, result.rps, errors,
+    )
+    return result
+
+
+def tree_rows(root_id: int, size: int, owner_id: int) -> Iterator[tuple]:
+    """
+    Полное дерево из size узлов с TREE_FAN_OUT детьми у каждого узла, id подряд начиная с root_id.
+    """
+    parents = [None] + [(i - 1) // TREE_FAN_OUT for i in range(1, size)]
+    counts = [0] * size
+    for i in range(size - 1, 0, -1):
+        counts[parents[i]] += counts[i] + 1
+    paths = [[root_id]]
+    for i in range(1, size):
+        paths.append(paths[parents[i]] + [root_id + i])
+    for i in range(size):
+        created_at = BASE_TIME + timedelta(seconds=i)
+        yield (
+            root_id + i,
+            owner_id,
+            f'node {i}',
+            None if i == 0 else root_id + parents[i],
+            None if i == 0 else root_id,
+            counts[i],
+            created_at,
+            created_at,
+            paths[i],
+        )
+
+
+async def recreate_database(name: str) -> None:
+    conn = await asyncpg.connect(
+        host=settings.DB.URI.host,
+        user=settings.DB.URI.user,
+        password=settings.DB.URI.password,
+        database=settings.DB.URI.path.lstrip('/'),
+    )
+    try:
+        await conn.execute(f'DROP DATABASE IF EXISTS {name}')
+        await conn.execute(f"CREATE DATABASE {name} ENCODING 'UTF8' TEMPLATE template0")
+    finally:
+        await conn.close()
+
+
+async def seed(engine: AsyncEngine, config: FixturesConfig) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text('TRUNCATE users, posts RESTART IDENTITY CASCADE'))
+        await load_fixtures(conn, config)
+
+
+async def seed_trees(conn: AsyncConnection, sizes: tuple[int, ...]) -> dict[int, int]:
+    roots, root_id = {}, 1
+    for size in sizes:
+        await copy_rows(conn, 'posts', POST_COLUMNS, tree_rows(root_id, size, owner_id=1), 10_000)
+        roots[size], root_id = root_id, root_id + size
+    await conn.execute(text("SELECT setval(pg_get_serial_sequence('posts', 'id'), max(id)) FROM posts"))
+    await conn.execute(text('ANALYZE posts'))
+    return roots
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+async def run(args: argparse.Namespace) -> Run:
+    database = f'{settings.DB.DB}_bench'
+    await recreate_database(database)
+    engine = create_engine(uri=PostgresDsn.build(
+        scheme='postgresql+asyncpg',
+        user=settings.DB.USER,
+        password=settings.DB.PASSWORD,
+        host=settings.DB.HOST,
+        path=f'/{database}',
+    ))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    bench = Run(
+        commit=git_commit(),
+        started_at=datetime.now().isoformat(timespec='seconds'),
+        python=platform.python_version(),
+        settings={key: value for key, value in vars(args).items() if key != 'output'},
+    )
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    with patch('backend.core.middleware.async_session', session_factory):
+        async with AsyncClient(app=create_app(), base_url='http://bench') as client:
+            for size in args.feed_sizes:
+                logging.info('Seeding %d posts', size)
+                await seed(engine, FixturesConfig(users=USERS, posts=size, depth=1, fan_out=2, seed=SEED))
+                for offset in (offset for offset in FEED_OFFSETS if offset < size):
+                    url = f'/blog/posts/?limit=20&offset={offset}'
+                    bench.results.append(await measure(
+                        'feed', {'posts': size, 'offset': offset}, lambda _, url=url: client.get(url), args,
+                    ))
+                url = f'/blog/search/?q={SEARCH_QUERY}&limit=20'
+                bench.results.append(await measure(
+                    'search', {'posts': size, 'q': SEARCH_QUERY}, lambda _, url=url: client.get(url), args,
+                ))
+
+            await seed(engine, FixturesConfig(users=USERS, posts=0, seed=SEED))
+            async with engine.begin() as conn:
+                roots = await seed_trees(conn, args.tree_sizes)
+            blog_service.cache = LRUCache(max_size=0)
+            for size, root_id in roots.items():
+                url = f'/blog/posts/{root_id}/?limit=500&max_depth=100'
+                bench.results.append(await measure(
+                    'tree', {'nodes': size}, lambda _, url=url: client.get(url), args,
+                ))
+
+            bench.results.append(await measure('signin', {}, lambda i: client.post('/auth/signin/', data={
+                'username': f'user_{i % USERS + 1}', 'password': FixturesConfig.password,
+            }), args))
+
+            headers = {'Authorization': f'Bearer {create_access_token(username="user_1", user_id=1)}'}
+            root_id = roots[min(roots)]
+            bench.results.append(await measure('create_comment', {}, lambda i: client.post(
+                '/blog/comments/', json={'text': f'comment {i}', 'parent_id': root_id}, headers=headers,
+            ), args))
+
+    await engine.dispose()
+    return bench
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', type=Path, help='Куда сохранить результаты в JSON')
+    parser.add_argument('--requests', type=int, default=1_000, help='Максимум запросов на сценарий')
+    parser.add_argument('--min-requests', type=int, default=20, help='Минимум запросов на сценарий')
+    parser.add_argument('--max-seconds', type=float, default=10, help='Ограничение времени на сценарий')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--feed-sizes', type=int, nargs='+', default=FEED_SIZES)
+    parser.add_argument('--tree-sizes', type=int, nargs='+', default=TREE_SIZES)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    bench = asyncio.run(run(args))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(asdict(bench), indent=2, ensure_ascii=False))
+        logging.info('Results saved to %s', args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Микро-бенчмарк сборки и сериализации дерева комментариев post_tree.
+
+    python -m benchmarks.tree_builder
+
+Время на один узел должно оставаться примерно постоянным при росте размера дерева.
+"""
+import logging
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from backend.blog.schemas import post_tree
+from backend.core.serialization import dumps
+
+
+SIZES: tuple[int, ...] = (1_000, 10_000, 100_000)
+REPEAT: int = 5
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def make_rows(size: int, seed: int = 0) -> list[dict]:
+    rnd = random.Random(seed)
+    now = datetime.now()
+    rows = [{
+        'id': 1,
+        'parent_id': None,
+        'text': 'post',
+        'created_at': now,
+        'user_id': 1,
+        'username': 'user_1',
+    }]
+    for i in range(2, size + 1):
+        rows.append({
+            'id': i,
+            'parent_id': rnd.randint(1, i - 1),
+            'text': f'comment_{i}',
+            'created_at': now + timedelta(microseconds=i),
+            'user_id': i % 100,
+            'username': f'user_{i % 100}',
+        })
+    # get_single_post отдает строки в порядке created_at DESC
+    rows.reverse()
+    return rows
+
+
+def main():
+    for size in SIZES:
+        rows = make_rows(size)
+        best = min(timeit.repeat(lambda: dumps(post_tree(rows)), number=1, repeat=REPEAT))
+        logging.info('%7d nodes: %8.2f ms, %6.2f us/node', size, best * 1000, best / size * 1_000_000)
+
+
+if __name__ == '__main__':
+    main()
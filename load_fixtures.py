@@ -1,83 +1,176 @@
+"""
+Генератор тестовых данных: пользователи, посты и деревья комментариев заданной глубины и ширины.
+
+Данные детерминированы seed (при пустых таблицах), id и денормализованные поля дерева
+(root_id, descendants_count) вычисляются на клиенте, строки загружаются через COPY пачками
+в одной транзакции. Пароль хешируется один раз для всех пользователей.
+
+python load_fixtures.py --users 100000 --posts 1000000 --depth 4 --fan-out 3 --seed 1
+"""
+import argparse
 import asyncio
 import logging
 import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
 
+from sqlalchemy import text
 from sqlalchemy.exc import DBAPIError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncConnection
 
-from backend.core.database import async_session
+from backend.core.database import async_engine
 from backend.core.security import get_password_hash
-from backend.models import Post, User
-
-
-USERS_COUNT: int = 10
-POSTS_COUNT: int = 15
-COMMENTS_1_COUNT: int = 20
-COMMENTS_2_COUNT: int = 20
-COMMENTS_3_COUNT: int = 20
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-
-async def load_fixtures(session: AsyncSession) -> None:
-    users = [User(username=f'user_{i}', password=get_password_hash('123456')) for i in range(USERS_COUNT)]
-    session.add_all(users)
-    await session.flush(users)
-
-    posts = [
-        Post(owner_id=random.choice([user.id for user in users]), text=f'post_{i}')
-        for i in range(POSTS_COUNT)
-    ]
-    session.add_all(posts)
-    await session.flush(posts)
-
-    comments_1 = [
-        Post(
-            owner_id=random.choice([user.id for user in users]),
-            text=f'comment_1_{i}',
-            parent_id=random.choice([post.id for post in posts])
-        )
-        for i in range(COMMENTS_1_COUNT)
-    ]
-    session.add_all(comments_1)
-    await session.flush(comments_1)
-
-    comments_2 = [
-        Post(
-            owner_id=random.choice([user.id for user in users]),
-            text=f'comment_2_{i}',
-            parent_id=random.choice([comment.id for comment in comments_1])
-        )
-        for i in range(COMMENTS_2_COUNT)
-    ]
-    session.add_all(comments_2)
-    await session.flush(comments_2)
-
-    comments_3 = [
-        Post(
-            owner_id=random.choice([user.id for user in users]),
-            text=f'comment_3_{i}',
-            parent_id=random.choice([comment.id for comment in comments_2])
-        )
-        for i in range(COMMENTS_3_COUNT)
-    ]
-    session.add_all(comments_3)
-    await session.flush(comments_3)
-
-
-async def main():
-    async with async_session() as db_session:
-        try:
-            await load_fixtures(db_session)
-            await db_session.commit()
-        except DBAPIError as e:
-            logging.error('Failed to load fixtures due error %s', e)
-            await db_session.rollback()
-        else:
-            logging.info('Fixtures successfully loaded')
-        finally:
-            await db_session.close()
+
+
+USER_COLUMNS: tuple[str, ...] = ('id', 'username', 'password', 'created_at', 'updated_at')
+POST_COLUMNS: tuple[str, ...] = (
+    'id', 'owner_id', 'text', 'parent_id', 'root_id', 'descendants_count', 'created_at', 'updated_at', 'path'
+)
+WORDS: tuple[str, ...] = (
+    'python', 'postgres', 'async', 'query', 'index', 'tree', 'comment', 'post', 'cache', 'latency',
+    'benchmark', 'feed', 'cursor', 'replica', 'pool', 'session', 'request', 'response', 'server', 'client',
+    'fast', 'slow', 'good', 'bad', 'new', 'old', 'big', 'small', 'first', 'last',
+)
+BASE_TIME = datetime(2022, 1, 1)
+
+
+@dataclass
+class FixturesConfig:
+    users: int = 10
+    posts: int = 15
+    # Глубина деревьев комментариев (0 - без комментариев) и максимум детей у одного узла
+    depth: int = 3
+    fan_out: int = 3
+    seed: int = 0
+    batch_size: int = 10_000
+    password: str = '123456'
+
+
+def generate_text(rng: random.Random) -> str:
+    return ' '.join(rng.choices(WORDS, k=rng.randint(3, 30)))
+
+
+def generate_users(config: FixturesConfig, first_id: int, password_hash: str) -> Iterator[tuple]:
+    for user_id in range(first_id, first_id + config.users):
+        created_at = BASE_TIME + timedelta(seconds=user_id)
+        yield user_id, f'user_{user_id}', password_hash, created_at, created_at
+
+
+def generate_tree(
+    rng: random.Random, config: FixturesConfig, root_id: int, owner_ids: range, created_at: datetime
+) -> list[list]:
+    """
+    Пост root_id и его дерево комментариев: у каждого узла выше config.depth от 0 до config.fan_out детей.
+    Узлы нумеруются подряд в порядке обхода в ширину, поэтому потомки идут после предков,
+    и descendants_count считается одним проходом с конца.
+    """
+    nodes = [[root_id, rng.choice(owner_ids), generate_text(rng), None, None, 0, created_at, created_at, [root_id]]]
+    depths = [0]
+    for position, depth in enumerate(depths):
+        if depth >= config.depth:
+            continue
+        parent = nodes[position]
+        for _ in range(rng.randint(0, config.fan_out)):
+            child_created_at = parent[6] + timedelta(seconds=rng.randint(1, 3600))
+            child_id = root_id + len(nodes)
+            nodes.append([
+                child_id,
+                rng.choice(owner_ids),
+                generate_text(rng),
+                parent[0],
+                root_id,
+                0,
+                child_created_at,
+                child_created_at,
+                parent[8] + [child_id],
+            ])
+            depths.append(depth + 1)
+
+    for node in reversed(nodes[1:]):
+        nodes[node[3] - root_id][5] += node[5] + 1
+    return nodes
+
+
+def generate_posts(config: FixturesConfig, first_id: int, owner_ids: range) -> Iterator[tuple]:
+    rng = random.Random(config.seed)
+    post_id = first_id
+    for i in range(config.posts):
+        nodes = generate_tree(rng, config, post_id, owner_ids, BASE_TIME + timedelta(minutes=i))
+        yield from map(tuple, nodes)
+        post_id += len(nodes)
+
+
+def batched(rows: Iterable[tuple], size: int) -> Iterator[list[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def copy_rows(
+    conn: AsyncConnection, table: str, columns: tuple[str, ...], rows: Iterable[tuple], size: int
+) -> int:
+    driver_connection = (await conn.get_raw_connection()).driver_connection
+    count = 0
+    for batch in batched(rows, size):
+        await driver_connection.copy_records_to_table(table, records=batch, columns=columns)
+        count += len(batch)
+        logging.info('%s: %s rows copied', table, count)
+    return count
+
+
+async def load_fixtures(conn: AsyncConnection, config: FixturesConfig) -> None:
+    # Id назначаются на клиенте, поэтому параллельные вставки на время загрузки блокируются
+    await conn.execute(text('LOCK TABLE users, posts IN SHARE ROW EXCLUSIVE MODE'))
+    first_user_id = await conn.scalar(text('SELECT coalesce(max(id), 0) + 1 FROM users'))
+    first_post_id = await conn.scalar(text('SELECT coalesce(max(id), 0) + 1 FROM posts'))
+
+    password_hash = get_password_hash(config.password)
+    users = generate_users(config, first_user_id, password_hash)
+    await copy_rows(conn, 'users', USER_COLUMNS, users, config.batch_size)
+    owner_ids = range(first_user_id, first_user_id + config.users)
+    posts = generate_posts(config, first_post_id, owner_ids)
+    await copy_rows(conn, 'posts', POST_COLUMNS, posts, config.batch_size)
+
+    for table in ('users', 'posts'):
+        await conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 1)) FROM {table}"
+        ))
+    await conn.execute(text('ANALYZE users, posts'))
+
+
+def parse_args() -> FixturesConfig:
+    defaults = FixturesConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=defaults.users)
+    parser.add_argument('--posts', type=int, default=defaults.posts, help='Количество корневых постов')
+    parser.add_argument('--depth', type=int, default=defaults.depth, help='Глубина деревьев комментариев')
+    parser.add_argument('--fan-out', type=int, default=defaults.fan_out, help='Максимум детей у одного узла')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--batch-size', type=int, default=defaults.batch_size, help='Строк в одном COPY')
+    parser.add_argument('--password', default=defaults.password, help='Пароль всех пользователей')
+    return FixturesConfig(**vars(parser.parse_args()))
+
+
+async def main(config: FixturesConfig):
+    started = time.perf_counter()
+    try:
+        async with async_engine.begin() as conn:
+            await load_fixtures(conn, config)
+    except DBAPIError as e:
+        logging.error('Failed to load fixtures due error %s', e)
+    else:
+        logging.info('Fixtures successfully loaded in %.1fs', time.perf_counter() - started)
+    finally:
+        await async_engine.dispose()
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main(parse_args()))
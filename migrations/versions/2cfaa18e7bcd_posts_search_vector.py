@@ -0,0 +1,33 @@
+"""posts search vector
+
+Revision ID: 2cfaa18e7bcd
+Revises: 60774cf9f25f
+Create Date: 2026-10-18 16:45:12.318406
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '2cfaa18e7bcd'
+down_revision = '60774cf9f25f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Хранимая генерируемая колонка: добавление переписывает таблицу под ACCESS EXCLUSIVE блокировкой
+    op.add_column('posts', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('russian', text)", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_posts_search_vector', 'posts', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_search_vector', table_name='posts')
+    op.drop_column('posts', 'search_vector')
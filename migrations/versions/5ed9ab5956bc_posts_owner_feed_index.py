@@ -0,0 +1,29 @@
+"""posts owner feed index
+
+Revision ID: 5ed9ab5956bc
+Revises: 2cfaa18e7bcd
+Create Date: 2026-10-18 17:02:41.905117
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5ed9ab5956bc'
+down_revision = '2cfaa18e7bcd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_posts_owner_feed', 'posts', ['owner_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False
+    )
+    # Покрывается ix_posts_owner_feed, в том числе для проверки внешнего ключа при удалении пользователя
+    op.drop_index('ix_posts_owner_id', table_name='posts')
+
+
+def downgrade() -> None:
+    op.create_index('ix_posts_owner_id', 'posts', ['owner_id'], unique=False)
+    op.drop_index('ix_posts_owner_feed', table_name='posts')
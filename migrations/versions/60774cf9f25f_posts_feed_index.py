@@ -0,0 +1,27 @@
+"""posts feed index
+
+Revision ID: 60774cf9f25f
+Revises: 76306f52640b
+Create Date: 2026-10-18 13:41:09.552810
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '60774cf9f25f'
+down_revision = '76306f52640b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_posts_feed', 'posts', ['created_at', 'id'],
+        unique=False, postgresql_where=sa.text('parent_id IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_feed', table_name='posts')
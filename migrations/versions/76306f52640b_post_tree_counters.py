@@ -0,0 +1,57 @@
+"""post tree counters
+
+Revision ID: 76306f52640b
+Revises: 4d3f92b418fc
+Create Date: 2026-10-18 12:04:31.217403
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '76306f52640b'
+down_revision = '4d3f92b418fc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('root_id', sa.Integer(), nullable=True))
+    op.add_column('posts', sa.Column('descendants_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_foreign_key('posts_root_id_fkey', 'posts', 'posts', ['root_id'], ['id'], ondelete='CASCADE')
+
+    op.execute("""
+        WITH RECURSIVE tree(id, root_id) AS (
+                SELECT p.id, p.id FROM posts p WHERE p.parent_id IS NULL
+            UNION ALL
+                SELECT p.id, tree.root_id FROM posts p JOIN tree ON p.parent_id = tree.id
+        )
+        UPDATE posts SET root_id = tree.root_id
+        FROM tree
+        WHERE posts.id = tree.id AND posts.parent_id IS NOT NULL
+    """)
+    op.execute("""
+        WITH RECURSIVE tree(id, path) AS (
+                SELECT p.id, ARRAY[]::integer[] FROM posts p WHERE p.parent_id IS NULL
+            UNION ALL
+                SELECT p.id, tree.path || tree.id FROM posts p JOIN tree ON p.parent_id = tree.id
+        ),
+        counters AS (
+            SELECT ancestor.id, count(*) AS cnt
+            FROM tree, unnest(tree.path) AS ancestor(id)
+            GROUP BY ancestor.id
+        )
+        UPDATE posts SET descendants_count = counters.cnt
+        FROM counters
+        WHERE posts.id = counters.id
+    """)
+
+    op.create_index(op.f('ix_posts_root_id'), 'posts', ['root_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_posts_root_id'), table_name='posts')
+    op.drop_constraint('posts_root_id_fkey', 'posts', type_='foreignkey')
+    op.drop_column('posts', 'descendants_count')
+    op.drop_column('posts', 'root_id')
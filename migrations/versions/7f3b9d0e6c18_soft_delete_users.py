@@ -0,0 +1,44 @@
+"""soft delete users
+
+Revision ID: 7f3b9d0e6c18
+Revises: e4a7c2d91f05
+Create Date: 2026-10-18 20:37:52.604418
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3b9d0e6c18'
+down_revision = 'e4a7c2d91f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    op.drop_index('ix_posts_feed', table_name='posts')
+    op.create_index(
+        'ix_posts_feed', 'posts', ['created_at', 'id'],
+        unique=False, postgresql_where=sa.text('parent_id IS NULL AND deleted_at IS NULL')
+    )
+    op.drop_index('ix_posts_owner_feed', table_name='posts')
+    op.create_index(
+        'ix_posts_owner_feed', 'posts', ['owner_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False, postgresql_where=sa.text('deleted_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_owner_feed', table_name='posts')
+    op.create_index(
+        'ix_posts_owner_feed', 'posts', ['owner_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False
+    )
+    op.drop_index('ix_posts_feed', table_name='posts')
+    op.create_index(
+        'ix_posts_feed', 'posts', ['created_at', 'id'], unique=False, postgresql_where=sa.text('parent_id IS NULL')
+    )
+
+    op.drop_column('users', 'deleted_at')
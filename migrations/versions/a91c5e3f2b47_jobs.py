@@ -0,0 +1,43 @@
+"""jobs
+
+Revision ID: a91c5e3f2b47
+Revises: 7f3b9d0e6c18
+Create Date: 2026-10-18 21:48:13.730552
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91c5e3f2b47'
+down_revision = '7f3b9d0e6c18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'jobs',
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('statement_timestamp()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('statement_timestamp()'), nullable=False),
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+        sa.Column('status', sa.String(length=16), server_default='pending', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_jobs_pending', 'jobs', ['run_at'], unique=False, postgresql_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_pending', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,40 @@
+"""posts path
+
+Revision ID: b8e21f4c7a93
+Revises: 5ed9ab5956bc
+Create Date: 2026-10-18 18:11:05.532961
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e21f4c7a93'
+down_revision = '5ed9ab5956bc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('path', postgresql.ARRAY(sa.Integer()), nullable=True))
+
+    op.execute("""
+        WITH RECURSIVE tree(id, path) AS (
+                SELECT p.id, ARRAY[p.id] FROM posts p WHERE p.parent_id IS NULL
+            UNION ALL
+                SELECT p.id, tree.path || p.id FROM posts p JOIN tree ON p.parent_id = tree.id
+        )
+        UPDATE posts SET path = tree.path
+        FROM tree
+        WHERE posts.id = tree.id
+    """)
+
+    op.alter_column('posts', 'path', nullable=False)
+    op.create_index('ix_posts_path', 'posts', ['path'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_path', table_name='posts')
+    op.drop_column('posts', 'path')
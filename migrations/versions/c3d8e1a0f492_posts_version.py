@@ -0,0 +1,25 @@
+"""posts version
+
+Revision ID: c3d8e1a0f492
+Revises: a91c5e3f2b47
+Create Date: 2026-10-18 23:12:40.118264
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d8e1a0f492'
+down_revision = 'a91c5e3f2b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Постоянное значение по умолчанию: колонка добавляется без перезаписи таблицы
+    op.add_column('posts', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'version')
@@ -0,0 +1,26 @@
+"""users deleted index
+
+Revision ID: d5f0b7a3c921
+Revises: c3d8e1a0f492
+Create Date: 2026-10-19 10:14:22.503817
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f0b7a3c921'
+down_revision = 'c3d8e1a0f492'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_users_deleted', 'users', ['deleted_at'], unique=False, postgresql_where=sa.text('deleted_at IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_deleted', table_name='users')
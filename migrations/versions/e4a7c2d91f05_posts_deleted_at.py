@@ -0,0 +1,30 @@
+"""posts deleted_at
+
+Revision ID: e4a7c2d91f05
+Revises: b8e21f4c7a93
+Create Date: 2026-10-18 19:24:37.118240
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c2d91f05'
+down_revision = 'b8e21f4c7a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_posts_deleted', 'posts', ['id'], unique=False, postgresql_where=sa.text('deleted_at IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    # Без колонки недочищенные поддеревья снова стали бы видны
+    op.execute('DELETE FROM posts WHERE deleted_at IS NOT NULL')
+    op.drop_index('ix_posts_deleted', table_name='posts', postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.drop_column('posts', 'deleted_at')
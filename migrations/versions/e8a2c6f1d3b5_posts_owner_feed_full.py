@@ -0,0 +1,33 @@
+"""posts owner feed full index
+
+Revision ID: e8a2c6f1d3b5
+Revises: d5f0b7a3c921
+Create Date: 2026-10-19 10:52:07.341950
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a2c6f1d3b5'
+down_revision = 'd5f0b7a3c921'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ix_posts_owner_feed заменил ix_posts_owner_id, в том числе для проверки внешнего ключа (ON DELETE RESTRICT),
+    # поэтому должен покрывать и мягко удаленные строки
+    op.drop_index('ix_posts_owner_feed', table_name='posts')
+    op.create_index(
+        'ix_posts_owner_feed', 'posts', ['owner_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_owner_feed', table_name='posts')
+    op.create_index(
+        'ix_posts_owner_feed', 'posts', ['owner_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False, postgresql_where=sa.text('deleted_at IS NULL')
+    )
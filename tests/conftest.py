@@ -1,6 +1,6 @@
 import asyncio
 from typing import Type, TypeVar
-from unittest.mock import AsyncMock, patch
+from unittest.mock import patch
 
 import asyncpg
 import pytest
@@ -17,7 +17,8 @@ from sqlalchemy.orm import Session, SessionTransaction, sessionmaker
 from backend.app import create_app
 from backend.auth.schemas import UserInDB
 from backend.core import settings
-from backend.core.security import create_access_token, get_password_hash
+from backend.core.cache import LRUCache
+from backend.core.security import RevokedUsers, create_access_token, get_password_hash
 from backend.models import Base, User
 
 
@@ -83,7 +84,8 @@ async def make_migrations(test_engine):
         database=settings.DB.URI.path.lstrip('/'),
     )
     await sync_conn.execute(f'DROP DATABASE IF EXISTS {settings.DB.DB_TEST}')
-    await sync_conn.execute(f'CREATE DATABASE {settings.DB.DB_TEST}')
+    # UTF8 явно: от кодировки базы зависит разбор текста полнотекстовым поиском
+    await sync_conn.execute(f"CREATE DATABASE {settings.DB.DB_TEST} ENCODING 'UTF8' TEMPLATE template0")
     await sync_conn.close()
 
     async with test_engine.begin() as conn:
@@ -92,13 +94,16 @@ async def make_migrations(test_engine):
     await test_engine.dispose()
 
 
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    with patch('backend.core.security.user_cache', LRUCache(max_size=16)) as cache, \
+            patch('backend.core.security.revoked_users', RevokedUsers()):
+        yield cache
+
+
 @pytest.fixture(autouse=True)
 def mock_session_middleware(async_session):
-    with patch('backend.core.middleware.async_session') as mock:
-        mock.return_value = AsyncMock(
-            __aenter__=AsyncMock(return_value=async_session),
-            __aexit__=AsyncMock(return_value=None)
-        )
+    with patch('backend.core.middleware.async_session', return_value=async_session) as mock:
         yield mock
 
 
@@ -3,7 +3,8 @@ from unittest.mock import patch
 import pytest
 from sqlalchemy import select
 
-from backend.core.security import create_access_token
+from backend.auth.repositories import UserRepository
+from backend.core.security import create_access_token, user_repository
 from backend.models import User
 
 
@@ -74,3 +75,49 @@ class TestGetUser:
         token, user = await create_user('test_user', 'test_password')
         response = await async_client.get(self.url, headers={'Authorization': token})
         assert response.status_code == 200
+
+    async def test_user_cached(self, async_client, create_user):
+        token, user = await create_user('test_user', 'test_password')
+        with patch.object(UserRepository, 'get_user_by_username', wraps=user_repository.get_user_by_username) as mock:
+            for _ in range(2):
+                response = await async_client.get(self.url, headers={'Authorization': token})
+                assert response.json() == {'id': user.id, 'username': user.username}
+        mock.assert_awaited_once_with(username=user.username)
+
+    @patch.object(UserRepository, 'get_user_by_username')
+    async def test_token_with_user_id(self, get_user_by_username_mock, async_client):
+        token = create_access_token(username='test_user', user_id=10)
+        response = await async_client.get(self.url, headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 200
+        assert response.json() == {'id': 10, 'username': 'test_user'}
+        get_user_by_username_mock.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+class TestDeleteUser:
+    url = '/auth/me/'
+
+    async def test_auth_required(self, async_client):
+        response = await async_client.delete(self.url)
+        assert response.status_code == 401
+
+    async def test_success(self, async_client, async_session, create_user):
+        _, user = await create_user('test_user', 'test_password')
+        token = f'Bearer {create_access_token(username=user.username, user_id=user.id)}'
+
+        response = await async_client.delete(self.url, headers={'Authorization': token})
+        assert response.status_code == 204
+        assert (await async_session.execute(
+            select(User.deleted_at).filter(User.id == user.id)
+        )).scalar_one() is not None
+
+        # Выданный токен больше не принимается, а войти снова нельзя
+        with patch.object(UserRepository, 'get_user_by_username') as get_user_by_username_mock:
+            response = await async_client.get(self.url, headers={'Authorization': token})
+        assert response.status_code == 401
+        get_user_by_username_mock.assert_not_awaited()
+
+        response = await async_client.post(
+            '/auth/signin/', data={'username': 'test_user', 'password': 'test_password'}
+        )
+        assert response.status_code == 401
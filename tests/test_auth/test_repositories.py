@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 import pytest
 
 from tests.base import BaseRepoTest
@@ -26,3 +28,19 @@ class TestUserRepository(BaseRepoTest):
 
         result = await user_repository.get_user_by_username('test_user')
         assert bool(result) is user_exists
+
+    async def test_deactivate_user(self, create_user):
+        _, user = await create_user('test_user', 'test_password')
+
+        assert await user_repository.deactivate_user(user.id)
+        assert not await user_repository.deactivate_user(user.id)
+        assert await user_repository.get_user_by_username('test_user') is None
+        assert await user_repository.get_user_by_id(user.id) is None
+
+    async def test_get_deactivated_user_ids(self, create_user):
+        _, user = await create_user('test_user', 'test_password')
+        await create_user('other_user', 'test_password')
+        assert await user_repository.get_deactivated_user_ids(within=timedelta(minutes=1)) == []
+
+        await user_repository.deactivate_user(user.id)
+        assert await user_repository.get_deactivated_user_ids(within=timedelta(minutes=1)) == [user.id]
@@ -1,24 +1,34 @@
 import pytest
 
 from backend.blog.schemas import PostInDB
-from backend.models import Post
+from backend.core.cache import LRUCache
+from backend.core.container import blog_service, post_repository
+from backend.core.context_vars import SESSION
+
+
+@pytest.fixture(autouse=True)
+def clear_blog_cache():
+    blog_service.cache = LRUCache(max_size=16)
 
 
 @pytest.fixture
-def create_post(create_obj_in_db):
-    async def _create_post(text: str, owner_id: int) -> PostInDB:
-        return PostInDB.from_orm(await create_obj_in_db(
-            obj=Post(text=text, owner_id=owner_id)
-        ))
+def create_post(async_session):
+    async def _create_post(text: str, owner_id: int, parent_id: int | None = None) -> PostInDB:
+        # Посты создаются через репозиторий, чтобы path и счетчики дерева были консистентны
+        token = SESSION.set(async_session)
+        try:
+            post = await post_repository.create_post(owner_id=owner_id, text=text, parent_id=parent_id)
+            await async_session.commit()
+        finally:
+            SESSION.reset(token)
+        return post
 
     return _create_post
 
 
 @pytest.fixture
-def create_comment(create_obj_in_db):
+def create_comment(create_post):
     async def _create_comment(text: str, owner_id: int, parent_id: int) -> PostInDB:
-        return PostInDB.from_orm(await create_obj_in_db(
-            obj=Post(text=text, owner_id=owner_id, parent_id=parent_id)
-        ))
+        return await create_post(text=text, owner_id=owner_id, parent_id=parent_id)
 
     return _create_comment
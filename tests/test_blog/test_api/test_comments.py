@@ -60,3 +60,54 @@ class TestCreateComment:
             'text': new_comment.text,
             'parent_id': post.id,
         }
+
+
+@pytest.mark.asyncio
+class TestBulkCreateComments:
+    url = '/blog/comments/bulk'
+
+    async def test_auth_required(self, async_client):
+        response = await async_client.post(self.url, json=[{'text': 'new_comment', 'parent_id': 1}])
+        assert response.status_code == 401
+
+    @pytest.mark.parametrize('data', [[], [{'text': 'new_comment'}]], ids=['empty', 'no_parent_id'])
+    async def test_validation(self, async_client, create_user, data):
+        token, _ = await create_user('user', 'password')
+        response = await async_client.post(self.url, json=data, headers={'Authorization': token})
+        assert response.status_code == 422
+
+    async def test_partial_success(self, async_client, async_session, create_post, create_user):
+        token, user = await create_user('user', 'password')
+        post = await create_post('post', owner_id=user.id)
+
+        response = await async_client.post(
+            url=self.url,
+            json=[
+                {'text': 'comment_1', 'parent_id': post.id},
+                {'text': 'invalid', 'parent_id': post.id + 100},
+                {'text': 'comment_2', 'parent_id': post.id},
+            ],
+            headers={'Authorization': token}
+        )
+        assert response.status_code == 200
+
+        comments = (await async_session.execute(
+            select(Post).filter(Post.parent_id == post.id).order_by(Post.id)
+        )).scalars().all()
+        assert [c.text for c in comments] == ['comment_1', 'comment_2']
+        assert response.json() == [
+            {
+                'comment': {
+                    'id': comment.id,
+                    'created_at': comment.created_at.isoformat(),
+                    'owner_id': user.id,
+                    'text': comment.text,
+                    'parent_id': post.id,
+                },
+                'error': None,
+            } if comment else {'comment': None, 'error': 'Invalid parentId'}
+            for comment in (comments[0], None, comments[1])
+        ]
+
+        response = await async_client.get(f'/blog/posts/{post.id}/')
+        assert response.json()['comments_count'] == 2
@@ -1,11 +1,14 @@
-from unittest.mock import AsyncMock, patch
+from unittest.mock import patch
 
 import pytest
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.blog.repositories import PostRepository
 from backend.blog.schemas import PostInDB
-from backend.models import Post
+from backend.blog.tasks import PURGE_DELETED_POSTS
+from backend.core import settings
+from backend.models import Job, Post
 
 
 @pytest.mark.asyncio
@@ -38,15 +41,6 @@ class TestCreatePost:
 class TestGetAllPosts:
     url = '/blog/posts/'
 
-    @pytest.fixture(autouse=True)
-    def mock_async_session_in_repo(self, async_session):
-        with patch('backend.blog.repositories.async_session') as mock:
-            mock.return_value = AsyncMock(
-                __aenter__=AsyncMock(return_value=async_session),
-                __aexit__=AsyncMock(return_value=None)
-            )
-            yield mock
-
     async def test_without_comments_belongs_current_user(self, create_user, create_post, async_client):
         _, user = await create_user('user', 'password')
         posts: list[PostInDB] = [
@@ -59,6 +53,7 @@ class TestGetAllPosts:
             'limit': 2,
             'offset': 0,
             'total': len(posts),
+            'exact_total': True,
             'items': [
                 {
                     'id': posts[-1].id,
@@ -90,6 +85,7 @@ class TestGetAllPosts:
             'limit': 10,
             'offset': 0,
             'total': 2,
+            'exact_total': True,
             'items': [
                 {
                     'id': post_2.id,
@@ -121,6 +117,7 @@ class TestGetAllPosts:
             'limit': 10,
             'offset': 0,
             'total': 1,
+            'exact_total': True,
             'items': [
                 {
                     'id': post.id,
@@ -132,6 +129,79 @@ class TestGetAllPosts:
             ]
         }
 
+    async def test_without_total(self, create_user, create_post, async_client):
+        _, user = await create_user('user', 'password')
+        await create_post(text='post', owner_id=user.id)
+
+        response = await async_client.get(self.url, params={'with_total': False})
+        assert response.status_code == 200
+        assert response.json()['total'] is None
+        assert response.json()['exact_total'] is False
+        assert len(response.json()['items']) == 1
+
+    async def test_estimated_total(self, create_user, create_post, async_client):
+        _, user = await create_user('user', 'password')
+        await create_post(text='post', owner_id=user.id)
+
+        response = await async_client.get(self.url, params={'estimated_total': True})
+        assert response.status_code == 200
+        assert isinstance(response.json()['total'], int)
+        assert response.json()['exact_total'] is False
+
+    async def test_by_cursor(self, create_user, create_post, async_client):
+        _, user = await create_user('user', 'password')
+        posts: list[PostInDB] = [
+            await create_post(text=f'post_{i}', owner_id=user.id)
+            for i in range(3)
+        ]
+
+        response = await async_client.get(self.url, params={'limit': 2, 'cursor': ''})
+        assert response.status_code == 200
+        first_page = response.json()
+        assert first_page['limit'] == 2
+        assert [item['id'] for item in first_page['items']] == [posts[2].id, posts[1].id]
+        assert first_page['next_cursor']
+
+        response = await async_client.get(self.url, params={'limit': 2, 'cursor': first_page['next_cursor']})
+        assert response.status_code == 200
+        assert response.json() == {
+            'limit': 2,
+            'next_cursor': None,
+            'items': [
+                {
+                    'id': posts[0].id,
+                    'text': posts[0].text,
+                    'created_at': posts[0].created_at.isoformat(),
+                    'comments_count': 0,
+                    'owner': {'id': user.id, 'username': user.username}
+                },
+            ]
+        }
+
+    async def test_not_modified(self, create_user, create_post, async_client):
+        _, user = await create_user('user', 'password')
+        await create_post(text='post', owner_id=user.id)
+
+        response = await async_client.get(self.url)
+        etag = response.headers['etag']
+        assert response.headers['cache-control'] == settings.CACHE.HTTP_CACHE_CONTROL
+
+        response = await async_client.get(self.url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag
+        assert response.content == b''
+
+        await create_post(text='new post', owner_id=user.id)
+        response = await async_client.get(self.url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['etag'] != etag
+
+    @pytest.mark.parametrize('cursor', ['invalid', 'WyJub3QgYSBkYXRlIiwgMV0='], ids=['not base64', 'invalid position'])
+    async def test_invalid_cursor(self, async_client, cursor):
+        response = await async_client.get(self.url, params={'cursor': cursor})
+        assert response.status_code == 400
+        assert response.json() == {'error': 'Invalid cursor'}
+
 
 @pytest.mark.asyncio
 class TestGetPostDescription:
@@ -235,6 +305,122 @@ class TestGetPostDescription:
             ]
         }
 
+    async def test_cache_invalidated_by_comment(self, create_user, create_post, async_client):
+        token, user = await create_user('user', 'password')
+        post = await create_post(text='post', owner_id=user.id)
+
+        response = await async_client.get(self.url.format(post_id=post.id))
+        assert response.json()['comments'] == []
+
+        response = await async_client.post(
+            '/blog/comments/', json={'text': 'comment', 'parent_id': post.id}, headers={'Authorization': token}
+        )
+        assert response.status_code == 201
+
+        response = await async_client.get(self.url.format(post_id=post.id))
+        assert response.json()['comments_count'] == 1
+        assert [comment['text'] for comment in response.json()['comments']] == ['comment']
+
+    async def test_not_modified(self, create_user, create_post, create_comment, async_client):
+        token, user = await create_user('user', 'password')
+        post = await create_post(text='post', owner_id=user.id)
+        comment = await create_comment(text='comment', owner_id=user.id, parent_id=post.id)
+        url = self.url.format(post_id=post.id)
+
+        response = await async_client.get(url)
+        etag = response.headers['etag']
+        assert etag == f'"{post.id}.1"'
+
+        with patch.object(PostRepository, 'get_single_post') as get_single_post_mock:
+            response = await async_client.get(url, headers={'If-None-Match': f'"other", W/{etag}'})
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag
+        get_single_post_mock.assert_not_awaited()
+
+        response = await async_client.patch(
+            self.url.format(post_id=comment.id), json={'text': 'edited'}, headers={'Authorization': token}
+        )
+        assert response.status_code == 200
+
+        response = await async_client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['etag'] == f'"{post.id}.2"'
+        assert response.json()['comments'][0]['text'] == 'edited'
+
+    async def test_comment_not_found(self, create_user, create_post, create_comment, async_client):
+        _, user = await create_user('user', 'password')
+        post = await create_post(text='post', owner_id=user.id)
+        comment = await create_comment(text='comment', owner_id=user.id, parent_id=post.id)
+        url = self.url.format(post_id=comment.id)
+
+        response = await async_client.get(url)
+        assert response.status_code == 404
+        assert 'etag' not in response.headers
+
+        response = await async_client.get(url, headers={'If-None-Match': f'"{comment.id}.0"'})
+        assert response.status_code == 404
+
+    async def test_cache_control(self, create_user, create_post, async_client):
+        _, user = await create_user('user', 'password')
+        post = await create_post(text='post', owner_id=user.id)
+
+        with patch.object(settings.CACHE, 'HTTP_CACHE_CONTROL', 'public, max-age=60'):
+            response = await async_client.get(self.url.format(post_id=post.id))
+        assert response.headers['cache-control'] == 'public, max-age=60'
+
+    async def test_limited_tree(self, create_user, create_post, create_comment, async_client):
+        """
+        post
+         |_ comment_1
+            |_ comment_2
+               |_ comment_3
+         |_ comment_4
+         |_ comment_5
+        """
+        _, user = await create_user('user', 'password')
+        post = await create_post(text='post', owner_id=user.id)
+        comment_1 = await create_comment(text='comment_1', owner_id=user.id, parent_id=post.id)
+        comment_2 = await create_comment(text='comment_2', owner_id=user.id, parent_id=comment_1.id)
+        _ = await create_comment(text='comment_3', owner_id=user.id, parent_id=comment_2.id)
+        _ = await create_comment(text='comment_4', owner_id=user.id, parent_id=post.id)
+        comment_5 = await create_comment(text='comment_5', owner_id=user.id, parent_id=post.id)
+
+        response = await async_client.get(self.url.format(post_id=post.id), params={'limit': 1, 'max_depth': 1})
+        assert response.status_code == 200
+        data = response.json()
+        assert data['comments_count'] == 5
+        assert [comment['id'] for comment in data['comments']] == [comment_5.id]
+        assert data['comments'][0]['comments'] == []
+        assert 'next_cursor' not in data['comments'][0]
+
+        response = await async_client.get(
+            self.url.format(post_id=post.id) + 'comments/',
+            params={'limit': 1, 'max_depth': 1, 'cursor': data['next_cursor']}
+        )
+        assert response.status_code == 200
+        page = response.json()
+        assert [comment['id'] for comment in page['items']] == [comment_5.id - 1]
+        assert page['next_cursor']
+
+        response = await async_client.get(
+            self.url.format(post_id=post.id) + 'comments/',
+            params={'limit': 1, 'max_depth': 2, 'cursor': page['next_cursor']}
+        )
+        page = response.json()
+        assert [comment['id'] for comment in page['items']] == [comment_1.id]
+        assert 'next_cursor' not in page
+        assert [comment['id'] for comment in page['items'][0]['comments']] == [comment_2.id]
+
+        response = await async_client.get(
+            self.url.format(post_id=comment_2.id) + 'comments/',
+            params={'cursor': page['items'][0]['comments'][0]['next_cursor']}
+        )
+        assert [comment['text'] for comment in response.json()['items']] == ['comment_3']
+
+    async def test_comments_post_not_found(self, async_client):
+        response = await async_client.get(self.url.format(post_id=1) + 'comments/')
+        assert response.status_code == 404
+
 
 @pytest.mark.asyncio
 class TestUpdatePost:
@@ -333,3 +519,22 @@ class TestDeletePost:
         assert response.status_code == 204
 
         assert not (await async_session.execute(select(func.count(Post.id)))).scalar()
+
+    async def test_large_thread_soft_deleted(
+        self, create_user, create_post, create_comment, async_client, async_session
+    ):
+        token, user = await create_user('user', 'password')
+        post = await create_post(text='post', owner_id=user.id)
+        comment = await create_comment(text='comment', owner_id=user.id, parent_id=post.id)
+        await create_comment(text='reply', owner_id=user.id, parent_id=comment.id)
+
+        with patch.object(settings.POST_PURGE, 'SYNC_MAX_DESCENDANTS', 1):
+            response = await async_client.delete(url=self.url.format(post_id=post.id), headers={'Authorization': token})
+        assert response.status_code == 204
+
+        # Строки остаются до фоновой очистки, но уже не видны
+        assert (await async_session.execute(select(func.count(Post.id)))).scalar() == 3
+        assert (await async_session.execute(select(Job.name))).scalars().all() == [PURGE_DELETED_POSTS]
+        assert (await async_client.get(self.url.format(post_id=post.id))).status_code == 404
+        assert (await async_client.get(self.url.format(post_id=comment.id))).status_code == 404
+        assert (await async_client.get('/blog/posts/')).json()['total'] == 0
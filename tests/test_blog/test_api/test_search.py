@@ -0,0 +1,78 @@
+import pytest
+import pytest_asyncio
+
+
+@pytest.mark.asyncio
+class TestSearch:
+    url = '/blog/search/'
+
+    @pytest_asyncio.fixture
+    async def thread(self, create_user, create_post, create_comment):
+        _, user = await create_user('user', 'password')
+        post_1 = await create_post('Асинхронные запросы к Postgres', owner_id=user.id)
+        comment = await create_comment('запрос к базе можно ускорить индексом', owner_id=user.id, parent_id=post_1.id)
+        post_2 = await create_post('индексы и запросы, запросы, запросы', owner_id=user.id)
+        await create_post('Про кошек', owner_id=user.id)
+        return user, post_1, comment, post_2
+
+    async def test_query_required(self, async_client):
+        response = await async_client.get(self.url)
+        assert response.status_code == 422
+
+    async def test_ranking_and_highlight(self, async_client, thread):
+        user, post_1, comment, post_2 = thread
+
+        response = await async_client.get(self.url, params={'q': 'запрос'})
+        assert response.status_code == 200
+        data = response.json()
+        assert data['next_cursor'] is None
+        # Стемминг: "запрос" находит "запросы", больше совпадений - выше ранг
+        assert [item['id'] for item in data['items']][0] == post_2.id
+        assert {item['id'] for item in data['items']} == {post_1.id, comment.id, post_2.id}
+
+        item = next(item for item in data['items'] if item['id'] == comment.id)
+        assert item['parent_id'] == post_1.id
+        assert item['root_id'] == post_1.id
+        assert item['owner'] == {'id': user.id, 'username': 'user'}
+        assert '<mark>запрос</mark>' in item['highlight']
+
+    async def test_highlight_escaped(self, async_client, create_user, create_post):
+        _, user = await create_user('user', 'password')
+        await create_post('запрос & 1 < 2 "кавычки" \x02лишняя разметка\x03 <b onclick=alert(1)>', owner_id=user.id)
+
+        response = await async_client.get(self.url, params={'q': 'запрос'})
+        highlight = response.json()['items'][0]['highlight']
+        assert highlight.startswith('<mark>запрос</mark> &amp; 1 &lt; 2 &quot;кавычки&quot;')
+        assert highlight.replace('<mark>', '').replace('</mark>', '').count('<') == 0
+        assert highlight.count('<mark>') == 1
+
+    async def test_websearch_syntax(self, async_client, thread):
+        _, post_1, _, _ = thread
+        response = await async_client.get(self.url, params={'q': 'запрос -индекс'})
+        assert [item['id'] for item in response.json()['items']] == [post_1.id]
+
+    async def test_thread(self, async_client, thread):
+        _, post_1, comment, _ = thread
+        response = await async_client.get(self.url, params={'q': 'запрос', 'root_id': post_1.id})
+        assert {item['id'] for item in response.json()['items']} == {post_1.id, comment.id}
+
+    async def test_keyset_pagination(self, async_client, thread):
+        params = {'q': 'запрос', 'limit': 2}
+        first_page = (await async_client.get(self.url, params=params)).json()
+        assert len(first_page['items']) == 2
+        assert first_page['next_cursor']
+
+        second_page = (await async_client.get(self.url, params={**params, 'cursor': first_page['next_cursor']})).json()
+        assert len(second_page['items']) == 1
+        assert second_page['next_cursor'] is None
+
+        all_items = (await async_client.get(self.url, params={'q': 'запрос'})).json()['items']
+        assert first_page['items'] + second_page['items'] == all_items
+
+    async def test_invalid_cursor(self, async_client):
+        response = await async_client.get(self.url, params={'q': 'запрос', 'cursor': 'invalid'})
+        assert response.status_code == 400
+
+    async def test_nothing_found(self, async_client, thread):
+        response = await async_client.get(self.url, params={'q': 'собаки'})
+        assert response.json() == {'limit': 10, 'next_cursor': None, 'items': []}
@@ -0,0 +1,54 @@
+import pytest
+
+
+@pytest.mark.asyncio
+class TestUserPosts:
+
+    async def test_user_not_found(self, async_client):
+        response = await async_client.get('/blog/users/100500/posts/')
+        assert response.status_code == 404
+        assert response.json() == {'error': 'User not found'}
+
+    async def test_empty(self, async_client, create_user):
+        _, user = await create_user('user', 'password')
+        response = await async_client.get(f'/blog/users/{user.id}/posts/')
+        assert response.status_code == 200
+        assert response.json() == {'limit': 10, 'next_cursor': None, 'items': []}
+
+    async def test_pagination(self, async_client, create_user, create_post, create_comment):
+        _, user = await create_user('user', 'password')
+        _, other = await create_user('other', 'password')
+        posts = [await create_post(f'post_{i}', owner_id=user.id) for i in range(3)]
+        await create_post('other', owner_id=other.id)
+        await create_comment('comment', owner_id=other.id, parent_id=posts[0].id)
+        url = f'/blog/users/{user.id}/posts/'
+
+        first_page = (await async_client.get(url, params={'limit': 2, 'with_counts': True})).json()
+        assert [item['id'] for item in first_page['items']] == [posts[2].id, posts[1].id]
+        assert first_page['items'][0]['comments_count'] == 0
+        assert first_page['next_cursor']
+
+        second_page = (await async_client.get(url, params={
+            'limit': 2, 'with_counts': True, 'cursor': first_page['next_cursor'],
+        })).json()
+        assert second_page['next_cursor'] is None
+        assert [(item['id'], item['comments_count']) for item in second_page['items']] == [(posts[0].id, 1)]
+
+    async def test_include_comments(self, async_client, create_user, create_post, create_comment):
+        _, user = await create_user('user', 'password')
+        _, other = await create_user('other', 'password')
+        post = await create_post('post', owner_id=other.id)
+        comment = await create_comment('comment', owner_id=user.id, parent_id=post.id)
+        url = f'/blog/users/{user.id}/posts/'
+
+        assert (await async_client.get(url)).json()['items'] == []
+
+        items = (await async_client.get(url, params={'include_comments': True})).json()['items']
+        assert [item['id'] for item in items] == [comment.id]
+        assert items[0]['parent_id'] == post.id
+        assert 'comments_count' not in items[0]
+
+    async def test_invalid_cursor(self, async_client, create_user):
+        _, user = await create_user('user', 'password')
+        response = await async_client.get(f'/blog/users/{user.id}/posts/', params={'cursor': 'invalid'})
+        assert response.status_code == 400
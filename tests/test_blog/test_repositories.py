@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 from sqlalchemy import func, select
 
@@ -40,6 +42,26 @@ class TestPostRepository(BaseRepoTest):
         assert updated_post.text == 'text2'
         assert updated_post.updated_at != post.updated_at
 
+    async def test_post_version(self, async_session, create_user):
+        _, user = await create_user(username='username', password='password')
+        post = await post_repository.create_post(owner_id=user.id, text='post')
+        comment = await post_repository.create_post(owner_id=user.id, text='comment', parent_id=post.id)
+        assert await post_repository.get_post_version(post_id=post.id) == 1
+        assert await post_repository.get_post_version(post_id=comment.id) is None
+
+        reply = await post_repository.create_post(owner_id=user.id, text='reply', parent_id=comment.id)
+        await post_repository.update_post(post_id=reply.id, text='edited')
+        versions = dict((await async_session.execute(select(Post.id, Post.version))).all())
+        assert versions == {post.id: 3, comment.id: 2, reply.id: 1}
+
+        await post_repository.update_post(post_id=post.id, text='edited')
+        await post_repository.delete_post(post_id=reply.id)
+        versions = dict((await async_session.execute(select(Post.id, Post.version))).all())
+        assert versions == {post.id: 5, comment.id: 3}
+
+        await post_repository.soft_delete_post(post_id=comment.id)
+        assert await post_repository.get_post_version(post_id=post.id) == 6
+
     async def test_delete_post(self, async_session, create_user, create_post):
         _, user = await create_user(username='username', password='password')
         post = await create_post(owner_id=user.id, text='text')
@@ -47,3 +69,151 @@ class TestPostRepository(BaseRepoTest):
 
         await post_repository.delete_post(post_id=post.id)
         assert not (await async_session.execute(select(func.count(Post.id)))).scalar()
+
+    async def test_create_comment_updates_tree_counters(self, async_session, create_user, create_post):
+        _, user = await create_user(username='username', password='password')
+        post = await create_post(owner_id=user.id, text='post')
+        comment_1 = await post_repository.create_post(owner_id=user.id, text='comment_1', parent_id=post.id)
+        comment_2 = await post_repository.create_post(owner_id=user.id, text='comment_2', parent_id=comment_1.id)
+
+        assert comment_1.root_id == post.id
+        assert comment_2.root_id == post.id
+
+        counters = dict((await async_session.execute(select(Post.id, Post.descendants_count))).all())
+        assert counters == {post.id: 2, comment_1.id: 1, comment_2.id: 0}
+
+    async def test_delete_comment_updates_tree_counters(self, async_session, create_user, create_post):
+        _, user = await create_user(username='username', password='password')
+        post = await create_post(owner_id=user.id, text='post')
+        comment_1 = await post_repository.create_post(owner_id=user.id, text='comment_1', parent_id=post.id)
+        comment_2 = await post_repository.create_post(owner_id=user.id, text='comment_2', parent_id=comment_1.id)
+        _ = await post_repository.create_post(owner_id=user.id, text='comment_3', parent_id=comment_2.id)
+        comment_4 = await post_repository.create_post(owner_id=user.id, text='comment_4', parent_id=post.id)
+
+        await post_repository.delete_post(post_id=comment_2.id)
+
+        counters = dict((await async_session.execute(select(Post.id, Post.descendants_count))).all())
+        assert counters == {post.id: 2, comment_1.id: 0, comment_4.id: 0}
+
+    async def test_create_comments(self, async_session, create_user, create_post):
+        _, user = await create_user(username='username', password='password')
+        post_1 = await create_post(owner_id=user.id, text='post_1')
+        post_2 = await create_post(owner_id=user.id, text='post_2')
+        comment = await post_repository.create_post(owner_id=user.id, text='comment', parent_id=post_1.id)
+
+        created = await post_repository.create_comments(owner_id=user.id, comments=[
+            ('reply_1', comment.id),
+            ('invalid', 100500),
+            ('reply_2', comment.id),
+            ('reply_3', post_2.id),
+        ])
+
+        assert [c and c.text for c in created] == ['reply_1', None, 'reply_2', 'reply_3']
+        assert [c and c.root_id for c in created] == [post_1.id, None, post_1.id, post_2.id]
+
+        counters = dict((await async_session.execute(select(Post.id, Post.descendants_count))).all())
+        assert counters[post_1.id] == 3
+        assert counters[comment.id] == 2
+        assert counters[post_2.id] == 1
+
+    async def test_create_comments_all_invalid(self, async_session, create_user):
+        _, user = await create_user(username='username', password='password')
+        assert await post_repository.create_comments(owner_id=user.id, comments=[('text', 1)]) == [None]
+        assert not (await async_session.execute(select(func.count(Post.id)))).scalar()
+
+    async def test_get_user_posts(self, async_session, create_user, create_post):
+        _, user = await create_user(username='username', password='password')
+        _, other = await create_user(username='other', password='password')
+        post_1 = await create_post(owner_id=user.id, text='post_1')
+        post_2 = await create_post(owner_id=user.id, text='post_2')
+        await create_post(owner_id=other.id, text='other')
+        comment = await post_repository.create_post(owner_id=user.id, text='comment', parent_id=post_1.id)
+
+        items, has_next = await post_repository.get_user_posts(user_id=user.id, limit=10, with_counts=True)
+        assert not has_next
+        assert [(item['id'], item['comments_count']) for item in items] == [(post_2.id, 0), (post_1.id, 1)]
+
+        items, _ = await post_repository.get_user_posts(user_id=user.id, limit=10, include_comments=True)
+        assert [item['id'] for item in items] == [comment.id, post_2.id, post_1.id]
+        assert 'comments_count' not in items[0]
+
+        items, has_next = await post_repository.get_user_posts(user_id=user.id, limit=1)
+        assert has_next
+        after = (items[0]['created_at'], items[0]['id'])
+        items, has_next = await post_repository.get_user_posts(user_id=user.id, limit=1, after=after)
+        assert [item['id'] for item in items] == [post_1.id]
+        assert not has_next
+
+    async def test_tree_paths(self, async_session, create_user):
+        _, user = await create_user(username='username', password='password')
+        post = await post_repository.create_post(owner_id=user.id, text='post')
+        comment = await post_repository.create_post(owner_id=user.id, text='comment', parent_id=post.id)
+        reply_1, invalid, reply_2 = await post_repository.create_comments(owner_id=user.id, comments=[
+            ('reply_1', comment.id), ('invalid', 100500), ('reply_2', post.id),
+        ])
+
+        assert post.path == [post.id]
+        assert comment.path == [post.id, comment.id]
+        assert invalid is None
+        assert reply_1.path == [post.id, comment.id, reply_1.id]
+        assert reply_2.path == [post.id, reply_2.id]
+
+        stored = dict((await async_session.execute(select(Post.id, Post.path))).all())
+        assert stored == {row.id: row.path for row in (post, comment, reply_1, reply_2)}
+
+    async def test_subtree_range_matches_recursive_tree(self, async_session, create_user):
+        _, user = await create_user(username='username', password='password')
+        post = await post_repository.create_post(owner_id=user.id, text='post')
+        level = [post.id]
+        for depth in range(3):
+            created = await post_repository.create_comments(owner_id=user.id, comments=[
+                (f'comment {depth} {i}', parent_id) for parent_id in level for i in range(3)
+            ])
+            level = [comment.id for comment in created]
+        await post_repository.create_post(owner_id=user.id, text='other')
+
+        for max_depth, limit in ((None, None), (2, None), (None, 2), (2, 2), (1, 1)):
+            by_range = await post_repository.get_single_post(post.id, max_depth=max_depth, limit=limit)
+            with patch('backend.blog.repositories.SUBTREE_RANGE_MAX_NODES', 0):
+                recursive = await post_repository.get_single_post(post.id, max_depth=max_depth, limit=limit)
+            assert by_range == recursive
+
+    async def test_soft_delete_post(self, async_session, create_user):
+        _, user = await create_user(username='username', password='password')
+        post = await post_repository.create_post(owner_id=user.id, text='post')
+        comment = await post_repository.create_post(owner_id=user.id, text='comment', parent_id=post.id)
+        reply = await post_repository.create_post(owner_id=user.id, text='reply', parent_id=comment.id)
+        other = await post_repository.create_post(owner_id=user.id, text='other', parent_id=post.id)
+
+        await post_repository.soft_delete_post(post_id=comment.id)
+
+        counters = dict((await async_session.execute(select(Post.id, Post.descendants_count))).all())
+        assert counters == {post.id: 1, comment.id: 1, reply.id: 0, other.id: 0}
+        assert await post_repository.get_post_or_comment_in_db(post_id=reply.id) is None
+        tree = await post_repository.get_single_post(post.id)
+        assert [c['id'] for c in tree['comments']] == [other.id]
+        items, _ = await post_repository.get_user_posts(user_id=user.id, limit=10, include_comments=True)
+        assert [item['id'] for item in items] == [other.id, post.id]
+
+        with pytest.raises(InvalidPostId):
+            await post_repository.create_post(owner_id=user.id, text='text', parent_id=reply.id)
+        assert await post_repository.create_comments(owner_id=user.id, comments=[('text', reply.id)]) == [None]
+
+    async def test_purge_deleted_batch(self, async_session, create_user):
+        _, user = await create_user(username='username', password='password')
+        post = await post_repository.create_post(owner_id=user.id, text='post')
+        comments = await post_repository.create_comments(
+            owner_id=user.id, comments=[(f'comment {i}', post.id) for i in range(3)]
+        )
+        await post_repository.create_comments(owner_id=user.id, comments=[('reply', comments[0].id)] * 2)
+        kept = await post_repository.create_post(owner_id=user.id, text='kept')
+
+        assert await post_repository.purge_deleted_batch(batch_size=2) is None
+
+        await post_repository.soft_delete_post(post_id=post.id)
+        assert await post_repository.purge_deleted_batch(batch_size=2) == (post.id, 2, 3)
+        assert await post_repository.purge_deleted_batch(batch_size=2) == (post.id, 2, 1)
+        assert await post_repository.purge_deleted_batch(batch_size=2) == (post.id, 2, 0)
+        assert await post_repository.purge_deleted_batch(batch_size=2) is None
+
+        assert (await async_session.execute(select(Post.id))).scalars().all() == [kept.id]
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from backend.blog.schemas import PostWithComments, post_tree
+
+
+def make_row(post_id: int, parent_id: int | None) -> dict:
+    return {
+        'id': post_id,
+        'parent_id': parent_id,
+        'text': f'text_{post_id}',
+        'created_at': datetime.now(),
+        'user_id': 1,
+        'username': 'user',
+    }
+
+
+class TestPostTree:
+
+    def test_empty(self):
+        assert post_tree([]) is None
+
+    def test_keeps_rows_order(self):
+        rows = [make_row(5, 3), make_row(4, 1), make_row(3, 1), make_row(2, 1), make_row(1, None)]
+
+        post = post_tree(rows)
+        assert post['id'] == 1
+        assert post['comments_count'] == 4
+        assert [comment['id'] for comment in post['comments']] == [4, 3, 2]
+        assert [comment['id'] for comment in post['comments'][1]['comments']] == [5]
+        assert post['comments'][0]['owner'] == {'id': 1, 'username': 'user'}
+
+    def test_matches_response_model(self):
+        rows = [make_row(3, 2), make_row(2, 1), make_row(1, None)]
+        post = post_tree(rows)
+        assert PostWithComments.parse_obj(post).dict(exclude_none=True) == post
+
+    def test_deep_thread(self):
+        depth = 5_000
+        rows = [make_row(i, i - 1 or None) for i in range(depth, 0, -1)]
+
+        post = post_tree(rows)
+        assert post['comments_count'] == depth - 1
+
+        node, level = post, 0
+        while node['comments']:
+            node, level = node['comments'][0], level + 1
+        assert level == depth - 1
+
+    def test_with_limit(self):
+        rows = [make_row(4, 1), make_row(3, 1), make_row(2, 1), make_row(1, None)]
+        rows[1]['descendants_count'] = 5
+
+        post = post_tree(rows, limit=2)
+        assert [comment['id'] for comment in post['comments']] == [4, 3]
+        assert post['next_cursor']
+        assert 'next_cursor' not in post['comments'][0]
+        assert post['comments'][1]['next_cursor']
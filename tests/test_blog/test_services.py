@@ -5,9 +5,12 @@ import pytest
 
 from backend.blog.exceptions import PostNotFound
 from backend.blog.repositories import InvalidPostId, PostRepository
-from backend.blog.schemas import Comment, PostInDB, UpdatePost
+from backend.blog.schemas import Comment, PostInDB, PostWithComments, UpdatePost
+from backend.blog.tasks import PURGE_DELETED_POSTS
+from backend.core import settings
 from backend.core.container import blog_service
 from backend.core.exceptions import Forbidden
+from backend.core.jobs import JobRepository
 
 
 @pytest.mark.asyncio
@@ -37,6 +40,42 @@ class TestBlogService:
         create_post_mock.assert_awaited_once_with(owner_id=1, text='text', parent_id=1)
         assert obj == Comment.parse_obj(post_in_db)
 
+    @patch.object(PostRepository, 'get_single_post')
+    async def test_get_single_post_cached(self, get_single_post_mock, post_in_db):
+        get_single_post_mock.return_value = PostWithComments(
+            id=1, text='text', created_at=post_in_db.created_at, comments_count=0, owner={'id': 1, 'username': 'user'}
+        )
+        data = await blog_service.get_single_post(post_id=1, max_depth=10, limit=50, version=0)
+        assert await blog_service.get_single_post(post_id=1, max_depth=10, limit=50, version=0) == data
+        get_single_post_mock.assert_awaited_once_with(post_id=1, max_depth=10, limit=50)
+
+        await blog_service.get_single_post(post_id=1, max_depth=1, limit=50, version=0)
+        assert get_single_post_mock.await_count == 2
+
+        # Новая версия дерева не читает вариант, закешированный для старой
+        await blog_service.get_single_post(post_id=1, max_depth=10, limit=50, version=1)
+        assert get_single_post_mock.await_count == 3
+
+    @patch.object(PostRepository, 'get_single_post', return_value=None)
+    async def test_get_single_post_not_found(self, _):
+        with pytest.raises(PostNotFound):
+            await blog_service.get_single_post(post_id=1, max_depth=10, limit=50, version=0)
+
+    @patch.object(PostRepository, 'get_post_version', return_value=None)
+    async def test_get_post_version_not_found(self, _):
+        with pytest.raises(PostNotFound):
+            await blog_service.get_post_version(post_id=1)
+
+    @patch.object(PostRepository, 'delete_post')
+    @patch.object(PostRepository, 'get_post_or_comment_in_db')
+    async def test_delete_comment_invalidates_root(self, get_post_or_comment_in_db_mock, _, post_in_db):
+        post_in_db.owner_id, post_in_db.root_id = 5, 10
+        get_post_or_comment_in_db_mock.return_value = post_in_db
+        await blog_service.cache.hset('post:10', '10:50', b'{}', ttl=60)
+
+        await blog_service.delete_post(post_id=1, user_id=5)
+        assert await blog_service.cache.hget('post:10', '10:50') is None
+
     @patch.object(PostRepository, 'get_post_or_comment_in_db', return_value=None)
     async def test_update_post_not_found(self, get_post_or_comment_in_db_mock):
         with pytest.raises(PostNotFound):
@@ -90,3 +129,18 @@ class TestBlogService:
         await blog_service.delete_post(post_id=1, user_id=5)
         get_post_or_comment_in_db_mock.assert_awaited_once_with(post_id=1)
         delete_post_mock.assert_awaited_once_with(post_id=1)
+
+    @patch.object(JobRepository, 'enqueue')
+    @patch.object(PostRepository, 'soft_delete_post')
+    @patch.object(PostRepository, 'delete_post')
+    @patch.object(PostRepository, 'get_post_or_comment_in_db')
+    async def test_delete_large_thread_in_background(
+        self, get_post_or_comment_in_db_mock, delete_post_mock, soft_delete_post_mock, enqueue_mock, post_in_db
+    ):
+        get_post_or_comment_in_db_mock.return_value = post_in_db
+        post_in_db.owner_id, post_in_db.descendants_count = 5, settings.POST_PURGE.SYNC_MAX_DESCENDANTS + 1
+
+        await blog_service.delete_post(post_id=1, user_id=5)
+        soft_delete_post_mock.assert_awaited_once_with(post_id=1)
+        enqueue_mock.assert_awaited_once_with(PURGE_DELETED_POSTS)
+        delete_post_mock.assert_not_awaited()
@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select
+
+from tests.base import BaseRepoTest
+
+from backend.blog.repositories import PostRepository
+from backend.blog.tasks import POSTS_PURGE_REMAINING, POSTS_PURGED, PURGE_DELETED_POSTS, purge_deleted_posts, \
+    schedule_purge
+from backend.core.container import post_repository
+from backend.core.jobs import JobRepository, job_runner
+from backend.models import Job
+
+
+def test_registered():
+    assert job_runner.handlers[PURGE_DELETED_POSTS] is purge_deleted_posts
+
+
+@pytest.mark.asyncio
+class TestPurgeDeletedPosts:
+
+    @patch.object(JobRepository, 'enqueue')
+    @patch.object(PostRepository, 'purge_deleted_batch', return_value=(1, 100, 50))
+    async def test_purge_batch(self, purge_mock, enqueue_mock):
+        purged_before = POSTS_PURGED.get()
+
+        await purge_deleted_posts(batch_size=100)
+        purge_mock.assert_awaited_once_with(batch_size=100)
+        enqueue_mock.assert_awaited_once_with(PURGE_DELETED_POSTS, {'batch_size': 100})
+        assert POSTS_PURGED.get() == purged_before + 100
+        assert POSTS_PURGE_REMAINING.get() == 50
+
+    @patch.object(JobRepository, 'enqueue')
+    @patch.object(PostRepository, 'purge_deleted_batch', return_value=None)
+    async def test_nothing_to_purge(self, purge_mock, enqueue_mock):
+        await purge_deleted_posts(batch_size=100)
+        purge_mock.assert_awaited_once_with(batch_size=100)
+        enqueue_mock.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+class TestSchedulePurge(BaseRepoTest):
+
+    async def test_schedule_purge(self, async_session, create_user):
+        _, user = await create_user(username='username', password='password')
+        post = await post_repository.create_post(owner_id=user.id, text='post')
+
+        await schedule_purge()
+        assert (await async_session.execute(select(Job.id))).all() == []
+
+        await post_repository.soft_delete_post(post_id=post.id)
+        await schedule_purge()
+        await schedule_purge()
+        assert (await async_session.execute(select(Job.name))).scalars().all() == [PURGE_DELETED_POSTS]
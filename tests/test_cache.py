@@ -0,0 +1,41 @@
+from unittest.mock import patch
+
+import pytest
+
+from backend.core.cache import LRUCache
+
+
+@pytest.mark.asyncio
+class TestLRUCache:
+
+    async def test_hset_hget(self):
+        cache = LRUCache(max_size=2)
+        await cache.hset('name', 'field_1', b'value_1', ttl=60)
+        await cache.hset('name', 'field_2', b'value_2', ttl=60)
+        assert await cache.hget('name', 'field_1') == b'value_1'
+        assert await cache.hget('name', 'field_2') == b'value_2'
+        assert await cache.hget('name', 'field_3') is None
+        assert await cache.hget('unknown', 'field_1') is None
+
+    async def test_delete(self):
+        cache = LRUCache(max_size=2)
+        await cache.hset('name', 'field', b'value', ttl=60)
+        await cache.delete('name', 'unknown')
+        assert await cache.hget('name', 'field') is None
+
+    async def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        await cache.hset('name_1', 'field', b'value', ttl=60)
+        await cache.hset('name_2', 'field', b'value', ttl=60)
+        assert await cache.hget('name_1', 'field')
+
+        await cache.hset('name_3', 'field', b'value', ttl=60)
+        assert await cache.hget('name_1', 'field')
+        assert await cache.hget('name_2', 'field') is None
+
+    async def test_expired(self):
+        cache = LRUCache(max_size=2)
+        with patch('backend.core.cache.time.monotonic', return_value=100):
+            await cache.hset('name', 'field', b'value', ttl=60)
+        with patch('backend.core.cache.time.monotonic', return_value=160):
+            assert await cache.hget('name', 'field') is None
@@ -6,3 +6,14 @@ async def test_health_check(async_client):
     response = await async_client.get('/ping/')
     assert response.status_code == 200
     assert response.json() == {'status': 'ok'}
+
+
+@pytest.mark.asyncio
+async def test_metrics(async_client):
+    response = await async_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert '# TYPE db_pool_checkout_seconds histogram' in response.text
+    assert 'db_pool_size{engine="primary"} 5' in response.text
+    assert '# TYPE http_request_duration_seconds histogram' in response.text
+    assert '# TYPE db_query_duration_seconds histogram' in response.text
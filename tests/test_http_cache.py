@@ -0,0 +1,44 @@
+import pytest
+from starlette.requests import Request
+
+from backend.core.http_cache import body_etag, conditional_response, etag_matches
+
+
+def make_request(if_none_match: str | None = None) -> Request:
+    headers = [(b'if-none-match', if_none_match.encode())] if if_none_match is not None else []
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': headers})
+
+
+class TestEtagMatches:
+
+    @pytest.mark.parametrize('header, expected', [
+        (None, False),
+        ('', False),
+        ('"a"', True),
+        ('W/"a"', True),
+        ('"b", "a"', True),
+        ('"b"', False),
+        ('*', True),
+    ])
+    def test_etag_matches(self, header, expected):
+        assert etag_matches(make_request(header), '"a"') is expected
+
+
+class TestConditionalResponse:
+
+    def test_body_etag(self):
+        assert body_etag(b'{}') == body_etag(b'{}')
+        assert body_etag(b'{}') != body_etag(b'[]')
+
+    def test_full_response(self):
+        response = conditional_response(make_request(), b'{}')
+        assert response.status_code == 200
+        assert response.body == b'{}'
+        assert response.headers['etag'] == body_etag(b'{}')
+        assert 'cache-control' in response.headers
+
+    def test_not_modified(self):
+        response = conditional_response(make_request(body_etag(b'{}')), b'{}')
+        assert response.status_code == 304
+        assert response.body == b''
+        assert response.headers['etag'] == body_etag(b'{}')
@@ -0,0 +1,190 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from tests.base import BaseRepoTest
+
+from backend.core.context_vars import SESSION
+from backend.core.jobs import JOBS_PROCESSED, JobRepository, JobRunner
+from backend.models import Job
+
+
+job_repository = JobRepository()
+
+
+@pytest.fixture
+def session_factory(async_session):
+    @asynccontextmanager
+    async def factory():
+        yield async_session
+
+    return factory
+
+
+@pytest.mark.asyncio
+class TestJobRepository(BaseRepoTest):
+
+    async def test_claim(self, async_session):
+        first = await job_repository.enqueue('first', {'value': 1})
+        second = await job_repository.enqueue('second')
+        await job_repository.enqueue('later', run_at=datetime.now() + timedelta(hours=1))
+
+        jobs = await job_repository.claim(limit=1, lock_timeout=60)
+        assert [(job.id, job.name, job.payload, job.attempts) for job in jobs] == [(first, 'first', {'value': 1}, 1)]
+        assert [job.id for job in await job_repository.claim(limit=10, lock_timeout=60)] == [second]
+        assert await job_repository.claim(limit=10, lock_timeout=60) == []
+
+    async def test_claim_expired_lock(self, async_session):
+        job_id = await job_repository.enqueue('job')
+        assert len(await job_repository.claim(limit=1, lock_timeout=-1)) == 1
+
+        jobs = await job_repository.claim(limit=1, lock_timeout=60)
+        assert [(job.id, job.attempts) for job in jobs] == [(job_id, 2)]
+
+    async def test_complete(self, async_session):
+        job_id = await job_repository.enqueue('job')
+        await job_repository.complete(job_id)
+        assert (await async_session.execute(select(Job.id))).all() == []
+
+    async def test_fail(self, async_session):
+        await job_repository.enqueue('job', max_attempts=2)
+        job, = await job_repository.claim(limit=1, lock_timeout=60)
+
+        assert await job_repository.fail(job, error='error', retry_in=0) is True
+        job, = await job_repository.claim(limit=1, lock_timeout=60)
+        assert job.attempts == 2
+
+        assert await job_repository.fail(job, error='error', retry_in=0) is False
+        assert await job_repository.claim(limit=1, lock_timeout=60) == []
+        row = (await async_session.execute(select(Job.status, Job.last_error))).one()
+        assert tuple(row) == ('failed', 'error')
+
+    async def test_fail_retry_later(self, async_session):
+        await job_repository.enqueue('job')
+        job, = await job_repository.claim(limit=1, lock_timeout=60)
+
+        assert await job_repository.fail(job, error='error', retry_in=60) is True
+        assert await job_repository.claim(limit=1, lock_timeout=60) == []
+
+
+@pytest.mark.asyncio
+class TestJobRunner(BaseRepoTest):
+
+    async def test_execute(self, async_session, session_factory):
+        runner = JobRunner(session_factory=session_factory)
+        handler = runner.task('job')(AsyncMock())
+        done_before = JOBS_PROCESSED.get(name='job', status='done')
+
+        await job_repository.enqueue('job', {'value': 1})
+        job, = await job_repository.claim(limit=1, lock_timeout=60)
+        assert await runner.execute(job) == 'done'
+        handler.assert_awaited_once_with(value=1)
+        assert (await async_session.execute(select(Job.id))).all() == []
+        assert JOBS_PROCESSED.get(name='job', status='done') == done_before + 1
+
+    async def test_execute_retry(self, async_session, session_factory):
+        runner = JobRunner(session_factory=session_factory, retry_delay=60)
+
+        @runner.task('job')
+        async def handler():
+            await job_repository.enqueue('side effect')
+            raise ValueError('boom')
+
+        await job_repository.enqueue('job')
+        job, = await job_repository.claim(limit=1, lock_timeout=60)
+        await async_session.commit()
+        assert await runner.execute(job) == 'retry'
+
+        # Работа упавшего обработчика откатывается вместе с ним
+        rows = (await async_session.execute(select(Job.name, Job.status, Job.last_error))).all()
+        assert [tuple(row) for row in rows] == [('job', 'pending', "ValueError('boom')")]
+        assert await job_repository.claim(limit=1, lock_timeout=60) == []
+
+    async def test_execute_timeout(self, async_session, session_factory):
+        runner = JobRunner(session_factory=session_factory, lock_timeout=60, timeout=0.01)
+
+        @runner.task('job')
+        async def handler():
+            await asyncio.sleep(1)
+
+        await job_repository.enqueue('job')
+        job, = await job_repository.claim(limit=1, lock_timeout=60)
+        await async_session.commit()
+        assert await runner.execute(job) == 'retry'
+        assert (await async_session.execute(select(Job.last_error))).scalar_one() == 'TimeoutError()'
+
+    async def test_timeout_exceeds_lock(self):
+        with pytest.raises(ValueError):
+            JobRunner(lock_timeout=60, timeout=60)
+
+    async def test_execute_unknown(self, async_session, session_factory):
+        runner = JobRunner(session_factory=session_factory)
+        await job_repository.enqueue('unknown')
+        job, = await job_repository.claim(limit=1, lock_timeout=60)
+
+        assert await runner.execute(job) == 'failed'
+        assert (await async_session.execute(select(Job.status))).scalar_one() == 'failed'
+
+
+@pytest.mark.asyncio
+class TestJobRunnerLoop:
+
+    @pytest_asyncio.fixture
+    async def engine_session_factory(self, test_engine):
+        # Задания выполняются параллельно, поэтому каждому нужна своя сессия и настоящие коммиты
+        factory = sessionmaker(test_engine, expire_on_commit=False, class_=AsyncSession)
+        yield factory
+        async with factory() as session:
+            await session.execute(delete(Job))
+            await session.commit()
+
+    async def test_run(self, engine_session_factory):
+        runner = JobRunner(session_factory=engine_session_factory, concurrency=2, poll_interval=60)
+        values, running, max_running = [], 0, 0
+
+        @runner.task('job')
+        async def handler(value):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.05)
+            values.append(value)
+            running -= 1
+
+        async with engine_session_factory() as session:
+            token = SESSION.set(session)
+            for i in range(5):
+                await job_repository.enqueue('job', {'value': i})
+            await session.commit()
+            SESSION.reset(token)
+
+        runner.start()
+        for _ in range(200):
+            if len(values) == 5:
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+
+        assert sorted(values) == [0, 1, 2, 3, 4]
+        assert max_running == 2
+        async with engine_session_factory() as session:
+            assert (await session.execute(select(Job.id))).all() == []
+
+    async def test_periodic(self, engine_session_factory):
+        runner = JobRunner(session_factory=engine_session_factory, poll_interval=60)
+        func = runner.periodic(60)(AsyncMock())
+
+        runner.start()
+        for _ in range(100):
+            if func.await_count:
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+        func.assert_awaited_once_with()
@@ -0,0 +1,41 @@
+import random
+
+from load_fixtures import BASE_TIME, FixturesConfig, generate_posts, generate_tree
+
+
+class TestLoadFixtures:
+
+    def test_tree_counters(self):
+        config = FixturesConfig(depth=4, fan_out=3)
+        nodes = generate_tree(random.Random(1), config, root_id=10, owner_ids=range(1, 5), created_at=BASE_TIME)
+        assert nodes[0][3] is None and nodes[0][4] is None
+        assert [node[0] for node in nodes] == list(range(10, 10 + len(nodes)))
+
+        by_id = {node[0]: node for node in nodes}
+        for node in nodes[1:]:
+            assert node[4] == 10
+            assert node[3] < node[0]
+        assert nodes[0][5] == len(nodes) - 1
+        for node in nodes:
+            children = [child for child in nodes if child[3] == node[0]]
+            assert node[5] == sum(by_id[child[0]][5] + 1 for child in children)
+
+    def test_tree_paths(self):
+        config = FixturesConfig(depth=4, fan_out=3)
+        nodes = generate_tree(random.Random(1), config, root_id=10, owner_ids=range(1, 5), created_at=BASE_TIME)
+        by_id = {node[0]: node for node in nodes}
+        assert nodes[0][8] == [10]
+        for node in nodes[1:]:
+            assert node[8] == by_id[node[3]][8] + [node[0]]
+
+    def test_deterministic(self):
+        config = FixturesConfig(posts=20, depth=3, fan_out=4, seed=42)
+        assert list(generate_posts(config, 1, range(1, 10))) == list(generate_posts(config, 1, range(1, 10)))
+        assert list(generate_posts(config, 1, range(1, 10))) != list(
+            generate_posts(FixturesConfig(posts=20, depth=3, fan_out=4, seed=43), 1, range(1, 10))
+        )
+
+    def test_no_comments(self):
+        rows = list(generate_posts(FixturesConfig(posts=5, depth=0), 1, range(1, 2)))
+        assert [row[0] for row in rows] == [1, 2, 3, 4, 5]
+        assert all(row[3] is None for row in rows)
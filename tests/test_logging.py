@@ -0,0 +1,140 @@
+import json
+import logging
+import logging.config
+import sys
+import time
+
+import pytest
+
+from backend.core.context_vars import REQUEST_ID
+from backend.core.logging.filters import HealthCheckFilter, RequestIdFilter
+from backend.core.logging.formatters import JsonFormatter
+from backend.core.logging.handlers import QueueListenerHandler
+
+
+def make_record(msg: str = 'message', args=None, **extra) -> logging.LogRecord:
+    record = logging.LogRecord('backend.test', logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class CollectingHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+class TestFilters:
+
+    @pytest.mark.parametrize('path, expected', [('/ping/', False), ('/blog/posts/', True)])
+    def test_health_check_uvicorn_record(self, path, expected):
+        record = make_record('%s - "%s %s HTTP/%s" %d', ('127.0.0.1:1', 'GET', path, '1.1', 200))
+        assert HealthCheckFilter().filter(record) is expected
+
+    @pytest.mark.parametrize('path, expected', [('/ping/', False), ('/blog/posts/', True)])
+    def test_health_check_access_record(self, path, expected):
+        assert HealthCheckFilter().filter(make_record(path=path)) is expected
+
+    def test_health_check_does_not_format(self):
+        record = make_record('%s %s', ('/ping/',))  # неверное число аргументов
+        assert HealthCheckFilter().filter(record) is True
+
+    def test_request_id(self):
+        token = REQUEST_ID.set('abc')
+        try:
+            record = make_record()
+            RequestIdFilter().filter(record)
+        finally:
+            REQUEST_ID.reset(token)
+        assert record.request_id == 'abc'
+
+
+class TestJsonFormatter:
+
+    def test_format(self):
+        record = make_record('%s done', ('request',), request_id='abc', route='/blog/posts/', status=200, duration=0.1)
+        data = json.loads(JsonFormatter().format(record))
+        assert data.pop('time')
+        assert data == {
+            'level': 'INFO',
+            'logger': 'backend.test',
+            'message': 'request done',
+            'request_id': 'abc',
+            'route': '/blog/posts/',
+            'status': 200,
+            'duration': 0.1,
+        }
+
+    def test_exception(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = logging.LogRecord('backend.test', logging.ERROR, __file__, 1, 'failed', None, sys.exc_info())
+        data = json.loads(JsonFormatter().format(record))
+        assert data['message'] == 'failed'
+        assert 'ValueError: boom' in data['exc_info']
+
+
+class TestQueueListenerHandler:
+
+    def test_records_written_by_listener(self):
+        target = CollectingHandler()
+        handler = QueueListenerHandler(handlers=[target])
+        try:
+            try:
+                raise ValueError('boom')
+            except ValueError:
+                handler.handle(make_record('%s', ('message',), exc_info=sys.exc_info()))
+
+            deadline = time.monotonic() + 1
+            while not target.records and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            handler.close()
+            handler.close()
+
+        [record] = target.records
+        assert record.getMessage() == 'message'
+        assert record.exc_info is None
+        assert 'ValueError: boom' in record.exc_text
+
+    def test_dict_config(self):
+        # Так dictConfig создает обработчик queue, когда collect уже создан (он раньше по алфавиту)
+        target = CollectingHandler()
+        configurator = logging.config.DictConfigurator({'handlers': {
+            'collect': target,
+            'queue': {'()': QueueListenerHandler, 'handlers': ['cfg://handlers.collect']},
+        }})
+        handler = configurator.configure_handler(configurator.config['handlers']['queue'])
+        try:
+            assert handler.listener.handlers == (target,)
+        finally:
+            handler.close()
+
+    def test_target_not_configured(self):
+        with pytest.raises(ValueError):
+            QueueListenerHandler(handlers=[{'class': 'logging.StreamHandler'}])
+
+
+@pytest.mark.asyncio
+class TestAccessLog:
+
+    async def test_request_id_generated(self, async_client, caplog):
+        with caplog.at_level(logging.INFO, logger='backend.access'):
+            response = await async_client.get('/blog/posts/')
+        assert response.status_code == 200
+        request_id = response.headers['x-request-id']
+
+        [record] = [r for r in caplog.records if r.name == 'backend.access']
+        assert record.request_id == request_id
+        assert record.route == '/blog/posts/'
+        assert record.status == 200
+        assert record.duration > 0
+
+    async def test_request_id_from_header(self, async_client):
+        response = await async_client.get('/ping/', headers={'X-Request-ID': 'abc'})
+        assert response.headers['x-request-id'] == 'abc'
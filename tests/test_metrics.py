@@ -0,0 +1,124 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from backend.blog.repositories import PostRepository
+from backend.core.context_vars import SESSION
+from backend.core.database import POOL_CHECKOUT_SECONDS, QUERY_DURATION_SECONDS, QUERY_ERRORS, create_engine
+from backend.core.metrics import Counter, Gauge, Histogram, Metric, Registry
+from backend.core.middleware import REQUEST_DURATION_SECONDS, REQUESTS_IN_PROGRESS
+from backend.core.repository import BaseRepository
+
+
+class TestMetrics:
+
+    def test_counter(self):
+        counter = Counter('requests_total', 'Requests', labels=['method'])
+        counter.inc(method='GET')
+        counter.inc(2, method='GET')
+        counter.inc(method='POST')
+        assert counter.render() == '\n'.join([
+            '# HELP requests_total Requests',
+            '# TYPE requests_total counter',
+            'requests_total{method="GET"} 3',
+            'requests_total{method="POST"} 1',
+        ])
+
+    def test_gauge_callback(self):
+        gauge = Gauge('pool_size', 'Pool size', callback=lambda: 5)
+        assert gauge.get() == 5
+        assert gauge.render().endswith('pool_size 5')
+
+    def test_gauge_callback_with_labels(self):
+        gauge = Gauge(
+            'pool_size', 'Pool size', labels=['engine'], callback=lambda: {('replica_0',): 3, ('primary',): 5}
+        )
+        assert gauge.get(engine='replica_0') == 3
+        assert gauge.render().split('\n')[2:] == ['pool_size{engine="primary"} 5', 'pool_size{engine="replica_0"} 3']
+
+    def test_metric_is_abstract(self):
+        with pytest.raises(TypeError):
+            Metric('metric', 'Metric')
+
+    def test_histogram(self):
+        histogram = Histogram('latency_seconds', 'Latency', labels=['route'], buckets=[0.1, 1])
+        histogram.observe(0.05, route='/a"b')
+        histogram.observe(0.5, route='/a"b')
+        histogram.observe(5, route='/a"b')
+        assert histogram.get_count(route='/a"b') == 3
+        assert histogram.render().split('\n')[2:] == [
+            'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+            'latency_seconds_bucket{route="/a\\"b",le="1"} 2',
+            'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 3',
+            'latency_seconds_sum{route="/a\\"b"} 5.55',
+            'latency_seconds_count{route="/a\\"b"} 3',
+        ]
+
+    def test_registry_duplicate(self):
+        registry = Registry()
+        registry.register(Counter('requests_total', 'Requests'))
+        with pytest.raises(ValueError):
+            registry.register(Counter('requests_total', 'Requests'))
+
+    def test_counter_without_labels(self):
+        assert Counter('timeouts_total', 'Timeouts').render().endswith('timeouts_total 0')
+
+
+@pytest.mark.asyncio
+class TestAppMetrics:
+
+    async def test_request_duration_by_route_template(self, async_client):
+        labels = {'method': 'GET', 'route': '/blog/posts/{post_id}/', 'status': '404'}
+        count = REQUEST_DURATION_SECONDS.get_count(**labels)
+
+        assert (await async_client.get('/blog/posts/100500/')).status_code == 404
+        assert (await async_client.get('/blog/posts/100501/')).status_code == 404
+
+        assert REQUEST_DURATION_SECONDS.get_count(**labels) == count + 2
+        assert REQUESTS_IN_PROGRESS.get() == 0
+
+    async def test_unmatched_route(self, async_client):
+        labels = {'method': 'GET', 'route': 'unmatched', 'status': '404'}
+        count = REQUEST_DURATION_SECONDS.get_count(**labels)
+        assert (await async_client.get('/not-found/')).status_code == 404
+        assert REQUEST_DURATION_SECONDS.get_count(**labels) == count + 1
+
+    async def test_query_labeled_by_repository_method(self, async_session):
+        label = 'PostRepository.get_posts_after'
+        count = QUERY_DURATION_SECONDS.get_count(method=label)
+
+        token = SESSION.set(async_session)
+        try:
+            await PostRepository().get_posts_after(limit=10)
+        finally:
+            SESSION.reset(token)
+
+        assert QUERY_DURATION_SECONDS.get_count(method=label) == count + 1
+
+    async def test_query_error(self, async_session):
+        class BrokenRepository(BaseRepository):
+            async def divide_by_zero(self):
+                await self._db_session.execute(text('SELECT 1 / 0'))
+
+        label = 'BrokenRepository.divide_by_zero'
+        errors = QUERY_ERRORS.get(method=label)
+
+        token = SESSION.set(async_session)
+        try:
+            with pytest.raises(DBAPIError):
+                await BrokenRepository().divide_by_zero()
+        finally:
+            SESSION.reset(token)
+
+        assert QUERY_ERRORS.get(method=label) == errors + 1
+
+    async def test_pool_checkout_labeled_by_engine(self, database_url):
+        count = POOL_CHECKOUT_SECONDS.get_count(engine='replica_9')
+        engine = create_engine(uri=database_url, name='replica_9')
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text('SELECT 1'))
+        finally:
+            await engine.dispose()
+
+        assert POOL_CHECKOUT_SECONDS.get_count(engine='replica_9') == count + 1
@@ -0,0 +1,34 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.mark.asyncio
+class TestSessionMiddleware:
+
+    async def test_session_not_created(self, async_client, mock_session_middleware):
+        response = await async_client.get('/ping/')
+        assert response.status_code == 200
+        mock_session_middleware.assert_not_called()
+
+    async def test_read_only_request_not_committed(self, async_client, mock_session_middleware):
+        with patch.object(AsyncSession, 'commit') as commit_mock:
+            response = await async_client.get('/blog/posts/')
+        assert response.status_code == 200
+        mock_session_middleware.assert_called_once()
+        commit_mock.assert_not_awaited()
+
+    async def test_write_request_committed(self, async_client, create_user):
+        token, _ = await create_user('user', 'password')
+        with patch.object(AsyncSession, 'commit') as commit_mock:
+            response = await async_client.post('/blog/posts/', json={'text': 'post'}, headers={'Authorization': token})
+        assert response.status_code == 201
+        commit_mock.assert_awaited_once()
+
+    async def test_commit_failed(self, async_client, create_user):
+        token, _ = await create_user('user', 'password')
+        with patch.object(AsyncSession, 'commit', side_effect=RuntimeError):
+            response = await async_client.post('/blog/posts/', json={'text': 'post'}, headers={'Authorization': token})
+        assert response.status_code == 500
+        assert response.json() == {'error': 'Something went wrong'}
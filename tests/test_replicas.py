@@ -0,0 +1,193 @@
+from unittest.mock import patch
+
+import asyncpg
+import pytest
+import pytest_asyncio
+from pydantic import PostgresDsn
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.blog.repositories import PostRepository
+from backend.core import settings
+from backend.core.context_vars import SESSION_SCOPE
+from backend.core.database import ReplicaSet
+from backend.core.middleware import SessionMiddleware, SessionScope
+from backend.core.pagination import TotalMode
+from backend.models import Base, Post
+
+
+REPLICA_DB = f'{settings.DB.DB_TEST}_replica'
+
+
+@pytest_asyncio.fixture(scope='session')
+async def replica_engine():
+    conn = await asyncpg.connect(
+        host=settings.DB.URI.host,
+        user=settings.DB.URI.user,
+        password=settings.DB.URI.password,
+        database=settings.DB.URI.path.lstrip('/'),
+    )
+    await conn.execute(f'DROP DATABASE IF EXISTS {REPLICA_DB}')
+    await conn.execute(f'CREATE DATABASE {REPLICA_DB}')
+
+    engine = create_async_engine(PostgresDsn.build(
+        scheme='postgresql+asyncpg',
+        user=settings.DB.USER,
+        password=settings.DB.PASSWORD,
+        host=settings.DB.HOST,
+        path=f'/{REPLICA_DB}',
+    ))
+    async with engine.begin() as db_conn:
+        await db_conn.run_sync(Base.metadata.create_all)
+    yield engine
+
+    await engine.dispose()
+    await conn.execute(f'DROP DATABASE IF EXISTS {REPLICA_DB}')
+    await conn.close()
+
+
+@pytest.fixture
+def replica_set(replica_engine):
+    replicas = ReplicaSet([sessionmaker(replica_engine, expire_on_commit=False, class_=AsyncSession)])
+    with patch('backend.core.middleware.replica_set', replicas):
+        yield replicas
+
+
+@pytest.fixture
+def broken_replica_set():
+    engine = create_async_engine(PostgresDsn.build(
+        scheme='postgresql+asyncpg',
+        user=settings.DB.USER,
+        password=settings.DB.PASSWORD,
+        host=settings.DB.HOST,
+        port='1',
+        path=f'/{REPLICA_DB}',
+    ))
+    replicas = ReplicaSet([sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)])
+    with patch('backend.core.middleware.replica_set', replicas):
+        yield replicas
+
+
+@pytest.mark.asyncio
+class TestReplicaSet:
+
+    async def test_session(self, replica_set):
+        session = await replica_set.session()
+        try:
+            assert session.info['snapshot'] is True
+            assert await session.scalar(text('SELECT current_database()')) == REPLICA_DB
+            assert await session.scalar(text('SHOW transaction_isolation')) == 'repeatable read'
+        finally:
+            await session.close()
+
+    async def test_replica_down(self, broken_replica_set):
+        assert await broken_replica_set.session() is None
+        assert broken_replica_set.is_down(0)
+
+    async def test_empty(self):
+        replicas = ReplicaSet([])
+        assert not replicas
+        assert await replicas.session() is None
+
+
+@pytest.mark.asyncio
+class TestSessionScope:
+
+    async def test_read_from_replica(self, async_session, replica_set):
+        scope = SessionScope(lambda: async_session, replicas=replica_set)
+        try:
+            session = await scope.get_read_session()
+            assert session is not async_session
+            assert await session.scalar(text('SELECT current_database()')) == REPLICA_DB
+            assert await scope.get_read_session() is session
+        finally:
+            await scope.close()
+
+    async def test_read_your_writes(self, async_session, replica_set):
+        scope = SessionScope(lambda: async_session, replicas=replica_set)
+        try:
+            scope.session.add(Post(text='post'))
+            assert await scope.get_read_session() is async_session
+        finally:
+            await scope.close()
+
+    async def test_sticky(self, async_session, replica_set):
+        scope = SessionScope(lambda: async_session, replicas=replica_set, sticky=True)
+        try:
+            assert await scope.get_read_session() is async_session
+        finally:
+            await scope.close()
+
+    async def test_fallback_to_primary(self, async_session, broken_replica_set):
+        scope = SessionScope(lambda: async_session, replicas=broken_replica_set)
+        try:
+            assert await scope.get_read_session() is async_session
+        finally:
+            await scope.close()
+
+    async def test_estimated_total_is_not_write(self, async_session):
+        scope = SessionScope(lambda: async_session)
+        token = SESSION_SCOPE.set(scope)
+        try:
+            total, _ = await PostRepository().get_all_posts(limit=10, offset=0, total_mode=TotalMode.ESTIMATED)
+            assert isinstance(total, int)
+            assert scope.has_writes is False
+        finally:
+            SESSION_SCOPE.reset(token)
+            await scope.close()
+
+
+@pytest.mark.asyncio
+class TestReplicaRouting:
+
+    async def test_feed_read_from_replica(self, async_client, create_user, create_obj_in_db, replica_set):
+        _, user = await create_user('user', 'password')
+        await create_obj_in_db(Post(id=1, path=[1], text='post', owner_id=user.id))
+
+        response = await async_client.get('/blog/posts/')
+        assert response.status_code == 200
+        assert response.json()['total'] == 0
+
+    async def test_feed_read_from_primary_when_sticky(
+        self, async_client, create_user, create_obj_in_db, replica_set
+    ):
+        _, user = await create_user('user', 'password')
+        await create_obj_in_db(Post(id=1, path=[1], text='post', owner_id=user.id))
+
+        async_client.cookies.set(SessionMiddleware.sticky_cookie, '9999999999')
+        try:
+            response = await async_client.get('/blog/posts/')
+        finally:
+            async_client.cookies.clear()
+        assert response.status_code == 200
+        assert response.json()['total'] == 1
+
+    async def test_estimated_total_does_not_extend_sticky(self, async_client, replica_set):
+        async_client.cookies.set(SessionMiddleware.sticky_cookie, '9999999999')
+        try:
+            response = await async_client.get('/blog/posts/', params={'estimated_total': True})
+        finally:
+            async_client.cookies.clear()
+        assert response.status_code == 200
+        assert SessionMiddleware.sticky_cookie not in response.cookies
+
+    async def test_write_sets_sticky_cookie(self, async_client, create_user, replica_set):
+        token, _ = await create_user('user', 'password')
+        response = await async_client.post('/blog/posts/', json={'text': 'post'}, headers={'Authorization': token})
+        assert response.status_code == 201
+        assert SessionMiddleware.sticky_cookie in response.cookies
+
+    async def test_write_without_replicas(self, async_client, create_user):
+        token, _ = await create_user('user', 'password')
+        response = await async_client.post('/blog/posts/', json={'text': 'post'}, headers={'Authorization': token})
+        assert response.status_code == 201
+        assert SessionMiddleware.sticky_cookie not in response.cookies
+
+    async def test_fallback_to_primary(self, async_client, create_user, create_obj_in_db, broken_replica_set):
+        _, user = await create_user('user', 'password')
+        await create_obj_in_db(Post(id=1, path=[1], text='post', owner_id=user.id))
+
+        response = await async_client.get('/blog/posts/')
+        assert response.status_code == 200
+        assert response.json()['total'] == 1
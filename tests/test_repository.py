@@ -0,0 +1,33 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend.core.context_vars import SESSION
+from backend.core.repository import BaseRepository
+
+
+@pytest.mark.asyncio
+class TestSnapshotRead:
+    stmt = text('SHOW transaction_isolation')
+
+    async def test_engine_bound_session(self, test_engine):
+        async with sessionmaker(test_engine, class_=AsyncSession)() as session:
+            token = SESSION.set(session)
+            try:
+                result_1, result_2 = await BaseRepository()._snapshot_read(self.stmt, self.stmt)
+                assert result_1.scalar_one() == result_2.scalar_one() == 'repeatable read'
+                await session.commit()
+
+                assert (await session.execute(self.stmt)).scalar_one() == 'read committed'
+            finally:
+                SESSION.reset(token)
+
+    async def test_transaction_already_started(self, async_session):
+        token = SESSION.set(async_session)
+        try:
+            await async_session.execute(text('SELECT 1'))
+            (result,) = await BaseRepository()._snapshot_read(self.stmt)
+            assert result.scalar_one() == 'read committed'
+        finally:
+            SESSION.reset(token)
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+from tests.base import BaseRepoTest
+
+from backend.auth.repositories import UserRepository
+from backend.core.config import PasswordHashConfig
+from backend.core.exceptions import ServiceUnavailable
+from backend.core.security import PasswordHasher, RevokedUsers, get_password_hash, verify_password
+
+
+@pytest.mark.asyncio
+class TestPasswordHasher:
+
+    async def test_run(self):
+        hasher = PasswordHasher(PasswordHashConfig(WORKERS=1, QUEUE_SIZE=0))
+        hashed_password = await hasher.run(get_password_hash, 'password')
+        assert await hasher.run(verify_password, 'password', hashed_password)
+        assert not await hasher.run(verify_password, 'invalid_password', hashed_password)
+
+    async def test_runs_outside_event_loop_thread(self):
+        hasher = PasswordHasher(PasswordHashConfig(WORKERS=1, QUEUE_SIZE=0))
+        assert await hasher.run(threading.get_ident) != threading.get_ident()
+
+    async def test_queue_is_full(self):
+        hasher = PasswordHasher(PasswordHashConfig(WORKERS=1, QUEUE_SIZE=1))
+        event = threading.Event()
+
+        tasks = [asyncio.create_task(hasher.run(event.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ServiceUnavailable):
+            await hasher.run(event.wait, 5)
+
+        event.set()
+        assert await asyncio.gather(*tasks) == [True, True]
+
+
+@pytest.mark.asyncio
+class TestRevokedUsers(BaseRepoTest):
+
+    @pytest.fixture
+    def session_factory(self, async_session):
+        @asynccontextmanager
+        async def factory():
+            yield async_session
+
+        return factory
+
+    async def test_refresh(self, session_factory, create_user):
+        _, user = await create_user('user', 'password')
+        revoked = RevokedUsers(session_factory=session_factory)
+        await revoked.refresh()
+        assert user.id not in revoked
+
+        # Деактивация в другом процессе видна после refresh
+        await UserRepository().deactivate_user(user.id)
+        await revoked.refresh()
+        assert user.id in revoked
+
+        # Запись не пропадает, пока не истечет время жизни токенов
+        with patch.object(UserRepository, 'get_deactivated_user_ids', return_value=[]):
+            await revoked.refresh()
+        assert user.id in revoked
+
+    async def test_expired(self, session_factory):
+        revoked = RevokedUsers(session_factory=session_factory, window=timedelta(0))
+        revoked.add(1)
+        assert 1 in revoked
+        with patch.object(UserRepository, 'get_deactivated_user_ids', return_value=[]):
+            await revoked.refresh()
+        assert 1 not in revoked
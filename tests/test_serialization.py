@@ -0,0 +1,65 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from backend.blog.schemas import PostWithUser, User
+from backend.core import serialization
+from backend.core.pagination import Page
+from backend.core.serialization import FastJSONResponse, dumps
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request):
+    if request.param == 'json':
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(serialization, 'orjson', None)
+            yield
+    else:
+        yield
+
+
+class TestDumps:
+
+    @pytest.mark.parametrize('created_at', [datetime(2022, 1, 2, 3, 4, 5, 678), datetime(2022, 1, 2, 3, 4, 5)])
+    def test_matches_pydantic(self, encoder, created_at):
+        post = PostWithUser(
+            id=1, text='текст', created_at=created_at, comments_count=0, owner=User(id=1, username='user'),
+        )
+        assert json.loads(dumps(post.dict())) == json.loads(post.json())
+        assert dumps(post.dict()).decode().count(created_at.isoformat()) == 1
+
+    def test_constructed_model(self, encoder):
+        page = Page.construct(limit=10, offset=0, total=None, exact_total=False, items=[{'id': 1}])
+        assert json.loads(dumps(page)) == {
+            'limit': 10, 'offset': 0, 'total': None, 'exact_total': False, 'items': [{'id': 1}],
+        }
+
+    def test_not_serializable(self, encoder):
+        with pytest.raises(TypeError):
+            dumps({'value': object()})
+
+
+class TestFastJSONResponse:
+
+    def test_bytes_passed_through(self):
+        response = FastJSONResponse(b'{"a":1}')
+        assert response.body == b'{"a":1}'
+        assert response.headers['content-type'] == 'application/json'
+
+
+def test_openapi_keeps_response_models(app):
+    paths = app.openapi()['paths']
+
+    def schema(path: str) -> dict:
+        return paths[path]['get']['responses']['200']['content']['application/json']['schema']
+
+    assert schema('/blog/posts/') == {
+        'title': 'Response Get All Posts Blog Posts  Get',
+        'anyOf': [
+            {'$ref': '#/components/schemas/Page_PostWithUser_'},
+            {'$ref': '#/components/schemas/CursorPage_PostWithUser_'},
+        ],
+    }
+    assert schema('/blog/posts/{post_id}/') == {'$ref': '#/components/schemas/PostWithComments'}
+    assert schema('/blog/posts/{post_id}/comments/') == {'$ref': '#/components/schemas/CursorPage_PostComment_'}